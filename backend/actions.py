@@ -0,0 +1,306 @@
+# backend/actions.py
+"""
+Executor for recommended actions on Meta objects (campaigns / ad sets / ads).
+
+Supported actions:
+- {"type": "pause", "object_id": ...}
+- {"type": "scale_budget", "object_id": ..., "percent": 20}       (negative scales down)
+- {"type": "reallocate", "from_id": ..., "to_id": ..., "amount": 500}
+  (moves `amount` of daily budget, in the account's minor currency units)
+
+Execution reads the current values of every touched object, plans the field
+changes, and writes them with Graph batch requests (up to 50 sub-requests per
+call, several calls in flight, throttled sub-requests retried with backoff).
+Every planned change is recorded in `action_audit` with its before/after value.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, TypedDict
+from urllib.parse import urlencode
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import ads_api
+from backend.models import ActionAudit
+
+ACTION_TYPES = ("pause", "scale_budget", "reallocate")
+
+# Graph API hard limit of sub-requests per batch call.
+GRAPH_BATCH_LIMIT = 50
+ACTIONS_MAX_CONCURRENCY = int(os.getenv("ACTIONS_MAX_CONCURRENCY", "4"))
+ACTIONS_MAX_RETRIES = int(os.getenv("ACTIONS_MAX_RETRIES", "3"))
+ACTIONS_RETRY_BASE_SECONDS = float(os.getenv("ACTIONS_RETRY_BASE_SECONDS", "2"))
+
+THROTTLE_CODES = ads_api.THROTTLE_CODES
+
+_READ_FIELDS = "status,daily_budget"
+
+
+class PlannedChange(TypedDict):
+    object_id: str
+    action: str
+    field: str
+    before: Optional[str]
+    after: str
+
+
+class ChangeResult(PlannedChange, total=False):
+    ok: bool
+    error: Optional[str]
+
+
+def validate_actions(actions: Sequence[Mapping[str, Any]]) -> None:
+    """Raise ValueError for unknown action types or missing parameters."""
+    for i, action in enumerate(actions):
+        kind = action.get("type")
+        if kind not in ACTION_TYPES:
+            raise ValueError(f"actions[{i}]: type must be one of: {', '.join(ACTION_TYPES)}")
+        required = ("from_id", "to_id", "amount") if kind == "reallocate" else ("object_id",)
+        if kind == "scale_budget":
+            required += ("percent",)
+        missing = [k for k in required if action.get(k) in (None, "")]
+        if missing:
+            raise ValueError(f"actions[{i}]: missing {', '.join(missing)}")
+
+
+def _object_ids(actions: Sequence[Mapping[str, Any]]) -> List[str]:
+    ids: Dict[str, None] = {}
+    for action in actions:
+        for key in ("object_id", "from_id", "to_id"):
+            if action.get(key):
+                ids[str(action[key])] = None
+    return list(ids)
+
+
+def plan_changes(
+    actions: Sequence[Mapping[str, Any]],
+    current: Mapping[str, Mapping[str, Any]],
+) -> Tuple[List[PlannedChange], List[ChangeResult]]:
+    """
+    Turn actions into field changes against `current` object values
+    (`{object_id: {"status": ..., "daily_budget": ...}}`). Actions are applied
+    in order on a working copy, so several actions on one object compose;
+    only the final value per (object, field) is written.
+    Returns (changes, rejected) where rejected entries carry an error.
+    """
+    working = {oid: dict(values) for oid, values in current.items()}
+    changes: Dict[Tuple[str, str], PlannedChange] = {}
+    rejected: List[ChangeResult] = []
+
+    def _budget(oid: str) -> Optional[int]:
+        raw = working.get(oid, {}).get("daily_budget")
+        return int(raw) if raw not in (None, "") else None
+
+    def _set(oid: str, action: str, field: str, value: str) -> None:
+        key = (oid, field)
+        before = changes[key]["before"] if key in changes else current.get(oid, {}).get(field)
+        working.setdefault(oid, {})[field] = value
+        changes[key] = PlannedChange(
+            object_id=oid, action=action, field=field,
+            before=None if before is None else str(before), after=value,
+        )
+
+    def _reject(oid: str, action: str, field: str, error: str) -> None:
+        before = working.get(oid, {}).get(field)
+        rejected.append(ChangeResult(
+            object_id=oid, action=action, field=field,
+            before=None if before is None else str(before), after="", ok=False, error=error,
+        ))
+
+    for action in actions:
+        kind = action["type"]
+        if kind == "pause":
+            _set(str(action["object_id"]), kind, "status", "PAUSED")
+            continue
+
+        if kind == "scale_budget":
+            oid = str(action["object_id"])
+            budget = _budget(oid)
+            if budget is None:
+                _reject(oid, kind, "daily_budget", "Object has no daily_budget (budget set on another level?)")
+                continue
+            new_budget = round(budget * (1 + float(action["percent"]) / 100))
+            if new_budget <= 0:
+                _reject(oid, kind, "daily_budget", "Resulting budget must be positive")
+                continue
+            _set(oid, kind, "daily_budget", str(new_budget))
+            continue
+
+        # reallocate
+        src, dst, amount = str(action["from_id"]), str(action["to_id"]), int(action["amount"])
+        src_budget, dst_budget = _budget(src), _budget(dst)
+        if src_budget is None or dst_budget is None:
+            missing = src if src_budget is None else dst
+            _reject(missing, kind, "daily_budget", "Object has no daily_budget (budget set on another level?)")
+            continue
+        if amount <= 0 or src_budget - amount <= 0:
+            _reject(src, kind, "daily_budget", "Reallocated amount must be positive and below the source budget")
+            continue
+        _set(src, kind, "daily_budget", str(src_budget - amount))
+        _set(dst, kind, "daily_budget", str(dst_budget + amount))
+
+    return list(changes.values()), rejected
+
+
+# Graph batch transport -----------------------------------------------------------
+
+def _error_code(body: Any) -> Optional[int]:
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        code = body["error"].get("code")
+        return int(code) if isinstance(code, (int, str)) and str(code).isdigit() else None
+    return None
+
+
+def _parse_item(item: Optional[Mapping[str, Any]]) -> Tuple[int, Any]:
+    if not item:
+        return 0, None  # Graph returns null for sub-requests it did not finish
+    try:
+        body = json.loads(item.get("body") or "null")
+    except ValueError:
+        body = {"error": {"message": "Non-JSON sub-response"}}
+    return int(item.get("code") or 0), body
+
+
+async def _graph_batch(client: httpx.AsyncClient, requests: List[Dict[str, Any]]) -> List[Tuple[int, Any]]:
+    """
+    One Graph batch call (<= GRAPH_BATCH_LIMIT sub-requests). Sub-requests that
+    were throttled or left unfinished are retried with exponential backoff.
+    Returns (http_code, parsed_body) per request, in order.
+    """
+    results: List[Tuple[int, Any]] = [(0, None)] * len(requests)
+    pending = list(range(len(requests)))
+    for attempt in range(ACTIONS_MAX_RETRIES + 1):
+        last_try = attempt == ACTIONS_MAX_RETRIES
+        resp = await ads_api._post(
+            client, "", form_payload={"batch": json.dumps([requests[i] for i in pending]), "include_headers": "false"}
+        )
+        retry: List[int] = []
+        if not isinstance(resp, list):  # the whole call failed
+            if _error_code(resp) in THROTTLE_CODES and not last_try:
+                retry = pending
+            else:
+                for i in pending:
+                    results[i] = (0, resp)
+        else:
+            for i, item in zip(pending, resp):
+                code, body = _parse_item(item)
+                if (body is None or _error_code(body) in THROTTLE_CODES) and not last_try:
+                    retry.append(i)
+                else:
+                    results[i] = (code, body)
+        if not retry:
+            break
+        pending = retry
+        await asyncio.sleep(ACTIONS_RETRY_BASE_SECONDS * 2 ** attempt)
+    return results
+
+
+async def _run_batches(requests: List[Dict[str, Any]], max_concurrency: int) -> List[Tuple[int, Any]]:
+    """Split into GRAPH_BATCH_LIMIT-sized calls, at most `max_concurrency` in flight."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    chunks = [requests[i:i + GRAPH_BATCH_LIMIT] for i in range(0, len(requests), GRAPH_BATCH_LIMIT)]
+
+    async with ads_api._client() as client:
+        async def _one(chunk: List[Dict[str, Any]]) -> List[Tuple[int, Any]]:
+            async with semaphore:
+                return await _graph_batch(client, chunk)
+
+        outcomes = await asyncio.gather(*(_one(c) for c in chunks))
+    return [r for chunk in outcomes for r in chunk]
+
+
+def _error_message(code: int, body: Any) -> str:
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        return str(body["error"].get("message") or body["error"])
+    return f"Graph sub-request failed (code {code})"
+
+
+async def read_current(object_ids: Sequence[str], max_concurrency: int = ACTIONS_MAX_CONCURRENCY) -> Dict[str, Dict[str, Any]]:
+    """Current status/daily_budget per object; objects that could not be read are omitted."""
+    requests = [{"method": "GET", "relative_url": f"{oid}?fields={_READ_FIELDS}"} for oid in object_ids]
+    out: Dict[str, Dict[str, Any]] = {}
+    for oid, (code, body) in zip(object_ids, await _run_batches(requests, max_concurrency)):
+        if code == 200 and isinstance(body, dict):
+            out[oid] = body
+    return out
+
+
+async def execute_actions(
+    session: AsyncSession,
+    actions: Sequence[Mapping[str, Any]],
+    recommendation_id: Optional[int] = None,
+    max_concurrency: int = ACTIONS_MAX_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Validate, plan and apply `actions`, and audit every change (the caller commits).
+    Returns `{execution_id, applied, failed, results}`.
+    """
+    validate_actions(actions)
+    current = await read_current(_object_ids(actions), max_concurrency)
+    changes, results = plan_changes(actions, current)
+
+    writes = [
+        {"method": "POST", "relative_url": c["object_id"], "body": urlencode({c["field"]: c["after"]})}
+        for c in changes
+    ]
+    for change, (code, body) in zip(changes, await _run_batches(writes, max_concurrency)):
+        ok = code == 200 and isinstance(body, dict) and body.get("success", True) and "error" not in body
+        results.append(ChangeResult(**change, ok=bool(ok), error=None if ok else _error_message(code, body)))
+
+    execution_id = uuid.uuid4().hex
+    now = dt.datetime.now(dt.timezone.utc)
+    session.add_all(
+        ActionAudit(
+            execution_id=execution_id,
+            recommendation_id=recommendation_id,
+            object_id=r["object_id"],
+            action=r["action"],
+            field=r["field"],
+            before_value=r["before"],
+            after_value=r["after"] or None,
+            status="ok" if r["ok"] else "error",
+            error=r["error"],
+            created_at=now,
+        )
+        for r in results
+    )
+    await session.flush()
+    applied = sum(1 for r in results if r["ok"])
+    return {"execution_id": execution_id, "applied": applied, "failed": len(results) - applied, "results": results}
+
+
+async def list_audit(
+    session: AsyncSession,
+    execution_id: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Audit entries, newest first."""
+    query = select(ActionAudit).order_by(ActionAudit.id.desc()).limit(limit).offset(offset)
+    if execution_id:
+        query = query.where(ActionAudit.execution_id == execution_id)
+    result = await session.execute(query)
+    return [
+        {
+            "id": a.id,
+            "execution_id": a.execution_id,
+            "recommendation_id": a.recommendation_id,
+            "object_id": a.object_id,
+            "action": a.action,
+            "field": a.field,
+            "before": a.before_value,
+            "after": a.after_value,
+            "status": a.status,
+            "error": a.error,
+            "created_at": a.created_at.isoformat() if a.created_at else None,
+        }
+        for a in result.scalars()
+    ]
@@ -1,13 +1,20 @@
 # backend/ads_api.py
 from __future__ import annotations
 
+import contextlib
 import json
+import mimetypes
 import os
-from typing import Any, Dict, List, Optional, TypedDict
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, TypedDict
 
 import httpx
 from dotenv import load_dotenv
 
+from backend.metrics import normalize_graph_path, observe_graph_request, tracks_crawl
+from backend.tenancy import DEFAULT_ACCOUNT, client_pool, current_tenant, throttle
+from backend.tracing import span, traced
+
 load_dotenv()
 
 # Environment / constants ------------------------------------------------------
@@ -32,6 +39,16 @@ OBJECTIVE_OPTIMIZATION_MAP: Dict[str, List[str]] = {
 }
 
 
+# Daily insight fields used by the KPI/metrics layer (ad level adds the ad/adset ids)
+INSIGHT_FIELDS = "campaign_id,campaign_name,objective,spend,impressions,clicks,reach,actions,action_values"
+AD_INSIGHT_FIELDS = f"ad_id,adset_id,{INSIGHT_FIELDS}"
+# Graph error codes for app/user/account-level throttling.
+THROTTLE_CODES = frozenset({4, 17, 32, 613, 80000, 80003, 80004, 80014})
+# Purchase action types in priority order; Meta reports overlapping variants,
+# so only the first one present is counted.
+PURCHASE_ACTION_TYPES = ("omni_purchase", "purchase", "offsite_conversion.fb_pixel_purchase")
+
+
 # Types ------------------------------------------------------------------------
 
 class AdSummary(TypedDict, total=False):
@@ -56,6 +73,23 @@ class CampaignSummary(TypedDict, total=False):
     adsets: List[AdsetSummary]
 
 
+class InsightRow(TypedDict, total=False):
+    account_id: str
+    campaign_id: str
+    adset_id: str  # level="ad" only
+    ad_id: str  # level="ad" only
+    campaign_name: str
+    objective: str
+    date: str  # YYYY-MM-DD
+    spend: float
+    # Monetary purchase value (action_values), unlike CampaignSummary.revenue.
+    revenue: float
+    impressions: int
+    clicks: int
+    reach: int
+    conversions: float
+
+
 # Private helpers --------------------------------------------------------------
 
 def _missing_token_response() -> Dict[str, Any]:
@@ -72,29 +106,151 @@ def _default_timeout() -> httpx.Timeout:
     return httpx.Timeout(connect=10.0, read=60.0, write=30.0, pool=10.0)
 
 
+def _access_token() -> Optional[str]:
+    """The current tenant's token (see backend.tenancy), else META_ACCESS_TOKEN."""
+    context = current_tenant.get()
+    return context.access_token if context is not None else ACCESS_TOKEN
+
+
+@contextlib.asynccontextmanager
+async def _client() -> AsyncIterator[httpx.AsyncClient]:
+    """The tenant's pooled client inside a tenant scope, else a short-lived one (as before)."""
+    context = current_tenant.get()
+    if context is not None:
+        async with client_pool.client(context.tenant_id, _default_timeout()) as client:
+            yield client
+    else:
+        async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+            yield client
+
+
+def _json_or_error(resp: httpx.Response) -> Dict[str, Any]:
+    # Preserve original semantics: return JSON even on non-2xx
+    try:
+        return resp.json()
+    except Exception:
+        return {"error": {"message": "Non-JSON response from Graph API", "status_code": resp.status_code}}
+
+
+def _graph_account(path: str) -> Optional[str]:
+    """Ad account a Graph call belongs to: "act_…" path prefix or the tenant scope."""
+    first = path.strip("/").split("/", 1)[0]
+    if first.startswith("act_"):
+        return first
+    tenant = current_tenant.get()
+    if tenant is not None and tenant.account_id != DEFAULT_ACCOUNT:
+        return tenant.account_id
+    return None
+
+
+async def _send(
+    method: str, path: str, request: Awaitable[httpx.Response], page: Optional[int] = None
+) -> Dict[str, Any]:
+    """Await the HTTP call `request`; record it in backend.metrics and as a trace span."""
+    normalized = normalize_graph_path(path)
+    with span(
+        f"graph {method} {normalized}",
+        **{
+            "http.request.method": method,
+            "graph.path": normalized,
+            "graph.account_id": _graph_account(path),
+            "graph.page": page,
+        },
+    ) as current:
+        started = time.perf_counter()
+        try:
+            resp = await request
+        except Exception:
+            observe_graph_request(method, path, "error", time.perf_counter() - started)
+            raise
+        payload = _json_or_error(resp)
+        error = payload.get("error") if isinstance(payload, dict) else None
+        code = error.get("code", "unknown") if isinstance(error, dict) else None
+        observe_graph_request(
+            method, path, resp.status_code, time.perf_counter() - started,
+            error_code=code, throttled=code in THROTTLE_CODES,
+        )
+        current.set_attribute("http.response.status_code", resp.status_code)
+        if code is not None:
+            current.set_attribute("graph.error_code", str(code))
+        return payload
+
+
 def _auth_params(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    params = {"access_token": ACCESS_TOKEN}
+    params = {"access_token": _access_token()}
     if extra:
         params.update(extra)
     return params
 
 
-async def _get(client: httpx.AsyncClient, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+async def _get(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    page: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     Perform a GET to `{BASE_URL}/{path}` and return response.json()
     without raising. Keeps prior behavior: callers get Graph API JSON on
     both success and error.
     """
-    if not ACCESS_TOKEN:
+    if not _access_token():
         return _missing_token_response()
 
     url = f"{BASE_URL}/{path.lstrip('/')}"
-    resp = await client.get(url, params=_auth_params(params))
-    # Preserve original semantics: return JSON even on non-2xx
-    try:
-        return resp.json()
-    except Exception:
-        return {"error": {"message": "Non-JSON response from Graph API", "status_code": resp.status_code}}
+    await throttle()
+    return await _send("GET", path, client.get(url, params=_auth_params(params)), page=page)
+
+
+async def _get_paged(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_pages: int = 1000,
+) -> List[Dict[str, Any]]:
+    """
+    GET every page of a Graph edge by following `paging.cursors.after`.
+    Stops on the first error payload and returns what was collected so far.
+    """
+    params = dict(params or {})
+    items: List[Dict[str, Any]] = []
+    for page in range(max_pages):
+        resp = await _get(client, path, params=params, page=page)
+        items.extend(resp.get("data", []) or [])
+        paging = resp.get("paging") or {}
+        after = (paging.get("cursors") or {}).get("after")
+        if not paging.get("next") or not after:
+            break
+        params["after"] = after
+    return items
+
+
+def _action_value(actions: Optional[List[Dict[str, Any]]]) -> float:
+    by_type = {a.get("action_type"): a.get("value") for a in actions or []}
+    for action_type in PURCHASE_ACTION_TYPES:
+        if action_type in by_type:
+            return float(by_type[action_type] or 0.0)
+    return 0.0
+
+
+def _parse_insight(account_id: str, raw: Dict[str, Any]) -> InsightRow:
+    row = InsightRow(
+        account_id=account_id,
+        campaign_id=raw.get("campaign_id", ""),
+        campaign_name=raw.get("campaign_name", ""),
+        objective=raw.get("objective", ""),
+        date=raw.get("date_start", ""),
+        spend=float(raw.get("spend", 0) or 0.0),
+        revenue=_action_value(raw.get("action_values")),
+        impressions=int(raw.get("impressions", 0) or 0),
+        clicks=int(raw.get("clicks", 0) or 0),
+        reach=int(raw.get("reach", 0) or 0),
+        conversions=_action_value(raw.get("actions")),
+    )
+    if "ad_id" in raw:
+        row["ad_id"] = raw["ad_id"]
+        row["adset_id"] = raw.get("adset_id", "")
+    return row
 
 
 async def _post(
@@ -109,30 +265,29 @@ async def _post(
     Perform a POST to `{BASE_URL}/{path}` returning response.json().
     Mirrors the no-raise behavior of the original code.
     """
-    if not ACCESS_TOKEN:
+    if not _access_token():
         return _missing_token_response()
 
     url = f"{BASE_URL}/{path.lstrip('/')}"
     # Attach token in the correct place (params for form, json for JSON)
     params = _auth_params()
+    await throttle()
 
     if json_payload is not None:
         # For JSON payloads, token should be in params to keep original pattern
-        resp = await client.post(url, params=params, json=json_payload)
+        request = client.post(url, params=params, json=json_payload)
     else:
         # For form payloads, include token in form fields (original behavior)
         form_payload = form_payload or {}
-        form_payload.setdefault("access_token", ACCESS_TOKEN)
-        resp = await client.post(url, data=form_payload, files=files)
-
-    try:
-        return resp.json()
-    except Exception:
-        return {"error": {"message": "Non-JSON response from Graph API", "status_code": resp.status_code}}
+        form_payload.setdefault("access_token", _access_token())
+        request = client.post(url, data=form_payload, files=files)
+    return await _send("POST", path, request)
 
 
 # Public API -------------------------------------------------------------------
 
+@tracks_crawl("campaigns")
+@traced("crawl.campaigns")
 async def fetch_campaigns(include_insights: bool = False) -> List[Dict[str, Any]]:
     """
     Fetch accounts -> campaigns -> adsets -> ads.
@@ -144,7 +299,7 @@ async def fetch_campaigns(include_insights: bool = False) -> List[Dict[str, Any]
     """
     results: List[Dict[str, Any]] = []
 
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    async with _client() as client:
         accounts_resp = await _get(client, "me/adaccounts")
         accounts = accounts_resp.get("data", []) or []
 
@@ -220,6 +375,38 @@ async def fetch_campaigns(include_insights: bool = False) -> List[Dict[str, Any]
     return results
 
 
+@tracks_crawl("insights")
+@traced("crawl.insights")
+async def fetch_insights(
+    date_preset: Optional[str] = "last_30d",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    level: str = "campaign",
+) -> List[InsightRow]:
+    """
+    Fetch daily insights for every ad account as flat rows.
+    `level` is "campaign" or "ad" (ad rows also carry ad_id/adset_id).
+    `since`/`until` (YYYY-MM-DD) take precedence over `date_preset`.
+    """
+    fields = AD_INSIGHT_FIELDS if level == "ad" else INSIGHT_FIELDS
+    params: Dict[str, Any] = {"level": level, "time_increment": 1, "fields": fields, "limit": 500}
+    if since and until:
+        params["time_range"] = json.dumps({"since": since, "until": until})
+    elif date_preset:
+        params["date_preset"] = date_preset
+
+    rows: List[InsightRow] = []
+    async with _client() as client:
+        accounts_resp = await _get(client, "me/adaccounts")
+        for acc in accounts_resp.get("data", []) or []:
+            acc_id = acc.get("id")
+            if not acc_id:
+                continue
+            raw_rows = await _get_paged(client, f"{acc_id}/insights", params=params)
+            rows.extend(_parse_insight(acc_id, raw) for raw in raw_rows)
+    return rows
+
+
 async def create_campaign(
     account_id: str,
     name: str,
@@ -237,7 +424,7 @@ async def create_campaign(
         # Keep JSON string to preserve the original behavior
         "special_ad_categories": json.dumps(special_ad_categories),
     }
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    async with _client() as client:
         return await _post(client, f"act_{account_id}/campaigns", form_payload=payload)
 
 
@@ -265,7 +452,7 @@ async def create_adset(
         "targeting": targeting,
         "status": status,
     }
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    async with _client() as client:
         return await _post(client, f"act_{account_id}/adsets", json_payload=payload)
 
 
@@ -285,27 +472,26 @@ async def create_ad(
         "creative": {"creative_id": creative_id},
         "status": status,
     }
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    async with _client() as client:
         return await _post(client, f"act_{account_id}/ads", json_payload=payload)
 
 
 async def upload_ad_image(account_id: str, image_path: str) -> Dict[str, Any]:
     """
     Upload an image and return the Graph response (which includes image hash).
+    The content type follows the file extension (JPEG when unknown).
     """
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+    async with _client() as client:
         with open(image_path, "rb") as f:
-            files = {"filename": (os.path.basename(image_path), f, "image/jpeg")}
+            files = {"filename": (os.path.basename(image_path), f, mime_type)}
             # Token goes into form data to match original behavior
-            form = {"access_token": ACCESS_TOKEN}
+            form = {"access_token": _access_token()}
             # Use raw path here to keep parity with original endpoint form
             url_path = f"act_{account_id}/adimages"
             url = f"{BASE_URL}/{url_path}"
-            resp = await client.post(url, data=form, files=files)
-            try:
-                return resp.json()
-            except Exception:
-                return {"error": {"message": "Non-JSON response from Graph API", "status_code": resp.status_code}}
+            await throttle()
+            return await _send("POST", url_path, client.post(url, data=form, files=files))
 
 
 async def create_adcreative(
@@ -335,5 +521,5 @@ async def create_adcreative(
             }
         ),
     }
-    async with httpx.AsyncClient(timeout=_default_timeout()) as client:
+    async with _client() as client:
         return await _post(client, f"act_{account_id}/adcreatives", form_payload=payload)
@@ -1,46 +1,362 @@
 # backend/ai_engine.py
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, TypedDict
 
-import openai
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from backend.prompt_compaction import CompactionStats, compact_payload, count_tokens
+from backend.telemetry import record_ai_call
+from backend.tracing import end_span, span, start_span
 
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+logger = logging.getLogger(__name__)
 
 # NOTE:
-# - Keep the same OpenAI usage to avoid changing behavior.
-# - The function remains async but executes the blocking call in a thread.
+# - Native async client: no executor threads, one pooled HTTP connection set
+#   reused by every call, SDK-level timeout and retries (429/5xx/connection
+#   errors with exponential backoff).
 
+MODEL = "gpt-4"
 
-def _build_prompt(campaign_data: Any) -> str:
-    """Create the Czech prompt while keeping the original phrasing."""
-    return f"""
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+
+# Batch engine tuning
+BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "25"))
+MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "21600"))  # 6 h
+
+ACTIONS = ("scale", "pause", "keep")
+
+# Campaign fields copied into the compact feature summary when present.
+_NUMERIC_FEATURES = (
+    "spend", "revenue", "roas", "impressions", "clicks", "ctr", "cpa", "conversions", "frequency",
+)
+
+
+class Recommendation(TypedDict):
+    campaign_id: str
+    action: str  # one of ACTIONS
+    reason: str
+    source: str  # "llm" or "rules" (see rules_engine)
+
+
+def prepare_prompt(campaign_data: Any) -> Tuple[str, CompactionStats]:
+    """
+    Czech prompt (original phrasing) with the payload compacted to the token
+    budget (see prompt_compaction), plus the payload's token stats.
+    """
+    payload, stats = compact_payload(campaign_data)
+    prompt = f"""
 Zde jsou data kampaně:
-{campaign_data}
+{payload}
 
 Navrhni, zda škálovat, pauznout nebo nechat být. Vysvětli proč.
 """.strip()
+    return prompt, stats
 
 
-async def recommend_action(campaign_data: Any) -> str:
+def prepare_portfolio_prompt(campaigns: Sequence[Mapping[str, Any]]) -> Tuple[str, CompactionStats]:
+    """Like `prepare_prompt`, but asks about a list of campaigns as one portfolio."""
+    payload, stats = compact_payload(list(campaigns))
+    prompt = f"""
+Zde jsou data všech kampaní účtu (portfolio):
+{payload}
+
+Navrhni, které kampaně škálovat, pauznout nebo nechat být, a jak přerozdělit rozpočet. Vysvětli proč.
+""".strip()
+    return prompt, stats
+
+
+def _build_prompt(campaign_data: Any) -> str:
+    return prepare_prompt(campaign_data)[0]
+
+
+def _finish_call(
+    kind: str,
+    started: float,
+    prompt: str,
+    usage: Any,
+    completion: str,
+    stats: Optional[CompactionStats],
+    error: Optional[BaseException] = None,
+    trace_span: Any = None,
+) -> None:
+    """
+    Per-call report (log line + telemetry record + trace span attributes).
+    Token counts come from the API usage when returned. Without it, failed
+    calls (any Exception) count 0 tokens; completed or abandoned ones are
+    counted locally.
+    """
+    latency_ms = (time.perf_counter() - started) * 1000
+    if usage is None and isinstance(error, Exception):
+        prompt_tokens = completion_tokens = 0
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or count_tokens(prompt, MODEL)
+        completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(completion, MODEL)
+    record_ai_call(kind, MODEL, prompt_tokens, completion_tokens, latency_ms, error=error)
+    if trace_span is not None:
+        trace_span.set_attribute("gen_ai.usage.input_tokens", prompt_tokens)
+        trace_span.set_attribute("gen_ai.usage.output_tokens", completion_tokens)
+    extra = ""
+    if stats and stats["compacted"]:
+        extra = f" (payload compacted {stats['raw_tokens']} -> {stats['tokens']} tokens)"
+    if error is not None:
+        extra += f" error={type(error).__name__}"
+    logger.info("AI call kind=%s model=%s prompt_tokens=%d completion_tokens=%d latency_ms=%.0f%s",
+                kind, MODEL, prompt_tokens, completion_tokens, latency_ms, extra)
+
+
+_client: Optional[AsyncOpenAI] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _get_client() -> AsyncOpenAI:
     """
-    Ask GPT-4 for a recommendation. Preserves the original model+API,
-    but runs the blocking call off the event loop to avoid starving it.
+    Process-wide client, created on first use (so imports work without a key).
+    Its pooled connections belong to the event loop that opened them, so a
+    call from another loop (e.g. a job run with asyncio.run) gets a new client.
     """
-    import asyncio
+    global _client, _client_loop
+    loop = _running_loop()
+    if _client is None or (loop is not None and _client_loop not in (None, loop)):
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=OPENAI_TIMEOUT_SECONDS,
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+    if loop is not None:
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Close the pooled HTTP connections (app shutdown, end of a scheduler job)."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.close()
+        _client = _client_loop = None
+
 
-    prompt = _build_prompt(campaign_data)
+def _span_attributes(kind: str) -> Dict[str, Any]:
+    return {"gen_ai.system": "openai", "gen_ai.request.model": MODEL, "ai.kind": kind}
 
-    def _call_sync() -> str:
-        resp = openai.ChatCompletion.create(
-            model="gpt-4",
+
+async def _complete(prompt: str, stats: Optional[CompactionStats] = None, kind: str = "single") -> str:
+    """Single chat completion."""
+    with span(f"ai.{kind}", **_span_attributes(kind)) as current:
+        started = time.perf_counter()
+        try:
+            resp = await _get_client().chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+            )
+        except Exception as exc:
+            _finish_call(kind, started, prompt, None, "", stats, error=exc, trace_span=current)
+            raise
+        text = resp.choices[0].message.content or ""
+        _finish_call(kind, started, prompt, getattr(resp, "usage", None), text, stats, trace_span=current)
+        return text
+
+
+async def _stream(prompt: str, stats: Optional[CompactionStats] = None) -> AsyncIterator[str]:
+    """Chat completion streamed as text deltas, as the model produces them."""
+    # Not made current: the context must not be attached across yields.
+    current = start_span("ai.stream", **_span_attributes("stream"))
+    started = time.perf_counter()
+    parts: List[str] = []
+    usage = None
+    error: Optional[BaseException] = None
+    try:
+        stream = await _get_client().chat.completions.create(
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True},
         )
-        return resp.choices[0].message["content"]  # type: ignore[index]
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage  # sent with the final, choice-less chunk
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except BaseException as exc:  # also GeneratorExit/CancelledError of an abandoned stream
+        error = exc
+        raise
+    finally:
+        _finish_call("stream", started, prompt, usage, "".join(parts), stats, error=error, trace_span=current)
+        end_span(current, error)
+
+
+async def recommend_action(campaign_data: Any) -> str:
+    """Ask GPT-4 for a recommendation (full text)."""
+    return await _complete(*prepare_prompt(campaign_data))
+
+
+def stream_recommendation(campaign_data: Any) -> AsyncIterator[str]:
+    """Same prompt as `recommend_action`, streamed token by token."""
+    return _stream(*prepare_prompt(campaign_data))
+
+
+def stream_portfolio_recommendation(campaigns: Sequence[Mapping[str, Any]]) -> AsyncIterator[str]:
+    """Portfolio-wide recommendation over many campaigns, streamed token by token."""
+    return _stream(*prepare_portfolio_prompt(campaigns))
+
+
+# Batch engine -----------------------------------------------------------------
+
+def campaign_features(campaign: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Compact, deterministic summary of one campaign for the batch prompt:
+    id/name/objective, rounded numeric KPIs and adset/ad counts instead of
+    the raw nested structure. In the `/campaigns` tree (adsets, no `roas`)
+    `revenue` is a ROAS value (see ads_api.fetch_campaigns) and maps to `roas`.
+    """
+    features: Dict[str, Any] = {"id": str(campaign.get("id", ""))}
+    for key in ("name", "objective"):
+        if campaign.get(key):
+            features[key] = campaign[key]
+    numeric = dict(campaign)
+    if "adsets" in numeric and "roas" not in numeric:
+        numeric["roas"] = numeric.pop("revenue", None)
+    for key in _NUMERIC_FEATURES:
+        value = numeric.get(key)
+        if isinstance(value, (int, float)):
+            features[key] = round(float(value), 3)
+    adsets = campaign.get("adsets")
+    if isinstance(adsets, list):
+        features["adsets"] = len(adsets)
+        features["ads"] = sum(len(a.get("ads", []) or []) for a in adsets)
+    return features
+
+
+def _features_key(features: Mapping[str, Any]) -> str:
+    raw = json.dumps(features, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class _TTLCache:
+    """Small in-process cache with per-entry expiry and a size cap (oldest evicted)."""
+
+    def __init__(self, ttl: float, max_entries: int = 10_000) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if len(self._items) >= self.max_entries:
+            self._items.pop(next(iter(self._items)))
+        self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_cache = _TTLCache(CACHE_TTL_SECONDS)
+
+
+def _build_batch_prompt(features: Sequence[Mapping[str, Any]]) -> str:
+    payload = json.dumps(list(features), ensure_ascii=False, separators=(",", ":"))
+    return f"""
+Zde jsou souhrnná data kampaní (JSON, jedna položka = jedna kampaň):
+{payload}
+
+Pro každou kampaň navrhni, zda škálovat, pauznout nebo nechat být, a stručně vysvětli proč.
+Odpověz pouze JSON objektem ve tvaru:
+{{"recommendations": [{{"campaign_id": "<id>", "action": "scale|pause|keep", "reason": "<krátké zdůvodnění>"}}]}}
+""".strip()
+
+
+def _parse_batch_response(text: str, expected_ids: Iterable[str]) -> Dict[str, Recommendation]:
+    """Parse the model's JSON; unknown ids and invalid actions are dropped."""
+    # Tolerate code fences / prose around the JSON object.
+    try:
+        data = json.loads(text[text.find("{"): text.rfind("}") + 1])
+    except ValueError:
+        return {}
+
+    expected = set(expected_ids)
+    out: Dict[str, Recommendation] = {}
+    items = data.get("recommendations") if isinstance(data, dict) else None
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):  # stray strings / nulls in the model output
+            continue
+        cid = str(item.get("campaign_id", ""))
+        action = str(item.get("action", "")).lower()
+        if cid in expected and action in ACTIONS:
+            out[cid] = Recommendation(
+                campaign_id=cid, action=action, reason=str(item.get("reason", "")), source="llm"
+            )
+    return out
+
+
+async def recommend_actions_batch(
+    campaigns: Iterable[Mapping[str, Any]],
+    batch_size: int = BATCH_SIZE,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> Dict[str, Recommendation]:
+    """
+    Recommendations for many campaigns with few LLM calls.
+
+    Campaigns are reduced to `campaign_features`, cached results (keyed by a
+    hash of those features) are reused, and the rest are packed `batch_size`
+    per prompt and sent concurrently, at most `max_concurrency` at a time.
+    Campaigns the model did not answer for (or whose batch failed) are missing
+    from the result; if every batch fails, the first error is raised.
+    """
+    results: Dict[str, Recommendation] = {}
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+    for campaign in campaigns:
+        features = campaign_features(campaign)
+        key = _features_key(features)
+        cached = _cache.get(key)
+        if cached is not None:
+            results[features["id"]] = cached
+            record_ai_call("batch", MODEL, cache_hit=True)
+        else:
+            pending.append((key, features))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        async with semaphore:
+            text = await _complete(_build_batch_prompt([f for _, f in batch]), kind="batch")
+        parsed = _parse_batch_response(text, (f["id"] for _, f in batch))
+        for key, features in batch:
+            rec = parsed.get(features["id"])
+            if rec is not None:
+                _cache.set(key, rec)
+                results[features["id"]] = rec
 
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _call_sync)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    outcomes = await asyncio.gather(*(_run_batch(b) for b in batches), return_exceptions=True)
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors and len(errors) == len(batches):
+        raise errors[0]
+    return results
@@ -1,10 +1,33 @@
 # backend/database.py
+"""
+Async engine/session setup.
+
+Engine options come from the environment (defaults in parentheses):
+- DB_ECHO (false): log every SQL statement; debugging only.
+- DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s),
+  DB_POOL_RECYCLE (1800 s): connection pool sizing, server databases only.
+- DB_POOL_PRE_PING (true): check a pooled connection before handing it out.
+- DB_QUERY_CACHE_SIZE (500): SQLAlchemy compiled-statement cache.
+- DB_PREPARED_STATEMENT_CACHE_SIZE (100): asyncpg prepared statements per
+  connection; set 0 behind PgBouncer in transaction mode.
+
+Optional read replica:
+- DATABASE_READ_URL: replica for read-only dashboard queries
+  (`get_read_session`); writes always use DATABASE_URL.
+- DB_REPLICA_MAX_LAG_SECONDS (30): reads fall back to the primary while the
+  replica lags more than this (or is unreachable).
+- DB_REPLICA_CHECK_SECONDS (5): how long a lag check result is reused.
+"""
+
 from __future__ import annotations
 
 import os
-from typing import AsyncGenerator
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
 
@@ -15,22 +38,138 @@ if not DATABASE_URL:
     # Keep lazy failure for import-time, but DB init will error clearly.
     pass
 
-# Preserve echo=True to maintain original logging behavior.
-engine = create_async_engine(DATABASE_URL or "sqlite+aiosqlite://", echo=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    return int(raw) if raw else default
+
+
+def engine_settings(url: str) -> Dict[str, Any]:
+    """
+    create_async_engine kwargs (including `url`) for `url`. Pool options are only
+    set for server databases; SQLite keeps SQLAlchemy's default pool.
+    """
+    parsed = make_url(url)
+    options: Dict[str, Any] = {
+        "echo": _env_bool("DB_ECHO", False),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "query_cache_size": _env_int("DB_QUERY_CACHE_SIZE", 500),
+    }
+    if parsed.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=_env_int("DB_POOL_SIZE", 5),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        )
+    if parsed.get_driver_name() == "asyncpg" and "prepared_statement_cache_size" not in parsed.query:
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(_env_int("DB_PREPARED_STATEMENT_CACHE_SIZE", 100))}
+        )
+    return {"url": parsed, **options}
+
+
+def describe_engine_settings(settings: Dict[str, Any]) -> str:
+    """One-line summary of the effective settings, with the password masked."""
+    parts = [f"url={settings['url'].render_as_string(hide_password=True)}"]
+    parts += [f"{k}={v}" for k, v in settings.items() if k != "url"]
+    return " ".join(parts)
+
+
+_settings = engine_settings(DATABASE_URL or "sqlite+aiosqlite://")
+engine = create_async_engine(**_settings)
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+REPLICA_MAX_LAG_SECONDS = _env_int("DB_REPLICA_MAX_LAG_SECONDS", 30)
+REPLICA_CHECK_SECONDS = _env_int("DB_REPLICA_CHECK_SECONDS", 5)
+
+read_engine: Optional[AsyncEngine] = (
+    create_async_engine(**engine_settings(DATABASE_READ_URL)) if DATABASE_READ_URL else None
+)
+ReadSessionLocal = (
+    sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False) if read_engine else SessionLocal
+)
+
+# Zero when the replica has replayed everything the primary had written when
+# it was asked (so an idle primary does not look like growing lag, and a
+# replica whose WAL receiver is disconnected is not mistaken for caught up),
+# else the age of the last replayed transaction (NULL if none yet). Zero on
+# a primary.
+PRIMARY_LSN_SQL = "SELECT pg_current_wal_lsn()::text"
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_replay_lsn() >= CAST(:primary_lsn AS pg_lsn) THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_replica_state: Dict[str, Any] = {"checked_at": None, "usable": False}
+
+
+async def replica_lag_seconds(replica: AsyncEngine, primary: Optional[AsyncEngine] = None) -> float:
+    """Replication lag of `replica` behind `primary` (default: the main engine); inf if unknown."""
+    if replica.dialect.name != "postgresql":
+        return 0.0
+    async with (primary or engine).connect() as conn:
+        primary_lsn = (await conn.execute(text(PRIMARY_LSN_SQL))).scalar()
+    async with replica.connect() as conn:
+        lag = (await conn.execute(text(REPLICA_LAG_SQL), {"primary_lsn": primary_lsn})).scalar()
+    return float("inf") if lag is None else float(lag)
+
+
+async def replica_usable() -> bool:
+    """Whether reads may go to the replica; the lag check is cached for REPLICA_CHECK_SECONDS."""
+    if read_engine is None:
+        return False
+    now = time.monotonic()
+    checked_at = _replica_state["checked_at"]
+    if checked_at is not None and now - checked_at < REPLICA_CHECK_SECONDS:
+        return _replica_state["usable"]
+    try:
+        lag = await replica_lag_seconds(read_engine)
+        usable = lag <= REPLICA_MAX_LAG_SECONDS
+        if not usable:
+            print(f"Read replica lags {lag:.1f} s; reading from the primary.")
+    except Exception as exc:
+        print("Error checking read replica:", repr(exc))
+        usable = False
+    _replica_state.update(checked_at=now, usable=usable)
+    return usable
+
 
 async def init_db() -> None:
-    """Create all tables on startup (same behavior as before)."""
+    """
+    Startup check that the schema is migrated (one query; safe with many
+    workers). Schema changes are applied by `python -m backend.migrations`.
+    """
     if not DATABASE_URL:
         # Fail clearly if DB URL is missing; otherwise run_sync will still attempt sqlite.
         raise RuntimeError("DATABASE_URL is not set.")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    print("Database engine:", describe_engine_settings(_settings))
+    from backend.migrations import check_schema
+
+    await check_schema(engine)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Yield an AsyncSession (optional helper; not required by the current app)."""
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only queries: the replica when configured and fresh
+    enough, else the primary. Never write through it.
+    """
+    factory = ReadSessionLocal if await replica_usable() else SessionLocal
+    async with factory() as session:
+        yield session
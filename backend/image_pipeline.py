@@ -0,0 +1,166 @@
+# backend/image_pipeline.py
+"""
+Optional image preprocessing in front of `upload_ad_image`.
+
+Originals (often 10–20 MB camera files) are downscaled to Meta's recommended
+feed/story sizes, stripped of metadata, re-encoded as an optimized JPEG/WebP
+and get a small thumbnail. Pillow work is CPU-bound, so it runs in a
+ProcessPoolExecutor and never blocks the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple, TypedDict
+
+from PIL import Image, ImageOps
+
+# Meta's recommended image sizes (width, height) keyed by placement ratio.
+# The source is matched to the closest aspect ratio and scaled to fit inside it.
+META_RECOMMENDED_SIZES: Dict[str, Tuple[int, int]] = {
+    "square": (1080, 1080),   # 1:1 feed
+    "portrait": (1080, 1350),  # 4:5 feed
+    "story": (1080, 1920),    # 9:16 stories / reels
+    "landscape": (1200, 628),  # 1.91:1 link ads
+}
+
+THUMBNAIL_SIZE: Tuple[int, int] = (320, 320)
+
+_FORMATS: Dict[str, Tuple[str, str]] = {
+    # fmt -> (file extension, mime type)
+    "JPEG": (".jpg", "image/jpeg"),
+    "WEBP": (".webp", "image/webp"),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class PreprocessedImage(TypedDict):
+    path: str
+    thumbnail_path: str
+    mime_type: str
+    placement: str
+    width: int
+    height: int
+    original_bytes: int
+    bytes: int
+
+
+def _closest_placement(width: int, height: int) -> str:
+    ratio = width / height if height else 1.0
+    return min(
+        META_RECOMMENDED_SIZES,
+        key=lambda k: abs(META_RECOMMENDED_SIZES[k][0] / META_RECOMMENDED_SIZES[k][1] - ratio),
+    )
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Return an RGB copy; transparent areas are composited on white (JPEG has no alpha)."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _save(img: Image.Image, path: str, fmt: str, quality: int) -> None:
+    # No `exif=`/`icc_profile=` arguments -> metadata is not written out.
+    if fmt == "WEBP":
+        img.save(path, "WEBP", quality=quality, method=6)
+    else:
+        img.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+
+
+def preprocess_image(
+    src_path: str,
+    out_dir: str,
+    fmt: str = "JPEG",
+    quality: int = 85,
+    thumb_dir: Optional[str] = None,
+) -> PreprocessedImage:
+    """
+    Resize, strip metadata and re-encode `src_path` into `out_dir`.
+    The thumbnail goes to `thumb_dir` (defaults to `out_dir`), named by the
+    source's content hash so uploads with the same file name do not collide.
+    Oversized images (Pillow decompression bombs) raise ValueError.
+    Synchronous and picklable so it can run inside a worker process.
+    """
+    fmt = fmt.upper()
+    if fmt not in _FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    ext, mime = _FORMATS[fmt]
+
+    thumb_dir = thumb_dir or out_dir
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(thumb_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    out_path = os.path.join(out_dir, f"{stem}{ext}")
+    thumb_path = os.path.join(thumb_dir, f"{_content_hash(src_path)}_thumb{ext}")
+
+    try:
+        with Image.open(src_path) as src:
+            # Bake EXIF orientation into pixels before the EXIF block is dropped.
+            img = _flatten(ImageOps.exif_transpose(src))
+    except Image.DecompressionBombError as exc:
+        raise ValueError(str(exc)) from exc
+
+    placement = _closest_placement(*img.size)
+    img.thumbnail(META_RECOMMENDED_SIZES[placement], Image.Resampling.LANCZOS)  # never upscales
+    _save(img, out_path, fmt, quality)
+
+    thumb = img.copy()
+    thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    _save(thumb, thumb_path, fmt, quality)
+
+    return PreprocessedImage(
+        path=out_path,
+        thumbnail_path=thumb_path,
+        mime_type=mime,
+        placement=placement,
+        width=img.width,
+        height=img.height,
+        original_bytes=os.path.getsize(src_path),
+        bytes=os.path.getsize(out_path),
+    )
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = int(os.getenv("IMAGE_PIPELINE_WORKERS", "0")) or None  # None -> CPU count
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+async def preprocess_image_async(
+    src_path: str,
+    out_dir: str,
+    fmt: str = "JPEG",
+    quality: int = 85,
+    thumb_dir: Optional[str] = None,
+) -> PreprocessedImage:
+    """Run `preprocess_image` in the shared process pool."""
+    loop = asyncio.get_running_loop()
+    job = functools.partial(preprocess_image, src_path, out_dir, fmt, quality, thumb_dir)
+    return await loop.run_in_executor(_get_executor(), job)
+
+
+def shutdown_executor() -> None:
+    """Stop the worker processes (called on app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,99 @@
+# backend/kpi.py
+"""
+Vectorized KPI aggregation over daily insight rows.
+
+Rows (see `ads_api.InsightRow`) are loaded once into a typed pandas frame and
+aggregated with a single group-by; derived ratios are computed column-wise
+with NumPy, so cost is dominated by the group-by itself, not Python loops.
+
+Derived KPIs:
+- roas = revenue / spend
+- cpa  = spend / conversions
+- ctr  = clicks / impressions * 100 (percent, same unit as Graph's `ctr`)
+A ratio with a zero denominator is reported as 0.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns a caller may group by ("month" is derived from "date").
+DIMENSIONS = ("account_id", "campaign_id", "objective", "date", "month")
+METRICS = ("spend", "revenue", "impressions", "clicks", "conversions")
+KPIS = ("roas", "cpa", "ctr")
+
+_ID_COLUMNS = ("account_id", "campaign_id", "objective")
+
+
+def insights_frame(rows: Iterable[Mapping[str, Any]]) -> pd.DataFrame:
+    """Build a typed frame (categorical ids, datetime dates, float metrics) from insight rows."""
+    df = pd.DataFrame.from_records(list(rows), columns=[*_ID_COLUMNS, "date", *METRICS])
+    return normalize_frame(df)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce an insights-shaped frame to the dtypes `aggregate_kpis` expects."""
+    df = df.copy()
+    for col in _ID_COLUMNS:
+        df[col] = df[col].fillna("").astype("category")
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    for col in METRICS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype("float64")
+    return df
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    out = np.zeros_like(num, dtype="float64")
+    np.divide(num, den, out=out, where=den > 0)
+    return out * scale
+
+
+def add_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    """Add roas/cpa/ctr columns computed from summed metric columns."""
+    spend = df["spend"].to_numpy(dtype="float64")
+    df["roas"] = _ratio(df["revenue"].to_numpy(dtype="float64"), spend)
+    df["cpa"] = _ratio(spend, df["conversions"].to_numpy(dtype="float64"))
+    df["ctr"] = _ratio(
+        df["clicks"].to_numpy(dtype="float64"), df["impressions"].to_numpy(dtype="float64"), 100.0
+    )
+    return df
+
+
+def aggregate_kpis(df: pd.DataFrame, group_by: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Sum metrics per `group_by` dimensions and derive KPIs.
+    An empty `group_by` returns a single totals row.
+    """
+    unknown = [g for g in group_by if g not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by dimension(s): {', '.join(unknown)}")
+
+    if "month" in group_by:
+        df = df.assign(month=df["date"].dt.to_period("M"))
+
+    if not group_by:
+        totals = df[list(METRICS)].sum().to_frame().T
+        return add_kpis(totals.astype("float64"))
+
+    grouped = (
+        df.groupby(list(group_by), observed=True, sort=True)[list(METRICS)]
+        .sum()
+        .reset_index()
+    )
+    return add_kpis(grouped)
+
+
+def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-friendly records (dates as YYYY-MM-DD, months as YYYY-MM)."""
+    out = df.copy()
+    if "date" in out:
+        out["date"] = out["date"].dt.strftime("%Y-%m-%d")
+    if "month" in out:
+        out["month"] = out["month"].astype(str)
+    for col in _ID_COLUMNS:
+        if col in out:
+            out[col] = out[col].astype(str)
+    return out.to_dict(orient="records")
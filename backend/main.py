@@ -1,28 +1,176 @@
 # backend/main.py
 from __future__ import annotations
 
+import asyncio
+import datetime as dt
 import os
-from typing import Any, Dict, List
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, File, Form, UploadFile
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.actions import execute_actions, list_audit
 from backend.ads_api import (
     create_ad,
     create_adcreative,
     create_adset,
     create_campaign,
     fetch_campaigns,
+    fetch_insights,
     upload_ad_image,
 )
-from backend.database import init_db
+from backend.ai_engine import (
+    close_client,
+    recommend_actions_batch,
+    stream_portfolio_recommendation,
+    stream_recommendation,
+)
+from backend import metrics, tracing
+from backend.database import SessionLocal, engine, get_read_session, get_session, init_db, read_engine
+from backend.image_pipeline import preprocess_image_async, shutdown_executor
+from backend.kpi import DIMENSIONS, aggregate_kpis, insights_frame, to_records
+from backend.recommendations import STATUSES, launch_recommendation, list_recommendations, set_status
+from backend.repository import load_account_tree
+from backend.rollups import campaign_totals, monthly_totals
+from backend.rules_engine import RuleThresholds, recommend_campaigns
+from backend.telemetry import ai_stats, flush_pending, flush_periodically
+from backend.tenancy import (
+    ACCOUNT_HEADER,
+    API_KEY_HEADER,
+    DEFAULT_ACCOUNT,
+    TENANT_HEADER,
+    authenticate,
+    client_pool,
+    current_tenant,
+    resolve_token,
+    tenant_scope,
+)
 
 app = FastAPI(title="Madgicx MVP Backend")
 
+# Where preprocessed upload thumbnails are kept (the optimized image itself is temporary).
+IMAGE_THUMBNAIL_DIR = os.getenv("IMAGE_THUMBNAIL_DIR", os.path.join("media", "thumbnails"))
+
+
+_background_tasks: List[asyncio.Task] = []
+
+for _engine in (engine, read_engine):
+    if _engine is not None:
+        metrics.instrument_engine(_engine)
+        tracing.instrument_engine(_engine)
+
 
 @app.on_event("startup")
 async def startup_event() -> None:
+    tracing.setup_tracing()
     await init_db()
+    _background_tasks.append(asyncio.create_task(flush_periodically(SessionLocal)))
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    shutdown_executor()
+    await close_client()
+    await client_pool.aclose()
+    try:
+        async with SessionLocal() as session:
+            await flush_pending(session)
+    except Exception as exc:
+        print("Error flushing AI telemetry:", repr(exc))
+    tracing.shutdown_tracing()
+
+
+@app.middleware("http")
+async def tenant_context(request: Request, call_next):
+    """
+    Requests with an `X-Tenant-ID` header (optionally `X-Ad-Account-ID`) and
+    one of that tenant's API keys in `X-Tenant-Key` run their Graph API calls
+    with the tenant's stored token, rate limiter and client pool (401 without a
+    valid key). Without the header the global META_ACCESS_TOKEN is used.
+    """
+    tenant_id = request.headers.get(TENANT_HEADER)
+    if not tenant_id:
+        return await call_next(request)
+    account_id = request.headers.get(ACCOUNT_HEADER)
+    try:
+        async with SessionLocal() as session:
+            if not await authenticate(session, tenant_id, request.headers.get(API_KEY_HEADER)):
+                return JSONResponse(status_code=401, content={"detail": "Invalid or missing tenant API key"})
+            token = await resolve_token(session, tenant_id, account_id)
+    except RuntimeError as exc:  # token store misconfigured (no key / cryptography)
+        return JSONResponse(status_code=500, content={"detail": str(exc)})
+    if token is None:
+        return JSONResponse(status_code=404, content={"detail": f"Unknown tenant {tenant_id}"})
+    with tenant_scope(tenant_id, token, account_id or DEFAULT_ACCOUNT):
+        return await call_next(request)
+
+
+async def global_data_only() -> None:
+    """
+    Dependency of the endpoints over stored data. The database holds the global
+    account only (the scheduler ingests with META_ACCESS_TOKEN), so tenant
+    requests are refused rather than shown another business's data.
+    """
+    if current_tenant.get() is not None:
+        raise HTTPException(status_code=403, detail="Stored data is not available to tenant requests")
+
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """
+    Root span per request, named after the route template once routing is done.
+    Graph, DB and AI spans of the request nest under it; it ends after the
+    response body is sent, so SSE streams are covered end to end.
+    """
+    current, token = tracing.start_request_span(request.method, request.url.path, request.headers)
+    try:
+        response = await call_next(request)
+    except Exception as exc:
+        tracing.end_span(current, exc)
+        raise
+    finally:
+        tracing.detach(token)
+    route = request.scope.get("route")
+    if route is not None:
+        current.update_name(f"http {request.method} {route.path}")
+        current.set_attribute("http.route", route.path)
+    current.set_attribute("http.response.status_code", response.status_code)
+    response.body_iterator = tracing.end_after(current, response.body_iterator)
+    return response
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """
+    Latency per route template (not raw path) and requests in flight. Registered
+    last, so it is the outermost middleware and also times rejected requests.
+    """
+    metrics.HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        metrics.HTTP_LATENCY.labels(
+            method=request.method, route=getattr(route, "path", "unmatched"), status=status,
+        ).observe(time.perf_counter() - started)
+
+
+@app.get("/internal/metrics", tags=["internal"], include_in_schema=False)
+async def internal_metrics() -> PlainTextResponse:
+    """Prometheus text exposition of this process's metrics (see backend.metrics)."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # ------------------------------------------------------------------------------
@@ -38,6 +186,261 @@ async def get_campaigns(include_insights: bool = False) -> List[Dict[str, Any]]:
     return await fetch_campaigns(include_insights=include_insights)
 
 
+@app.get("/campaigns/stored", tags=["campaigns"], dependencies=[Depends(global_data_only)])
+async def get_stored_campaigns(
+    account_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[Dict[str, Any]]:
+    """Same shape as `/campaigns`, served from the synced entity tables instead of the Graph API."""
+    return await load_account_tree(session, account_id)
+
+
+@app.get("/metrics", tags=["campaigns"])
+async def get_metrics(
+    group_by: str = "account_id",
+    date_preset: str = "last_30d",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    KPIs (spend, revenue, ROAS, CPA, CTR) aggregated from daily campaign insights.
+    - `group_by`: comma-separated subset of account_id, campaign_id, objective, date, month
+      (empty string = totals only).
+    - `since`/`until` (YYYY-MM-DD) override `date_preset`.
+    """
+    dims = [d.strip() for d in group_by.split(",") if d.strip()]
+    unknown = [d for d in dims if d not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimension(s): {', '.join(unknown)}")
+
+    rows = await fetch_insights(date_preset=date_preset, since=since, until=until)
+    df = insights_frame(rows)
+    grouped = aggregate_kpis(df, dims)
+    return {
+        "group_by": dims,
+        "rows": to_records(grouped),
+        "totals": to_records(aggregate_kpis(df))[0],
+    }
+
+
+# ------------------------------------------------------------------------------
+# Rollups (stored insights)
+# ------------------------------------------------------------------------------
+
+@app.get("/rollups/monthly", tags=["rollups"], dependencies=[Depends(global_data_only)])
+async def get_monthly_rollup(
+    month: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> Dict[str, Any]:
+    """
+    Spend/revenue/ROAS for one month ("YYYY-MM", default current), overall and per account.
+    Served from the account/month rollup.
+    """
+    return await monthly_totals(session, month)
+
+
+@app.get("/rollups/campaigns", tags=["rollups"], dependencies=[Depends(global_data_only)])
+async def get_campaign_rollup(
+    since: Optional[dt.date] = None,
+    until: Optional[dt.date] = None,
+    account_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[Dict[str, Any]]:
+    """Per-campaign totals over an inclusive date window, served from the campaign/day rollup."""
+    return await campaign_totals(session, since, until, account_id)
+
+
+# ------------------------------------------------------------------------------
+# AI recommendations
+# ------------------------------------------------------------------------------
+
+@app.get("/recommendations", tags=["ai"], dependencies=[Depends(global_data_only)])
+async def api_list_recommendations(
+    status: str = "new",
+    limit: int = 20,
+    offset: int = 0,
+    session: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """
+    Precomputed recommendations (filled by the scheduler), highest score first.
+    Returns `{items, total, limit, offset}`.
+    """
+    if status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(STATUSES)}")
+    if not 1 <= limit <= 200 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-200 and offset >= 0")
+    return await list_recommendations(session, status, limit, offset)
+
+
+class RecommendationStatusRequest(BaseModel):
+    status: str
+
+
+@app.patch("/recommendations/{recommendation_id}", tags=["ai"], dependencies=[Depends(global_data_only)])
+async def api_update_recommendation(
+    recommendation_id: int,
+    request: RecommendationStatusRequest,
+    session: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """Mark a recommendation as `launched` or `dismissed`."""
+    try:
+        rec = await set_status(session, recommendation_id, request.status)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+    await session.commit()
+    return rec
+
+
+@app.post("/recommendations/{recommendation_id}/launch", tags=["ai"], dependencies=[Depends(global_data_only)])
+async def api_launch_recommendation(
+    recommendation_id: int,
+    session: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """Apply a stored recommendation on Meta (pause / scale budget) and mark it launched."""
+    try:
+        outcome = await launch_recommendation(session, recommendation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if outcome is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+    await session.commit()
+    return outcome
+
+
+@app.get("/ai/stats", tags=["ai"], dependencies=[Depends(global_data_only)])
+async def api_ai_stats(days: int = 7, session: AsyncSession = Depends(get_session)) -> Dict[str, Any]:
+    """
+    LLM call telemetry for the last `days` days: p50/p95 latency, error classes,
+    cache hit rate and daily prompt/completion tokens with estimated cost.
+    """
+    if not 1 <= days <= 365:
+        raise HTTPException(status_code=400, detail="days must be 1-365")
+    try:
+        await flush_pending(session)
+    except Exception as exc:  # stats are still useful without the latest calls
+        print("Error flushing AI telemetry:", repr(exc))
+    return await ai_stats(session, days)
+
+
+class BatchRecommendationRequest(BaseModel):
+    campaigns: List[Dict[str, Any]]
+
+
+@app.post("/recommendations/batch", tags=["ai"])
+async def api_recommend_batch(request: BatchRecommendationRequest) -> Dict[str, Any]:
+    """
+    Scale/pause/keep recommendations for many campaigns (campaign dicts as in /campaigns),
+    batched into few LLM calls and cached by campaign features.
+    """
+    return {"recommendations": await recommend_actions_batch(request.campaigns)}
+
+
+@app.get("/recommendations/evaluate", tags=["ai"])
+async def api_recommend_evaluate() -> Dict[str, Any]:
+    """
+    Recommendations for every campaign: clear scale/pause cases are decided by
+    threshold rules (RULES_* env), only the ambiguous rest goes to the LLM.
+    """
+    thresholds = RuleThresholds.from_env()
+    until = dt.date.today()
+    since = until - dt.timedelta(days=thresholds.window_days - 1)
+    rows = await fetch_insights(since=since.isoformat(), until=until.isoformat())
+    recommendations = await recommend_campaigns(rows, thresholds, as_of=until)
+    by_source = {"rules": 0, "llm": 0}
+    for rec in recommendations.values():
+        by_source[rec["source"]] += 1
+    return {"recommendations": recommendations, "by_source": by_source}
+
+
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    """One Server-Sent Event; multi-line data is split into several `data:` lines."""
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+@app.get("/recommendations/stream", tags=["ai"], dependencies=[Depends(global_data_only)])
+async def api_recommend_stream(
+    campaign_id: Optional[str] = None,
+    days: int = 7,
+    session: AsyncSession = Depends(get_read_session),
+) -> StreamingResponse:
+    """
+    AI recommendation streamed as Server-Sent Events while it is generated.
+    Input is the stored per-campaign totals of the last `days` days: one campaign
+    with `campaign_id`, otherwise all of them with a portfolio prompt. Text arrives
+    as default `message` events, followed by a final `done` event (or an `error` event).
+    """
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be >= 1")
+    until = dt.date.today()
+    campaigns = await campaign_totals(session, since=until - dt.timedelta(days=days - 1), until=until)
+    if campaign_id is not None:
+        campaigns = [c for c in campaigns if c["campaign_id"] == campaign_id]
+        if not campaigns:
+            raise HTTPException(status_code=404, detail=f"No stored insights for campaign {campaign_id}")
+
+    if campaign_id is not None:
+        deltas = stream_recommendation(campaigns[0])
+    else:
+        deltas = stream_portfolio_recommendation(campaigns)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for delta in deltas:
+                yield _sse_event(delta)
+        except Exception as exc:  # the response has started; report in-band
+            yield _sse_event(str(exc), event="error")
+            return
+        yield _sse_event("", event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ------------------------------------------------------------------------------
+# Actions (bulk status / budget changes)
+# ------------------------------------------------------------------------------
+
+class ExecuteActionsRequest(BaseModel):
+    actions: List[Dict[str, Any]]
+    recommendation_id: Optional[int] = None
+
+
+@app.post("/actions/execute", tags=["actions"])
+async def api_execute_actions(
+    request: ExecuteActionsRequest,
+    session: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """
+    Apply pause / scale_budget / reallocate actions via Graph batch requests.
+    Every change is audited with its before/after value; per-change results
+    are returned (partial failures do not fail the request).
+    """
+    try:
+        outcome = await execute_actions(session, request.actions, request.recommendation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    await session.commit()
+    return outcome
+
+
+@app.get("/actions/audit", tags=["actions"], dependencies=[Depends(global_data_only)])
+async def api_actions_audit(
+    execution_id: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    session: AsyncSession = Depends(get_session),
+) -> List[Dict[str, Any]]:
+    """Audit log of applied actions, newest first."""
+    return await list_audit(session, execution_id, min(max(limit, 1), 1000), max(offset, 0))
+
+
 class CampaignCreateRequest(BaseModel):
     account_id: str
     name: str
@@ -147,9 +550,14 @@ async def api_create_ad(req: AdCreateRequest) -> Dict[str, Any]:
 async def api_upload_ad_image(
     account_id: str = Form(...),
     file: UploadFile = File(...),
+    preprocess: bool = Form(False),
+    output_format: str = Form("JPEG"),
 ) -> Dict[str, Any]:
     """
     Upload image to the ad account library and return Graph response (image hash).
+    - `preprocess`: resize to Meta's recommended size, strip metadata and re-encode
+      (`output_format` JPEG or WEBP) in a worker process before uploading.
+      Adds a `preprocessing` key with sizes and the thumbnail path to the response.
     """
     # Store temporarily on disk; keep original approach and filename behavior.
     file_location = f"temp_{file.filename}"
@@ -157,7 +565,18 @@ async def api_upload_ad_image(
         f.write(await file.read())
 
     try:
-        result = await upload_ad_image(account_id, file_location)
+        if not preprocess:
+            return await upload_ad_image(account_id, file_location)
+
+        with tempfile.TemporaryDirectory(prefix="adimg_") as out_dir:
+            try:
+                processed = await preprocess_image_async(
+                    file_location, out_dir, fmt=output_format, thumb_dir=IMAGE_THUMBNAIL_DIR
+                )
+            except (OSError, ValueError) as exc:
+                # Same no-raise contract as the Graph helpers: report a JSON error.
+                return {"error": {"message": f"Image preprocessing failed: {exc}", "type": "image_error"}}
+            result = await upload_ad_image(account_id, processed["path"])
     finally:
         try:
             os.remove(file_location)
@@ -165,4 +584,12 @@ async def api_upload_ad_image(
             # Best-effort cleanup; do not change API behavior if deletion fails.
             pass
 
+    result["preprocessing"] = {
+        "original_bytes": processed["original_bytes"],
+        "bytes": processed["bytes"],
+        "width": processed["width"],
+        "height": processed["height"],
+        "placement": processed["placement"],
+        "thumbnail_path": processed["thumbnail_path"],
+    }
     return result
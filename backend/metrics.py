@@ -0,0 +1,168 @@
+# backend/metrics.py
+"""
+Process metrics in the Prometheus text exposition format (GET /internal/metrics),
+built on `prometheus_client` with a dedicated registry. Instrumented:
+- Graph API calls (ads_api `_get`/`_post`): requests, latency, error codes and
+  throttling responses per normalized path ("{id}/campaigns");
+- FastAPI routes (middleware in main): latency and in-flight requests per
+  route template;
+- DB statements (engine events): latency per statement type;
+- crawls in flight (fetch_campaigns / fetch_insights);
+- LLM calls: counters and the cache hit ratio from telemetry.registry,
+  collected at scrape time.
+
+Metrics are per process; with several workers, scrape each one.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import time
+from typing import Any, Callable, Iterator, Optional, TypeVar, Union
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend import telemetry
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+registry = CollectorRegistry()
+
+GRAPH_REQUESTS = Counter(
+    "graph_requests", "Graph API requests by method, normalized path and HTTP status.",
+    ("method", "path", "status"), registry=registry,
+)
+GRAPH_LATENCY = Histogram(
+    "graph_request_duration_seconds", "Graph API request latency.", ("method", "path"), registry=registry,
+)
+GRAPH_ERRORS = Counter(
+    "graph_errors", "Graph API error responses by Graph error code.", ("path", "code"), registry=registry,
+)
+GRAPH_THROTTLED = Counter(
+    "graph_throttle_events", "Graph API responses with a rate-limit error code.", ("path", "code"),
+    registry=registry,
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "FastAPI request latency by route template.", ("method", "route", "status"),
+    registry=registry,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "FastAPI requests being served.", registry=registry,
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement type.", ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=registry,
+)
+CRAWLS_IN_FLIGHT = Gauge(
+    "crawls_in_flight", "Graph API crawls currently running.", ("kind",), registry=registry,
+)
+
+
+# Graph API --------------------------------------------------------------------
+
+# Edge names ("campaigns", "adaccounts", "me"); anything else is an object id.
+_EDGE_SEGMENT = re.compile(r"^[a-z_]+$")
+
+
+def normalize_graph_path(path: str) -> str:
+    """Replace object ids with "{id}" to keep label cardinality bounded."""
+    segments = [s for s in path.strip("/").split("/") if s]
+    if not segments:
+        return "/"
+    return "/".join(s if _EDGE_SEGMENT.match(s) else "{id}" for s in segments)
+
+
+def observe_graph_request(
+    method: str,
+    path: str,
+    status: Union[int, str],
+    seconds: float,
+    error_code: Optional[Union[int, str]] = None,
+    throttled: bool = False,
+) -> None:
+    path = normalize_graph_path(path)
+    GRAPH_REQUESTS.labels(method=method, path=path, status=status).inc()
+    GRAPH_LATENCY.labels(method=method, path=path).observe(seconds)
+    if error_code is not None:
+        GRAPH_ERRORS.labels(path=path, code=error_code).inc()
+        if throttled:
+            GRAPH_THROTTLED.labels(path=path, code=error_code).inc()
+
+
+def tracks_crawl(kind: str) -> Callable[[F], F]:
+    """Decorator counting running calls of an async crawl function in `crawls_in_flight`."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with CRAWLS_IN_FLIGHT.labels(kind=kind).track_inprogress():
+                return await func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+# Database ---------------------------------------------------------------------
+
+def instrument_engine(engine: Union[AsyncEngine, Engine]) -> None:
+    """Time every statement on `engine` (idempotent)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if getattr(sync_engine, "_metrics_instrumented", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("_query_started")
+        if started:
+            operation = (statement.lstrip().split(None, 1) or ["OTHER"])[0].upper()
+            DB_LATENCY.labels(operation=operation).observe(time.perf_counter() - started.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time.
+        conn = exception_context.connection
+        started = conn.info.get("_query_started") if conn is not None else None
+        if started:
+            started.pop()
+
+    sync_engine._metrics_instrumented = True
+
+
+# Exposition -------------------------------------------------------------------
+
+class _AICollector:
+    """LLM call counters from telemetry.registry, read at scrape time."""
+
+    def collect(self) -> Iterator[Metric]:
+        snap = telemetry.registry.snapshot()
+        calls = snap["calls"]
+        yield CounterMetricFamily("ai_calls", "LLM calls, including batch cache hits.", value=calls)
+        yield CounterMetricFamily("ai_cache_hits", "LLM batch results served from the cache.",
+                                  value=snap["cache_hits"])
+        yield GaugeMetricFamily("ai_cache_hit_ratio", "Share of LLM calls served from the cache.",
+                                value=snap["cache_hits"] / calls if calls else 0.0)
+        tokens = CounterMetricFamily("ai_tokens", "LLM tokens by type.", labels=("type",))
+        tokens.add_metric(("prompt",), snap["prompt_tokens"])
+        tokens.add_metric(("completion",), snap["completion_tokens"])
+        yield tokens
+        errors = CounterMetricFamily("ai_errors", "Failed LLM calls by exception class.", labels=("error",))
+        for error, n in sorted(snap["errors"].items()):
+            errors.add_metric((error,), n)
+        yield errors
+
+
+registry.register(_AICollector())
+
+
+def render() -> str:
+    return generate_latest(registry).decode()
@@ -0,0 +1,344 @@
+# backend/migrations.py
+"""
+Versioned schema migrations.
+
+The applied version lives in the `schema_version` table (one row per applied
+migration). `migrate` applies the pending migrations in one transaction; on
+PostgreSQL it takes a transaction-level advisory lock first, so concurrent
+runs (e.g. several deploy jobs) serialize and the later ones find nothing to
+do. App startup only calls `check_schema`, a single query.
+
+Migrations are idempotent. The first one creates the baseline tables from a
+frozen definition (the schema as it was before versioning, not the current
+models), so its meaning never changes; every later schema change is its own
+migration and also runs on fresh databases. They add columns/indexes and
+tables to databases created by older `create_all` runs as well.
+
+Usage:
+    python -m backend.migrations          # apply pending migrations
+    python -m backend.migrations status   # print current/expected version
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import sys
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend import models
+from backend.partitions import PARTITIONED_TABLE, add_months, month_start, months_ahead, partition_ddl
+
+# Arbitrary constant identifying the migration lock in pg_advisory_xact_lock.
+ADVISORY_LOCK_KEY = 4_204_512_001
+
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# Idempotent building blocks ---------------------------------------------------
+
+def _add_column(conn: Connection, table: str, column: str) -> None:
+    """
+    Add a model column unless it exists. Only the type comes from the model;
+    the column is always added nullable (existing rows have no value).
+    """
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    col = models.Base.metadata.tables[table].c[column]
+    ddl_type = col.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl_type}'))
+
+
+def _create_index(conn: Connection, table: str, column: str) -> None:
+    """Create the model's `ix_<table>_<column>` index unless it exists."""
+    name = f"ix_{table}_{column}"
+    if name in {i["name"] for i in inspect(conn).get_indexes(table)}:
+        return
+    index = next(i for i in models.Base.metadata.tables[table].indexes if i.name == name)
+    index.create(conn)
+
+
+# Migrations -------------------------------------------------------------------
+
+# Migration 1: the schema as created by `create_all` before versioning, frozen
+# here. Do not edit; change the schema with a new migration instead.
+_baseline_metadata = MetaData()
+
+
+def _metric_columns() -> List[Column]:
+    return [
+        Column("spend", Float, nullable=False),
+        Column("revenue", Float, nullable=False),
+        Column("impressions", Integer, nullable=False),
+        Column("clicks", Integer, nullable=False),
+        Column("reach", Integer, nullable=False),
+        Column("conversions", Float, nullable=False),
+    ]
+
+
+Table(
+    "campaigns", _baseline_metadata,
+    Column("id", String, primary_key=True),
+    Column("name", String),
+    Column("objective", String),
+    Column("spend", Float),
+    Column("roas", Float),
+)
+Table(
+    "adsets", _baseline_metadata,
+    Column("id", String, primary_key=True),
+    Column("name", String),
+    Column("campaign_id", String, ForeignKey("campaigns.id"), nullable=False),
+)
+Table(
+    "ads", _baseline_metadata,
+    Column("id", String, primary_key=True),
+    Column("name", String),
+    Column("adset_id", String, ForeignKey("adsets.id"), nullable=False),
+)
+Table(
+    "insights", _baseline_metadata,
+    Column("ad_id", String, primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("adset_id", String),
+    Column("campaign_id", String, nullable=False, index=True),
+    Column("account_id", String, nullable=False, index=True),
+    Column("objective", String),
+    *_metric_columns(),
+)
+Table(
+    "rollup_campaign_daily", _baseline_metadata,
+    Column("campaign_id", String, primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("account_id", String, nullable=False, index=True),
+    *_metric_columns(),
+)
+Table(
+    "rollup_account_daily", _baseline_metadata,
+    Column("account_id", String, primary_key=True),
+    Column("date", Date, primary_key=True),
+    *_metric_columns(),
+)
+Table(
+    "rollup_account_monthly", _baseline_metadata,
+    Column("account_id", String, primary_key=True),
+    Column("month", String(7), primary_key=True),
+    *_metric_columns(),
+)
+Table(
+    "recommendations", _baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("campaign_id", String, nullable=False, index=True),
+    Column("account_id", String),
+    Column("campaign_name", String),
+    Column("action", String, nullable=False),
+    Column("rationale", Text, nullable=False),
+    Column("source", String, nullable=False),
+    Column("score", Float, nullable=False),
+    Column("status", String, nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True)),
+)
+Table(
+    "action_audit", _baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("execution_id", String(32), nullable=False, index=True),
+    Column("recommendation_id", Integer, ForeignKey("recommendations.id")),
+    Column("object_id", String, nullable=False, index=True),
+    Column("action", String, nullable=False),
+    Column("field", String, nullable=False),
+    Column("before_value", String),
+    Column("after_value", String),
+    Column("status", String, nullable=False),
+    Column("error", Text),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+Table(
+    "ai_calls", _baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("created_at", DateTime(timezone=True), nullable=False, index=True),
+    Column("kind", String, nullable=False),
+    Column("model", String, nullable=False),
+    Column("prompt_tokens", Integer, nullable=False),
+    Column("completion_tokens", Integer, nullable=False),
+    Column("latency_ms", Float, nullable=False),
+    Column("cache_hit", Boolean, nullable=False),
+    Column("error", String),
+)
+
+
+def _create_tables(conn: Connection) -> None:
+    _baseline_metadata.create_all(conn, checkfirst=True)
+
+
+def _content_hashes(conn: Connection) -> None:
+    for table in ("campaigns", "adsets", "ads"):
+        _add_column(conn, table, "content_hash")
+
+
+def _hierarchy_indexes(conn: Connection) -> None:
+    _add_column(conn, "campaigns", "account_id")
+    _create_index(conn, "campaigns", "account_id")
+    _create_index(conn, "adsets", "campaign_id")
+    _create_index(conn, "ads", "adset_id")
+
+
+def _partition_insights(conn: Connection) -> None:
+    """
+    `insights_weekly`, and on PostgreSQL a monthly range-partitioned `insights`.
+    An existing plain table is swapped for a partitioned one and its rows copied
+    over (one-off; runs under the migration lock).
+    """
+    models.Base.metadata.create_all(conn, tables=[models.InsightWeekly.__table__], checkfirst=True)
+    if conn.dialect.name != "postgresql":
+        return
+
+    partitioned = conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)"
+    ), {"name": PARTITIONED_TABLE}).scalar()
+    legacy = f"{PARTITIONED_TABLE}_unpartitioned"
+    months = set(months_ahead(dt.date.today()))
+    if not partitioned:
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} RENAME TO {legacy}"))
+        conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {PARTITIONED_TABLE}_pkey TO {legacy}_pkey"))
+        for index in models.Insight.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        models.Insight.__table__.create(conn)
+        first, last = conn.execute(text(f"SELECT min(date), max(date) FROM {legacy}")).one()
+        if first is not None:
+            month = month_start(first)
+            while month <= last:
+                months.add(month)
+                month = add_months(month, 1)
+    for month in sorted(months):
+        conn.execute(text(partition_ddl(month)))
+    if not partitioned:
+        columns = ", ".join(f'"{c.name}"' for c in models.Insight.__table__.columns)
+        conn.execute(text(f"INSERT INTO {PARTITIONED_TABLE} ({columns}) SELECT {columns} FROM {legacy}"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+def _tenant_tokens(conn: Connection) -> None:
+    models.Base.metadata.create_all(conn, tables=[models.TenantToken.__table__], checkfirst=True)
+
+
+def _tenant_api_keys(conn: Connection) -> None:
+    models.Base.metadata.create_all(conn, tables=[models.TenantApiKey.__table__], checkfirst=True)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline tables", _create_tables),
+    Migration(2, "content_hash on campaigns/adsets/ads", _content_hashes),
+    Migration(3, "campaigns.account_id and hierarchy indexes", _hierarchy_indexes),
+    Migration(4, "insights_weekly and monthly insights partitions", _partition_insights),
+    Migration(5, "tenant_tokens", _tenant_tokens),
+    Migration(6, "tenant_api_keys", _tenant_api_keys),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def _upgrade(conn: Connection) -> List[int]:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    _version_metadata.create_all(conn, checkfirst=True)
+    current = _current_version(conn)
+
+    applied: List[int] = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        migration.upgrade(conn)
+        conn.execute(schema_version.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=dt.datetime.now(dt.timezone.utc),
+        ))
+        applied.append(migration.version)
+    return applied
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+
+async def migrate(engine: AsyncEngine) -> List[int]:
+    """Apply pending migrations in one transaction; returns the applied versions."""
+    async with engine.begin() as conn:
+        return await conn.run_sync(_upgrade)
+
+
+async def check_schema(engine: AsyncEngine) -> int:
+    """
+    Raise RuntimeError when the database is behind the code. A newer schema
+    (rolling deploy, migrated before all workers were replaced) is accepted.
+    """
+    version = await current_version(engine)
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}. "
+            "Run `python -m backend.migrations` first."
+        )
+    if version > SCHEMA_VERSION:
+        print(f"Database schema version {version} is newer than this code ({SCHEMA_VERSION}).")
+    return version
+
+
+async def _main(command: Optional[str]) -> None:
+    from backend.database import DATABASE_URL, engine
+
+    if not DATABASE_URL:
+        raise SystemExit("DATABASE_URL is not set.")
+    try:
+        if command == "status":
+            print(f"Schema version: {await current_version(engine)} (expected {SCHEMA_VERSION})")
+        else:
+            applied = await migrate(engine)
+            print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -1,7 +1,7 @@
 # backend/models.py
 from __future__ import annotations
 
-from sqlalchemy import Column, Float, ForeignKey, String
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from backend.database import Base
@@ -11,11 +11,16 @@ class Campaign(Base):
     __tablename__ = "campaigns"
 
     id = Column(String, primary_key=True)
+    account_id = Column(String, nullable=True, index=True)
     name = Column(String, nullable=True)
     objective = Column(String, nullable=True)
     spend = Column(Float, nullable=True)
     roas = Column(Float, nullable=True)
+    # sha256 of the synced fields; lets bulk upserts skip unchanged rows
+    content_hash = Column(String(64), nullable=True)
 
+    # Lazy loads cannot run implicit IO under AsyncSession; load whole trees
+    # with repository.load_account_tree (selectinload, fixed number of queries).
     adsets = relationship("Adset", back_populates="campaign", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
@@ -27,7 +32,8 @@ class Adset(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=True)
-    campaign_id = Column(String, ForeignKey("campaigns.id"), nullable=False)
+    campaign_id = Column(String, ForeignKey("campaigns.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True)
 
     campaign = relationship("Campaign", back_populates="adsets")
     ads = relationship("Ad", back_populates="adset", cascade="all, delete-orphan")
@@ -41,9 +47,176 @@ class Ad(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=True)
-    adset_id = Column(String, ForeignKey("adsets.id"), nullable=False)
+    adset_id = Column(String, ForeignKey("adsets.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True)
 
     adset = relationship("Adset", back_populates="ads")
 
     def __repr__(self) -> str:
         return f"<Ad id={self.id!r} name={self.name!r} adset_id={self.adset_id!r}>"
+
+
+# ------------------------------------------------------------------------------
+# Insights and rollups
+# ------------------------------------------------------------------------------
+
+class InsightMetrics:
+    """Summable metric columns shared by raw insights and every rollup table."""
+
+    spend = Column(Float, nullable=False, default=0.0)
+    revenue = Column(Float, nullable=False, default=0.0)  # purchase value, not ROAS
+    impressions = Column(Integer, nullable=False, default=0)
+    clicks = Column(Integer, nullable=False, default=0)
+    reach = Column(Integer, nullable=False, default=0)
+    conversions = Column(Float, nullable=False, default=0.0)
+
+
+class Insight(InsightMetrics, Base):
+    """
+    Daily ad-level insights as ingested from the Graph API (one row per ad and day).
+    Range-partitioned by month on PostgreSQL (backend.partitions).
+    """
+
+    __tablename__ = "insights"
+    __table_args__ = {"postgresql_partition_by": "RANGE (date)"}
+
+    ad_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    adset_id = Column(String, nullable=True)
+    campaign_id = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=False, index=True)
+    objective = Column(String, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Insight ad_id={self.ad_id!r} date={self.date!r} spend={self.spend!r}>"
+
+
+class InsightWeekly(InsightMetrics, Base):
+    """Raw insights older than the compaction age, summed per ad and ISO week (backend.retention)."""
+
+    __tablename__ = "insights_weekly"
+
+    ad_id = Column(String, primary_key=True)
+    week_start = Column(Date, primary_key=True)  # Monday
+    adset_id = Column(String, nullable=True)
+    campaign_id = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=False, index=True)
+    objective = Column(String, nullable=True)
+
+
+class CampaignDailyRollup(InsightMetrics, Base):
+    __tablename__ = "rollup_campaign_daily"
+
+    campaign_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    account_id = Column(String, nullable=False, index=True)
+
+
+class AccountDailyRollup(InsightMetrics, Base):
+    __tablename__ = "rollup_account_daily"
+
+    account_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+
+
+class AccountMonthlyRollup(InsightMetrics, Base):
+    __tablename__ = "rollup_account_monthly"
+
+    account_id = Column(String, primary_key=True)
+    month = Column(String(7), primary_key=True)  # "YYYY-MM"
+
+
+# ------------------------------------------------------------------------------
+# Recommendations
+# ------------------------------------------------------------------------------
+
+class Recommendation(Base):
+    """Precomputed scale/pause recommendation served to the dashboard card."""
+
+    __tablename__ = "recommendations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    campaign_id = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=True)
+    campaign_name = Column(String, nullable=True)
+    action = Column(String, nullable=False)  # ai_engine.ACTIONS
+    rationale = Column(Text, nullable=False, default="")
+    source = Column(String, nullable=False, default="rules")  # "rules" | "llm"
+    score = Column(Float, nullable=False, default=0.0)
+    status = Column(String, nullable=False, default="new", index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Recommendation id={self.id!r} campaign_id={self.campaign_id!r} action={self.action!r}>"
+
+
+class ActionAudit(Base):
+    """One field change applied (or attempted) on a Meta object by the action executor."""
+
+    __tablename__ = "action_audit"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    execution_id = Column(String(32), nullable=False, index=True)
+    recommendation_id = Column(Integer, ForeignKey("recommendations.id"), nullable=True)
+    object_id = Column(String, nullable=False, index=True)
+    action = Column(String, nullable=False)
+    field = Column(String, nullable=False)  # "status" | "daily_budget"
+    before_value = Column(String, nullable=True)
+    after_value = Column(String, nullable=True)
+    status = Column(String, nullable=False)  # "ok" | "error"
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ActionAudit id={self.id!r} object_id={self.object_id!r} field={self.field!r} status={self.status!r}>"
+
+
+# ------------------------------------------------------------------------------
+# Telemetry
+# ------------------------------------------------------------------------------
+
+class AICall(Base):
+    """One LLM request (or cache hit) made by the AI engine."""
+
+    __tablename__ = "ai_calls"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    kind = Column(String, nullable=False)  # "single" | "stream" | "batch"
+    model = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Float, nullable=False, default=0.0)
+    cache_hit = Column(Boolean, nullable=False, default=False)
+    error = Column(String, nullable=True)  # exception class name
+
+    def __repr__(self) -> str:
+        return f"<AICall id={self.id!r} kind={self.kind!r} latency_ms={self.latency_ms!r} error={self.error!r}>"
+
+
+# ------------------------------------------------------------------------------
+# Tenants
+# ------------------------------------------------------------------------------
+
+class TenantToken(Base):
+    """Graph API token of a tenant (account_id "*" = tenant default), Fernet-encrypted (backend.tenancy)."""
+
+    __tablename__ = "tenant_tokens"
+
+    tenant_id = Column(String, primary_key=True)
+    account_id = Column(String, primary_key=True, default="*")
+    token_ciphertext = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class TenantApiKey(Base):
+    """API key a tenant authenticates requests with; only its SHA-256 is stored (backend.tenancy)."""
+
+    __tablename__ = "tenant_api_keys"
+
+    key_hash = Column(String(64), primary_key=True)
+    tenant_id = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,105 @@
+# backend/partitions.py
+"""
+Monthly range partitions of `insights` on PostgreSQL.
+
+The table is declared `PARTITION BY RANGE (date)` (see models.Insight) with
+one partition per month named `insights_pYYYYMM`. Partitions are created
+ahead of time by the daily maintenance job (INSIGHTS_PARTITIONS_AHEAD months)
+and on demand for the months an ingest touches, so backfills never hit a
+missing partition. Queries filtered on `date` only scan the matching months.
+
+On other dialects (SQLite in tests/dev) `insights` is a plain table and every
+function here is a no-op.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PARTITIONED_TABLE = "insights"
+# Months of partitions kept ready beyond the current one.
+INSIGHTS_PARTITIONS_AHEAD = int(os.getenv("INSIGHTS_PARTITIONS_AHEAD", "3"))
+
+_NAME_RE = re.compile(rf"^{PARTITIONED_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+LIST_PARTITIONS_SQL = (
+    "SELECT c.relname FROM pg_inherits i "
+    "JOIN pg_class c ON c.oid = i.inhrelid "
+    "JOIN pg_class p ON p.oid = i.inhparent "
+    f"WHERE p.relname = '{PARTITIONED_TABLE}'"
+)
+
+
+def month_start(day: dt.date) -> dt.date:
+    return day.replace(day=1)
+
+
+def add_months(month: dt.date, n: int) -> dt.date:
+    index = month.year * 12 + month.month - 1 + n
+    return dt.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: dt.date) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[dt.date]:
+    """Month covered by a partition named by `partition_name`, else None."""
+    match = _NAME_RE.match(name)
+    return dt.date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_ddl(month: dt.date) -> str:
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def months_ahead(today: dt.date, ahead: int = INSIGHTS_PARTITIONS_AHEAD) -> List[dt.date]:
+    """The current month and `ahead` following months."""
+    return [add_months(month_start(today), n) for n in range(ahead + 1)]
+
+
+def _is_postgres(session: AsyncSession) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+async def list_partitions(session: AsyncSession) -> Dict[dt.date, str]:
+    if not _is_postgres(session):
+        return {}
+    names = (await session.execute(text(LIST_PARTITIONS_SQL))).scalars().all()
+    return {month: name for name in names if (month := partition_month(name))}
+
+
+async def ensure_partitions(session: AsyncSession, days: Iterable[dt.date]) -> List[str]:
+    """
+    Create missing partitions for the months of `days`; returns the created
+    names. One catalog query when nothing is missing, so the parent table is
+    only locked for DDL when a new month actually appears.
+    """
+    if not _is_postgres(session):
+        return []
+    existing = await list_partitions(session)
+    created: List[str] = []
+    for month in sorted({month_start(d) for d in days} - set(existing)):
+        await session.execute(text(partition_ddl(month)))
+        created.append(partition_name(month))
+    return created
+
+
+async def drop_partitions_before(session: AsyncSession, cutoff: dt.date) -> List[str]:
+    """Drop whole partitions for months before `cutoff` (a month start)."""
+    dropped: List[str] = []
+    for month, name in sorted((await list_partitions(session)).items()):
+        if month < cutoff:
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,202 @@
+# backend/prompt_compaction.py
+"""
+Token-budgeted compaction of campaign payloads for LLM prompts.
+
+Small payloads are passed through unchanged. Larger ones are summarized into
+statistics instead of the raw hierarchy:
+- campaign totals (spend, revenue, ROAS, CTR, ...),
+- adset/ad counts and the top/bottom N adsets by ROAS,
+- a trend (last 7 days vs the 7 before) when daily rows are included,
+- for lists of campaigns: the largest campaigns by spend plus an "others" aggregate.
+N is reduced until the result fits the token budget.
+
+Tokens are counted with `tiktoken` when it is installed, otherwise estimated
+as ~4 characters per token.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, TypedDict
+
+try:  # optional dependency
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "1500"))
+
+# Candidate sizes for top/bottom lists, tried largest first.
+_TOP_N_STEPS = (5, 3, 1, 0)
+_METRICS = ("spend", "revenue", "impressions", "clicks", "conversions")
+_TREND_DAYS = 7
+
+
+class CompactionStats(TypedDict):
+    raw_tokens: int
+    tokens: int
+    budget: int
+    compacted: bool
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Exact count with tiktoken when available, else a chars/4 estimate."""
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def _num(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _campaign_tree_node(node: Mapping[str, Any]) -> bool:
+    # A campaign from the `/campaigns` tree carries purchase ROAS in `revenue`
+    # (see ads_api.fetch_campaigns); stored rows always come with `roas`.
+    return "adsets" in node and "roas" not in node
+
+
+def _revenue(node: Mapping[str, Any]) -> Optional[float]:
+    """Monetary revenue; for `/campaigns` tree nodes derived as ROAS x spend."""
+    if _campaign_tree_node(node):
+        roas, spend = _num(node.get("revenue")), _num(node.get("spend"))
+        return roas * spend if roas is not None and spend is not None else None
+    return _num(node.get("revenue"))
+
+
+def _roas(node: Mapping[str, Any]) -> Optional[float]:
+    if _campaign_tree_node(node):
+        return _num(node.get("revenue"))
+    roas = _num(node.get("roas"))
+    if roas is not None:
+        return roas
+    spend, revenue = _num(node.get("spend")), _num(node.get("revenue"))
+    if spend and revenue is not None:
+        return revenue / spend
+    return None
+
+
+def _value(node: Mapping[str, Any], key: str) -> Optional[float]:
+    return _revenue(node) if key == "revenue" else _num(node.get(key))
+
+
+def _metrics(node: Mapping[str, Any]) -> Dict[str, float]:
+    out = {k: round(v, 2) for k in _METRICS if (v := _value(node, k)) is not None}
+    roas = _roas(node)
+    if roas is not None:
+        out["roas"] = round(roas, 3)
+    impressions, clicks = out.get("impressions"), out.get("clicks")
+    if impressions and clicks is not None:
+        out["ctr"] = round(clicks / impressions * 100, 3)
+    return out
+
+
+def _pct_change(new: float, old: float) -> Optional[float]:
+    return round((new - old) / old * 100, 1) if old else None
+
+
+def _trend(daily: Sequence[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Last `_TREND_DAYS` days vs the previous ones: totals and % deltas."""
+    rows = sorted((r for r in daily if r.get("date")), key=lambda r: str(r["date"]))
+    if len(rows) < 2:
+        return None
+    recent, previous = rows[-_TREND_DAYS:], rows[-2 * _TREND_DAYS:-_TREND_DAYS]
+
+    def _sum(part: Sequence[Mapping[str, Any]]) -> Dict[str, float]:
+        return {k: sum(_num(r.get(k)) or 0.0 for r in part) for k in ("spend", "revenue", "clicks", "impressions")}
+
+    now, before = _sum(recent), _sum(previous)
+    trend: Dict[str, Any] = {"days": len(recent), **_metrics(now)}
+    if previous:
+        trend["delta_pct"] = {
+            "spend": _pct_change(now["spend"], before["spend"]),
+            "roas": _pct_change(_roas(now) or 0.0, _roas(before) or 0.0),
+            "ctr": _pct_change(
+                now["clicks"] / now["impressions"] if now["impressions"] else 0.0,
+                before["clicks"] / before["impressions"] if before["impressions"] else 0.0,
+            ),
+        }
+    return trend
+
+
+def summarize_campaign(campaign: Mapping[str, Any], top_n: int = 5, with_trend: bool = True) -> Dict[str, Any]:
+    """Statistics-only view of one campaign (see module docstring)."""
+    summary: Dict[str, Any] = {k: campaign[k] for k in ("id", "campaign_id", "name", "objective") if campaign.get(k)}
+    summary.update(_metrics(campaign))
+
+    adsets = campaign.get("adsets")
+    if isinstance(adsets, list):
+        summary["adsets"] = len(adsets)
+        summary["ads"] = sum(len(a.get("ads") or []) for a in adsets)
+        ranked = sorted(
+            ((r, a) for a in adsets if (r := _roas(a)) is not None), key=lambda item: item[0], reverse=True
+        )
+        if top_n and ranked:
+            brief = [{"id": a.get("id"), "name": a.get("name"), **_metrics(a)} for _, a in ranked]
+            summary["top_adsets_by_roas"] = brief[:top_n]
+            if len(brief) > top_n:
+                summary["bottom_adsets_by_roas"] = brief[-top_n:][::-1]
+
+    daily = campaign.get("daily")
+    if with_trend and isinstance(daily, list):
+        trend = _trend(daily)
+        if trend:
+            summary["trend"] = trend
+    return summary
+
+
+def summarize_campaigns(campaigns: Sequence[Mapping[str, Any]], top_n: int = 5) -> Dict[str, Any]:
+    """Totals over many campaigns, the `top_n` largest by spend and an aggregate of the rest."""
+    ordered = sorted(campaigns, key=lambda c: _num(c.get("spend")) or 0.0, reverse=True)
+    totals = {k: sum(_value(c, k) or 0.0 for c in campaigns) for k in _METRICS}
+    out: Dict[str, Any] = {"campaigns": len(campaigns), "totals": _metrics(totals)}
+    if top_n:
+        out["largest"] = [summarize_campaign(c, top_n=0, with_trend=False) for c in ordered[:top_n]]
+    rest = ordered[top_n:]
+    if rest:
+        rest_totals = {k: sum(_value(c, k) or 0.0 for c in rest) for k in _METRICS}
+        out["others"] = {"campaigns": len(rest), **_metrics(rest_totals)}
+    return out
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def compact_payload(data: Any, budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, CompactionStats]:
+    """
+    Text for the prompt and its token stats. Data that fits `budget` is
+    rendered as-is (`str(data)`); otherwise the largest summary that fits is
+    used (the smallest one if none does).
+    """
+    raw = str(data)
+    raw_tokens = count_tokens(raw)
+    if raw_tokens <= budget or not isinstance(data, (Mapping, list)):
+        return raw, CompactionStats(raw_tokens=raw_tokens, tokens=raw_tokens, budget=budget, compacted=False)
+
+    text, tokens = raw, raw_tokens
+    for step, top_n in enumerate(_TOP_N_STEPS):
+        if isinstance(data, Mapping):
+            summary = summarize_campaign(data, top_n=top_n, with_trend=step < len(_TOP_N_STEPS) - 1)
+        else:
+            summary = summarize_campaigns([c for c in data if isinstance(c, Mapping)], top_n=top_n)
+        text = _dumps(summary)
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            break
+    return text, CompactionStats(raw_tokens=raw_tokens, tokens=tokens, budget=budget, compacted=True)
@@ -0,0 +1,212 @@
+# backend/recommendations.py
+"""
+Persisted recommendations for the dashboard.
+
+A background job (see `scheduler`) runs the rules + LLM engine over the stored
+campaign/day rollups and writes actionable results (scale / pause) to the
+`recommendations` table; the dashboard only reads that table. Launch/Dismiss
+are stored as a status on the row; Launch also applies the action on Meta
+through `actions.execute_actions`.
+
+Refreshing keeps the list stable: an open recommendation with the same action
+is updated in place, one the user already launched or dismissed is not
+re-created until it expires, and open rows whose action changed are expired.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.actions import execute_actions
+from backend.models import Campaign, CampaignDailyRollup, Recommendation
+from backend.rules_engine import RuleThresholds, recommend_campaigns
+
+RECOMMENDATION_TTL_HOURS = float(os.getenv("RECOMMENDATION_TTL_HOURS", "24"))
+# Budget change applied when a "scale" recommendation is launched.
+RECOMMENDATION_SCALE_PERCENT = float(os.getenv("RECOMMENDATION_SCALE_PERCENT", "20"))
+
+STATUSES = ("new", "launched", "dismissed", "expired")
+# Statuses a client may set.
+USER_STATUSES = ("launched", "dismissed")
+# "keep" needs no action, so it is not stored.
+STORED_ACTIONS = ("scale", "pause")
+
+
+def _now() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc)
+
+
+def _as_dict(rec: Recommendation) -> Dict[str, Any]:
+    return {
+        "id": rec.id,
+        "campaign_id": rec.campaign_id,
+        "account_id": rec.account_id,
+        "campaign_name": rec.campaign_name,
+        "action": rec.action,
+        "rationale": rec.rationale,
+        "source": rec.source,
+        "score": rec.score,
+        "status": rec.status,
+        "created_at": rec.created_at.isoformat() if rec.created_at else None,
+        "expires_at": rec.expires_at.isoformat() if rec.expires_at else None,
+    }
+
+
+async def _campaign_day_rows(session: AsyncSession, since: dt.date, until: dt.date) -> List[Dict[str, Any]]:
+    """Campaign/day rollup rows in the window, with name/objective from `campaigns` when known."""
+    roll = CampaignDailyRollup.__table__
+    camp = Campaign.__table__
+    result = await session.execute(
+        select(
+            roll.c.campaign_id, roll.c.account_id, roll.c.date,
+            roll.c.spend, roll.c.revenue, roll.c.impressions, roll.c.clicks, roll.c.reach,
+            camp.c.name.label("campaign_name"), camp.c.objective,
+        )
+        .select_from(roll.outerjoin(camp, camp.c.id == roll.c.campaign_id))
+        .where(roll.c.date >= since, roll.c.date <= until)
+    )
+    return [dict(r._mapping) for r in result]
+
+
+async def refresh_recommendations(
+    session: AsyncSession,
+    thresholds: Optional[RuleThresholds] = None,
+    as_of: Optional[dt.date] = None,
+    ttl_hours: float = RECOMMENDATION_TTL_HOURS,
+) -> int:
+    """
+    Evaluate all campaigns with stored insights and persist actionable
+    recommendations (the caller commits). The score is the window spend, i.e.
+    the budget the action affects. Returns the number of new rows.
+    """
+    thresholds = thresholds or RuleThresholds.from_env()
+    as_of = as_of or dt.date.today()
+    rows = await _campaign_day_rows(session, as_of - dt.timedelta(days=thresholds.window_days - 1), as_of)
+    if not rows:
+        return 0
+
+    spend: Dict[str, float] = {}
+    meta: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        spend[r["campaign_id"]] = spend.get(r["campaign_id"], 0.0) + float(r["spend"] or 0.0)
+        meta[r["campaign_id"]] = r
+
+    results = await recommend_campaigns(rows, thresholds, as_of=as_of)
+
+    now = _now()
+    expires_at = now + dt.timedelta(hours=ttl_hours)
+    existing = (
+        await session.execute(
+            select(Recommendation).where(
+                Recommendation.campaign_id.in_(list(results)),
+                Recommendation.status != "expired",
+                Recommendation.expires_at > now,
+            )
+        )
+    ).scalars().all()
+    by_campaign: Dict[str, List[Recommendation]] = {}
+    for rec in existing:
+        by_campaign.setdefault(rec.campaign_id, []).append(rec)
+
+    created = 0
+    for cid, result in results.items():
+        current = by_campaign.get(cid, [])
+        for rec in current:
+            if rec.status == "new" and rec.action != result["action"]:
+                rec.status, rec.updated_at = "expired", now
+        if result["action"] not in STORED_ACTIONS:
+            continue
+
+        same = [rec for rec in current if rec.action == result["action"]]
+        open_rec = next((rec for rec in same if rec.status == "new"), None)
+        if open_rec is not None:
+            open_rec.rationale = result["reason"]
+            open_rec.source = result["source"]
+            open_rec.score = spend.get(cid, 0.0)
+            open_rec.expires_at, open_rec.updated_at = expires_at, now
+            continue
+        if same:  # already launched or dismissed
+            continue
+
+        session.add(Recommendation(
+            campaign_id=cid,
+            account_id=meta[cid]["account_id"],
+            campaign_name=meta[cid]["campaign_name"],
+            action=result["action"],
+            rationale=result["reason"],
+            source=result["source"],
+            score=spend.get(cid, 0.0),
+            status="new",
+            created_at=now,
+            expires_at=expires_at,
+        ))
+        created += 1
+    await session.flush()
+    return created
+
+
+async def list_recommendations(
+    session: AsyncSession,
+    status: str = "new",
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """Unexpired recommendations with `status`, highest score first, as one page."""
+    conditions = [Recommendation.status == status]
+    if status != "expired":
+        conditions.append(Recommendation.expires_at > _now())
+    total = await session.scalar(select(func.count()).select_from(Recommendation).where(*conditions))
+    result = await session.execute(
+        select(Recommendation)
+        .where(*conditions)
+        .order_by(Recommendation.score.desc(), Recommendation.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return {
+        "items": [_as_dict(r) for r in result.scalars()],
+        "total": total or 0,
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+async def set_status(session: AsyncSession, recommendation_id: int, status: str) -> Optional[Dict[str, Any]]:
+    """Set a recommendation's status (the caller commits); None if it does not exist."""
+    if status not in USER_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(USER_STATUSES)}")
+    rec = await session.get(Recommendation, recommendation_id)
+    if rec is None:
+        return None
+    rec.status, rec.updated_at = status, _now()
+    await session.flush()
+    return _as_dict(rec)
+
+
+def action_for(rec: Recommendation) -> Dict[str, Any]:
+    """Executor action that carries out a stored recommendation."""
+    if rec.action == "pause":
+        return {"type": "pause", "object_id": rec.campaign_id}
+    return {"type": "scale_budget", "object_id": rec.campaign_id, "percent": RECOMMENDATION_SCALE_PERCENT}
+
+
+async def launch_recommendation(session: AsyncSession, recommendation_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Apply a recommendation on Meta and mark it `launched` when the change went
+    through (the caller commits). None if it does not exist.
+    """
+    rec = await session.get(Recommendation, recommendation_id)
+    if rec is None:
+        return None
+    if rec.status != "new":
+        raise ValueError(f"Recommendation is already {rec.status}")
+    outcome = await execute_actions(session, [action_for(rec)], recommendation_id=rec.id)
+    if outcome["applied"]:
+        rec.status, rec.updated_at = "launched", _now()
+        await session.flush()
+    return {**outcome, "recommendation": _as_dict(rec)}
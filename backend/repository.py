@@ -0,0 +1,278 @@
+# backend/repository.py
+"""
+Bulk write layer for synced Meta entities (campaigns / adsets / ads) and
+raw insights, plus the eager-loading read of the stored entity tree.
+
+`upsert_rows` picks the fastest path for the session's database:
+- PostgreSQL (asyncpg): rows are streamed with COPY (`copy_records_to_table`)
+  into a temporary staging table and merged with one set-based
+  `INSERT ... SELECT ... ON CONFLICT DO UPDATE`;
+- otherwise (SQLite): chunks of a single parametrized
+  `INSERT ... ON CONFLICT DO UPDATE` executed as executemany.
+
+`bulk_upsert` adds a `content_hash` of the synced fields to each row; the
+update only fires when the stored hash differs, so unchanged rows cost no
+write. Everything runs in the caller's transaction; the caller commits.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type, TypedDict
+
+from sqlalchemy import Float, Integer, Table, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from backend.models import Ad, Adset, Base, Campaign
+
+# Rows per execute call (batched-insert path).
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", "1000"))
+# Set to false to force the batched-insert path on PostgreSQL as well.
+USE_COPY = os.getenv("UPSERT_USE_COPY", "true").lower() not in ("0", "false", "no")
+
+
+class UpsertResult(TypedDict):
+    received: int
+    written: int  # inserted or changed
+    unchanged: int
+
+
+def chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def dialect_insert(session: AsyncSession, table: Table):
+    """`INSERT` construct with `on_conflict_do_update` for the session's dialect."""
+    name = session.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upsert is not implemented for dialect {name!r}")
+
+
+def content_hash(row: Mapping[str, Any], columns: Sequence[str]) -> str:
+    payload = json.dumps([row.get(c) for c in columns], ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _uses_copy(session: AsyncSession) -> bool:
+    bind = session.get_bind()
+    return USE_COPY and bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg"
+
+
+async def _batched_upsert(
+    session: AsyncSession,
+    table: Table,
+    values_list: Sequence[Mapping[str, Any]],
+    pk: Sequence[str],
+    update_columns: Sequence[str],
+    changed_only: bool,
+    chunk_size: int,
+) -> int:
+    stmt = dialect_insert(session, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[c] for c in pk],
+        set_={c: stmt.excluded[c] for c in update_columns},
+        where=table.c.content_hash.is_distinct_from(stmt.excluded.content_hash) if changed_only else None,
+    ).returning(table.c[pk[0]])
+    # Executed as executemany; rows skipped by the WHERE return nothing, which
+    # gives an exact written count (driver rowcounts are unreliable here).
+    written = 0
+    for chunk in chunks(values_list, chunk_size):
+        result = await session.execute(stmt, list(chunk))
+        written += len(result.all())
+    return written
+
+
+def merge_sql(
+    table: Table,
+    staging: str,
+    columns: Sequence[str],
+    pk: Sequence[str],
+    update_columns: Sequence[str],
+    changed_only: bool,
+) -> str:
+    """Set-based merge of the staging table into `table` (last staged row per key wins)."""
+    cols = ", ".join(f'"{c}"' for c in columns)
+    keys = ", ".join(f'"{c}"' for c in pk)
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
+    where = f' WHERE "{table.name}".content_hash IS DISTINCT FROM EXCLUDED.content_hash' if changed_only else ""
+    return (
+        f'INSERT INTO "{table.name}" ({cols}) '
+        f"SELECT DISTINCT ON ({keys}) {cols} FROM {staging} ORDER BY {keys}, _seq DESC "
+        f"ON CONFLICT ({keys}) DO UPDATE SET {updates}{where} "
+        f'RETURNING "{pk[0]}"'
+    )
+
+
+def _coerce(table: Table, columns: Sequence[str]) -> List[Any]:
+    """Per-column converters; COPY's binary format is strict about int vs float."""
+    converters: List[Any] = []
+    for c in columns:
+        col_type = table.c[c].type
+        if isinstance(col_type, Integer):
+            converters.append(lambda v: None if v is None else int(v))
+        elif isinstance(col_type, Float):
+            converters.append(lambda v: None if v is None else float(v))
+        else:
+            converters.append(lambda v: v)
+    return converters
+
+
+async def _copy_upsert(
+    session: AsyncSession,
+    table: Table,
+    values_list: Sequence[Mapping[str, Any]],
+    pk: Sequence[str],
+    update_columns: Sequence[str],
+    changed_only: bool,
+) -> int:
+    columns = [*pk, *update_columns]
+    staging = f"_staging_{table.name}"
+    # Executing through the session first makes sure its transaction is open,
+    # so the temp table lives (and is dropped) with it.
+    await session.execute(text(
+        f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE "{table.name}" INCLUDING DEFAULTS, _seq bigint) '
+        f"ON COMMIT DROP"
+    ))
+    await session.execute(text(f"TRUNCATE {staging}"))
+
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    converters = _coerce(table, columns)
+    records = [
+        (*(conv(row.get(c)) for conv, c in zip(converters, columns)), seq)
+        for seq, row in enumerate(values_list)
+    ]
+    await raw.driver_connection.copy_records_to_table(staging, records=records, columns=[*columns, "_seq"])
+
+    result = await session.execute(text(merge_sql(table, staging, columns, pk, update_columns, changed_only)))
+    return len(result.all())
+
+
+async def upsert_rows(
+    session: AsyncSession,
+    table: Table,
+    values_list: Sequence[Mapping[str, Any]],
+    update_columns: Sequence[str],
+    changed_only: bool = False,
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Insert or update `values_list` (dicts with the primary key and
+    `update_columns`) on the table's primary key; returns rows written.
+    With `changed_only`, rows whose `content_hash` matches are skipped.
+    """
+    if not values_list:
+        return 0
+    pk = [c.name for c in table.primary_key.columns]
+    if _uses_copy(session):
+        return await _copy_upsert(session, table, values_list, pk, update_columns, changed_only)
+    return await _batched_upsert(session, table, values_list, pk, update_columns, changed_only, chunk_size)
+
+
+async def bulk_upsert(
+    session: AsyncSession,
+    model: Type[Base],
+    rows: Sequence[Mapping[str, Any]],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> UpsertResult:
+    """
+    Insert or update `rows` (dicts keyed by column name) of `model`, skipping
+    rows whose content hash is unchanged. Rows are deduplicated by primary key
+    (last one wins).
+    """
+    table: Table = model.__table__
+    pk = [c.name for c in table.primary_key.columns]
+    data_columns = [c.name for c in table.columns if c.name not in pk and c.name != "content_hash"]
+
+    by_key: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in rows:
+        values = {c: row.get(c) for c in (*pk, *data_columns)}
+        values["content_hash"] = content_hash(values, data_columns)
+        by_key[tuple(values[c] for c in pk)] = values
+    values_list = list(by_key.values())
+
+    written = await upsert_rows(
+        session, table, values_list, [*data_columns, "content_hash"], changed_only=True, chunk_size=chunk_size
+    )
+    return UpsertResult(received=len(values_list), written=written, unchanged=len(values_list) - written)
+
+
+def flatten_tree(accounts: Iterable[Mapping[str, Any]]) -> Tuple[List[Dict[str, Any]], ...]:
+    """
+    Campaign, adset and ad rows from the `/campaigns` tree
+    (accounts -> campaigns -> adsets -> ads). The tree's campaign `revenue`
+    is a ROAS value (see ads_api.fetch_campaigns) and maps to `roas`.
+    """
+    campaigns: List[Dict[str, Any]] = []
+    adsets: List[Dict[str, Any]] = []
+    ads: List[Dict[str, Any]] = []
+    for account in accounts:
+        for c in account.get("campaigns", []) or []:
+            campaigns.append({
+                "id": c["id"], "account_id": account.get("account_id"),
+                "name": c.get("name"), "objective": c.get("objective"),
+                "spend": c.get("spend"), "roas": c.get("revenue"),
+            })
+            for s in c.get("adsets", []) or []:
+                adsets.append({"id": s["id"], "name": s.get("name"), "campaign_id": c["id"]})
+                for a in s.get("ads", []) or []:
+                    ads.append({"id": a["id"], "name": a.get("name"), "adset_id": s["id"]})
+    return campaigns, adsets, ads
+
+
+async def sync_entities(
+    session: AsyncSession,
+    accounts: Iterable[Mapping[str, Any]],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> Dict[str, UpsertResult]:
+    """Upsert the whole `/campaigns` tree, parents first (the caller commits)."""
+    campaigns, adsets, ads = flatten_tree(accounts)
+    return {
+        "campaigns": await bulk_upsert(session, Campaign, campaigns, chunk_size),
+        "adsets": await bulk_upsert(session, Adset, adsets, chunk_size),
+        "ads": await bulk_upsert(session, Ad, ads, chunk_size),
+    }
+
+
+async def load_account_tree(
+    session: AsyncSession,
+    account_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stored accounts -> campaigns -> adsets -> ads in the `/campaigns` JSON shape,
+    loaded in three queries (campaigns, then adsets and ads via selectinload)
+    regardless of tree size. `spend`/`revenue` (ROAS, as in fetch_campaigns)
+    are only present for campaigns synced with insights.
+    """
+    stmt = (
+        select(Campaign)
+        .options(selectinload(Campaign.adsets).selectinload(Adset.ads))
+        .order_by(Campaign.account_id, Campaign.id)
+    )
+    if account_id:
+        stmt = stmt.where(Campaign.account_id == account_id)
+
+    accounts: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for c in (await session.scalars(stmt)).all():
+        campaign: Dict[str, Any] = {"id": c.id, "name": c.name, "objective": c.objective}
+        if c.spend is not None or c.roas is not None:
+            campaign["spend"] = c.spend or 0.0
+            campaign["revenue"] = c.roas or 0.0
+        campaign["adsets"] = [
+            {
+                "id": s.id,
+                "name": s.name,
+                "ads": [{"id": a.id, "name": a.name} for a in sorted(s.ads, key=lambda a: a.id)],
+            }
+            for s in sorted(c.adsets, key=lambda s: s.id)
+        ]
+        accounts.setdefault(c.account_id, []).append(campaign)
+    return [{"account_id": acc, "campaigns": campaigns} for acc, campaigns in accounts.items()]
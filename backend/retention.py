@@ -0,0 +1,135 @@
+# backend/retention.py
+"""
+Lifecycle of raw insights: compaction and retention.
+
+- Compaction: daily rows older than INSIGHTS_COMPACT_AFTER_DAYS (whole ISO
+  weeks only) are summed into `insights_weekly` and deleted from `insights`.
+  The rollup tables already hold those days and are left untouched. Weekly
+  rows are final: `store_insights` refuses raw rows in compacted weeks and
+  compaction ignores any that got in another way, so nothing is counted
+  twice. Keep the age well beyond the re-ingest/attribution window (Meta
+  restates up to 28 days).
+- Retention: months older than INSIGHTS_RETENTION_MONTHS are removed; on
+  PostgreSQL by dropping whole `insights` partitions (no row-by-row delete,
+  nothing to vacuum), elsewhere with a DELETE. Weekly rows follow the same
+  cutoff.
+
+`maintain_insights` runs partition creation, retention and compaction in one
+transaction (the caller commits); the scheduler calls it daily.
+
+    python -m backend.retention   # run the maintenance once
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import os
+from typing import Dict, Optional
+
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Insight, InsightWeekly
+from backend.partitions import add_months, drop_partitions_before, ensure_partitions, month_start, months_ahead
+from backend.repository import dialect_insert
+from backend.rollups import METRIC_COLUMNS, compacted_until
+
+INSIGHTS_COMPACT_AFTER_DAYS = int(os.getenv("INSIGHTS_COMPACT_AFTER_DAYS", "90"))
+INSIGHTS_RETENTION_MONTHS = int(os.getenv("INSIGHTS_RETENTION_MONTHS", "25"))
+
+
+def _week_start(session: AsyncSession, column):
+    """SQL expression for the Monday of a DATE column's ISO week."""
+    if session.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc("week", column), Date)
+    return func.date(column, "weekday 0", "-6 days")
+
+
+def compaction_cutoff(as_of: dt.date, after_days: int = INSIGHTS_COMPACT_AFTER_DAYS) -> dt.date:
+    """First day that stays daily: the Monday on or before `as_of - after_days`."""
+    cutoff = as_of - dt.timedelta(days=after_days)
+    return cutoff - dt.timedelta(days=cutoff.weekday())
+
+
+def retention_cutoff(as_of: dt.date, months: int = INSIGHTS_RETENTION_MONTHS) -> dt.date:
+    """First month that is kept."""
+    return add_months(month_start(as_of), -months)
+
+
+async def compact_insights(
+    session: AsyncSession,
+    as_of: Optional[dt.date] = None,
+    after_days: int = INSIGHTS_COMPACT_AFTER_DAYS,
+) -> int:
+    """Fold old daily rows into weekly rows; returns the number of daily rows removed."""
+    cutoff = compaction_cutoff(as_of or dt.date.today(), after_days)
+    raw_from = await compacted_until(session)
+    src, dst = Insight.__table__, InsightWeekly.__table__
+    week = _week_start(session, src.c.date)
+    query = (
+        select(
+            src.c.ad_id,
+            week.label("week_start"),
+            func.max(src.c.adset_id),
+            func.max(src.c.campaign_id),
+            func.max(src.c.account_id),
+            func.max(src.c.objective),
+            *[func.sum(src.c[m]) for m in METRIC_COLUMNS],
+        )
+        .where(src.c.date < cutoff)
+        .group_by(src.c.ad_id, week)
+    )
+    if raw_from is not None:
+        # Weeks before `raw_from` are already final; stray raw rows there are only deleted.
+        query = query.where(src.c.date >= raw_from)
+    stmt = dialect_insert(session, dst).from_select(
+        ["ad_id", "week_start", "adset_id", "campaign_id", "account_id", "objective", *METRIC_COLUMNS], query
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[dst.c.ad_id, dst.c.week_start],
+        set_={m: dst.c[m] + stmt.excluded[m] for m in METRIC_COLUMNS},
+    )
+    await session.execute(stmt)
+    result = await session.execute(delete(src).where(src.c.date < cutoff))
+    return result.rowcount or 0
+
+
+async def apply_retention(
+    session: AsyncSession,
+    as_of: Optional[dt.date] = None,
+    months: int = INSIGHTS_RETENTION_MONTHS,
+) -> Dict[str, int]:
+    """Remove raw and weekly insights older than the retention window."""
+    cutoff = retention_cutoff(as_of or dt.date.today(), months)
+    insights, weekly = Insight.__table__, InsightWeekly.__table__
+    if session.get_bind().dialect.name == "postgresql":
+        dropped = len(await drop_partitions_before(session, cutoff))
+        daily_deleted = 0
+    else:
+        dropped = 0
+        daily_deleted = (await session.execute(delete(insights).where(insights.c.date < cutoff))).rowcount or 0
+    weekly_deleted = (await session.execute(delete(weekly).where(weekly.c.week_start < cutoff))).rowcount or 0
+    return {"partitions_dropped": dropped, "daily_deleted": daily_deleted, "weekly_deleted": weekly_deleted}
+
+
+async def maintain_insights(session: AsyncSession, as_of: Optional[dt.date] = None) -> Dict[str, int]:
+    as_of = as_of or dt.date.today()
+    created = await ensure_partitions(session, months_ahead(as_of))
+    # Retention first, so compaction never folds rows that are about to go.
+    retention = await apply_retention(session, as_of)
+    compacted = await compact_insights(session, as_of)
+    return {"partitions_created": len(created), "compacted": compacted, **retention}
+
+
+async def _main() -> None:
+    from backend.database import SessionLocal
+
+    async with SessionLocal() as session:
+        stats = await maintain_insights(session)
+        await session.commit()
+    print("Insights maintenance:", stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
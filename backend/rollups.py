@@ -0,0 +1,261 @@
+# backend/rollups.py
+"""
+Stored insights and materialized rollups for dashboard queries.
+
+Raw daily ad-level insights are upserted into `insights`; after each ingest
+only the affected rollup keys (campaign/day, account/day, account/month) are
+recomputed from the raw rows with set-based `INSERT ... SELECT ... GROUP BY`.
+Re-ingesting a day therefore replaces, never double-counts, its numbers.
+Dashboard reads hit the small rollup tables only.
+
+    python -m backend.rollups rebuild   # recompute every rollup from scratch
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Table, and_, delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.ads_api import InsightRow
+from backend.models import (
+    AccountDailyRollup,
+    AccountMonthlyRollup,
+    CampaignDailyRollup,
+    Insight,
+    InsightWeekly,
+)
+from backend.partitions import ensure_partitions
+from backend.repository import chunks, upsert_rows
+
+METRIC_COLUMNS = ("spend", "revenue", "impressions", "clicks", "reach", "conversions")
+
+# Rows per statement; keeps SQLite below its bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def _chunks(items: Sequence[Any], size: int = CHUNK_SIZE) -> Iterable[Sequence[Any]]:
+    return chunks(items, size)
+
+
+def _month_of(session: AsyncSession, column):
+    """SQL expression formatting a DATE column as 'YYYY-MM'."""
+    if session.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def _sums(table: Table) -> List[Any]:
+    return [func.coalesce(func.sum(table.c[m]), 0).label(m) for m in METRIC_COLUMNS]
+
+
+def _insight_values(row: InsightRow) -> Dict[str, Any]:
+    return {
+        "ad_id": row["ad_id"],
+        "date": dt.date.fromisoformat(row["date"]),
+        "adset_id": row.get("adset_id"),
+        "campaign_id": row["campaign_id"],
+        "account_id": row["account_id"],
+        "objective": row.get("objective"),
+        **{m: row.get(m, 0) or 0 for m in METRIC_COLUMNS},
+    }
+
+
+# Rollup maintenance -----------------------------------------------------------
+
+async def _refresh_campaign_daily(session: AsyncSession, keys: Set[Tuple[str, dt.date]]) -> None:
+    src, dst = Insight.__table__, CampaignDailyRollup.__table__
+    for chunk in _chunks(sorted(keys)):
+        await session.execute(delete(dst).where(tuple_(dst.c.campaign_id, dst.c.date).in_(chunk)))
+        query = (
+            select(src.c.campaign_id, src.c.date, func.max(src.c.account_id).label("account_id"), *_sums(src))
+            .where(tuple_(src.c.campaign_id, src.c.date).in_(chunk))
+            .group_by(src.c.campaign_id, src.c.date)
+        )
+        await session.execute(insert(dst).from_select(["campaign_id", "date", "account_id", *METRIC_COLUMNS], query))
+
+
+async def _refresh_account_daily(session: AsyncSession, keys: Set[Tuple[str, dt.date]]) -> None:
+    src, dst = CampaignDailyRollup.__table__, AccountDailyRollup.__table__
+    for chunk in _chunks(sorted(keys)):
+        await session.execute(delete(dst).where(tuple_(dst.c.account_id, dst.c.date).in_(chunk)))
+        query = (
+            select(src.c.account_id, src.c.date, *_sums(src))
+            .where(tuple_(src.c.account_id, src.c.date).in_(chunk))
+            .group_by(src.c.account_id, src.c.date)
+        )
+        await session.execute(insert(dst).from_select(["account_id", "date", *METRIC_COLUMNS], query))
+
+
+async def _refresh_account_monthly(session: AsyncSession, keys: Set[Tuple[str, str]]) -> None:
+    src, dst = AccountDailyRollup.__table__, AccountMonthlyRollup.__table__
+    month = _month_of(session, src.c.date)
+    for chunk in _chunks(sorted(keys)):
+        await session.execute(delete(dst).where(tuple_(dst.c.account_id, dst.c.month).in_(chunk)))
+        query = (
+            select(src.c.account_id, month.label("month"), *_sums(src))
+            .where(tuple_(src.c.account_id, month).in_(chunk))
+            .group_by(src.c.account_id, month)
+        )
+        await session.execute(insert(dst).from_select(["account_id", "month", *METRIC_COLUMNS], query))
+
+
+async def refresh_rollups(session: AsyncSession, campaign_days: Set[Tuple[str, str, dt.date]]) -> None:
+    """
+    Recompute rollups for the given (account_id, campaign_id, date) keys.
+    Order matters: each level is derived from the one below it.
+    """
+    await _refresh_campaign_daily(session, {(c, d) for _, c, d in campaign_days})
+    await _refresh_account_daily(session, {(a, d) for a, _, d in campaign_days})
+    await _refresh_account_monthly(session, {(a, d.strftime("%Y-%m")) for a, _, d in campaign_days})
+
+
+async def compacted_until(session: AsyncSession) -> Optional[dt.date]:
+    """First day not yet folded into `insights_weekly` (None before any compaction)."""
+    weekly = InsightWeekly.__table__
+    last_week = await session.scalar(select(func.max(weekly.c.week_start)))
+    if last_week is None:
+        return None
+    return dt.date.fromisoformat(str(last_week)) + dt.timedelta(days=7)
+
+
+async def store_insights(session: AsyncSession, rows: Iterable[InsightRow]) -> int:
+    """
+    Upsert ad-level insight rows and refresh the rollups they touch, in one
+    transaction (the caller commits). Rows without an `ad_id` are skipped, and
+    so are rows in weeks already compacted (backend.retention): their weekly
+    totals are final and would be counted twice. Returns the number of stored rows.
+    """
+    values = [_insight_values(r) for r in rows if r.get("ad_id") and r.get("date")]
+    if not values:
+        return 0
+    raw_from = await compacted_until(session)
+    if raw_from is not None:
+        kept = [v for v in values if v["date"] >= raw_from]
+        if len(kept) < len(values):
+            print(f"Skipping {len(values) - len(kept)} insight rows before {raw_from} (already compacted).")
+        values = kept
+        if not values:
+            return 0
+
+    await ensure_partitions(session, {v["date"] for v in values})
+    # COPY + staging-table merge on PostgreSQL, batched upsert otherwise.
+    await upsert_rows(
+        session,
+        Insight.__table__,
+        values,
+        ("adset_id", "campaign_id", "account_id", "objective", *METRIC_COLUMNS),
+        chunk_size=CHUNK_SIZE,
+    )
+
+    await refresh_rollups(session, {(v["account_id"], v["campaign_id"], v["date"]) for v in values})
+    return len(values)
+
+
+async def rebuild_rollups(session: AsyncSession) -> None:
+    """
+    Drop and recompute every rollup row from `insights` (the caller commits).
+    Campaign/day rows of days already compacted to weekly (backend.retention)
+    are kept as they are; stray raw rows in those days are ignored.
+    """
+    raw_from = await compacted_until(session)
+    campaign_daily = CampaignDailyRollup.__table__
+    src = Insight.__table__
+    raw = select(src.c.campaign_id, src.c.date, func.max(src.c.account_id), *_sums(src))
+    if raw_from is not None:
+        await session.execute(delete(campaign_daily).where(campaign_daily.c.date >= raw_from))
+        raw = raw.where(src.c.date >= raw_from)
+    else:
+        await session.execute(delete(campaign_daily))
+    for model in (AccountMonthlyRollup, AccountDailyRollup):
+        await session.execute(delete(model.__table__))
+
+    await session.execute(
+        insert(campaign_daily).from_select(
+            ["campaign_id", "date", "account_id", *METRIC_COLUMNS],
+            raw.group_by(src.c.campaign_id, src.c.date),
+        )
+    )
+    src = CampaignDailyRollup.__table__
+    await session.execute(
+        insert(AccountDailyRollup.__table__).from_select(
+            ["account_id", "date", *METRIC_COLUMNS],
+            select(src.c.account_id, src.c.date, *_sums(src)).group_by(src.c.account_id, src.c.date),
+        )
+    )
+    src = AccountDailyRollup.__table__
+    month = _month_of(session, src.c.date)
+    await session.execute(
+        insert(AccountMonthlyRollup.__table__).from_select(
+            ["account_id", "month", *METRIC_COLUMNS],
+            select(src.c.account_id, month, *_sums(src)).group_by(src.c.account_id, month),
+        )
+    )
+
+
+# Reads ------------------------------------------------------------------------
+
+def _with_roas(row: Dict[str, Any]) -> Dict[str, Any]:
+    spend = float(row.get("spend") or 0.0)
+    row["roas"] = (float(row.get("revenue") or 0.0) / spend) if spend > 0 else 0.0
+    return row
+
+
+async def monthly_totals(session: AsyncSession, month: Optional[str] = None) -> Dict[str, Any]:
+    """Per-account and overall totals for `month` ("YYYY-MM", default: current month)."""
+    month = month or dt.date.today().strftime("%Y-%m")
+    table = AccountMonthlyRollup.__table__
+    result = await session.execute(
+        select(table.c.account_id, *[table.c[m] for m in METRIC_COLUMNS])
+        .where(table.c.month == month)
+        .order_by(table.c.account_id)
+    )
+    accounts = [_with_roas(dict(r._mapping)) for r in result]
+    totals = _with_roas({m: sum(a[m] for a in accounts) for m in METRIC_COLUMNS})
+    return {"month": month, **totals, "accounts": accounts}
+
+
+async def campaign_totals(
+    session: AsyncSession,
+    since: Optional[dt.date] = None,
+    until: Optional[dt.date] = None,
+    account_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Per-campaign sums over an inclusive date window from the campaign/day rollup."""
+    table = CampaignDailyRollup.__table__
+    conditions = []
+    if since:
+        conditions.append(table.c.date >= since)
+    if until:
+        conditions.append(table.c.date <= until)
+    if account_id:
+        conditions.append(table.c.account_id == account_id)
+    query = (
+        select(table.c.campaign_id, func.max(table.c.account_id).label("account_id"), *_sums(table))
+        .group_by(table.c.campaign_id)
+        .order_by(table.c.campaign_id)
+    )
+    if conditions:
+        query = query.where(and_(*conditions))
+    result = await session.execute(query)
+    return [_with_roas(dict(r._mapping)) for r in result]
+
+
+async def _main(argv: List[str]) -> None:
+    from backend.database import SessionLocal
+
+    if argv[:1] != ["rebuild"]:
+        print("usage: python -m backend.rollups rebuild")
+        raise SystemExit(2)
+    async with SessionLocal() as session:
+        await rebuild_rollups(session)
+        await session.commit()
+    print("Rollups rebuilt.")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
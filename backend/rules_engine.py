@@ -0,0 +1,154 @@
+# backend/rules_engine.py
+"""
+Deterministic rules that decide the obvious scale/pause cases locally.
+
+All campaigns are evaluated at once over a trailing window of daily insight
+rows (pandas group-by + NumPy masks). Only campaigns no rule is confident
+about ("ambiguous") are sent to the LLM batch engine in `ai_engine`.
+
+Frequency is approximated as impressions / reach summed over the window
+(daily reach double-counts returning users, so it is an upper bound on
+unique reach and the ratio errs low).
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import ai_engine
+from backend.ai_engine import Recommendation
+
+_METRICS = ("spend", "revenue", "impressions", "clicks", "reach")
+
+AMBIGUOUS = "ambiguous"
+
+
+@dataclass(frozen=True)
+class RuleThresholds:
+    window_days: int = 7
+    # Below this spend there is too little data to act on -> keep.
+    min_spend: float = 50.0
+    # Pause: poor return with meaningful spend behind it.
+    pause_roas_below: float = 0.8
+    pause_min_spend: float = 200.0
+    pause_ctr_below: float = 0.4  # percent
+    # Scale: strong return, healthy CTR and an audience that is not fatigued.
+    scale_roas_above: float = 3.0
+    scale_ctr_above: float = 1.0  # percent
+    max_frequency: float = 4.0
+
+    @classmethod
+    def from_env(cls) -> "RuleThresholds":
+        """Override any field with a RULES_<FIELD_NAME> environment variable."""
+        overrides: Dict[str, Any] = {}
+        for f in fields(cls):
+            raw = os.getenv(f"RULES_{f.name.upper()}")
+            if raw is not None:
+                overrides[f.name] = int(raw) if f.type in ("int", int) else float(raw)
+        return cls(**overrides)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    out = np.zeros(len(num), dtype="float64")
+    np.divide(num, den, out=out, where=den > 0)
+    return out * scale
+
+
+def window_features(
+    rows: Iterable[Mapping[str, Any]],
+    window_days: int,
+    as_of: Optional[dt.date] = None,
+) -> pd.DataFrame:
+    """
+    Per-campaign sums over the `window_days` days ending at `as_of`
+    (default: the latest date in the data), plus roas / ctr (%) / frequency.
+    """
+    df = pd.DataFrame.from_records(
+        list(rows), columns=["campaign_id", "campaign_name", "objective", "account_id", "date", *_METRICS]
+    )
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    for col in _METRICS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+
+    end = pd.Timestamp(as_of) if as_of else df["date"].max()
+    if pd.isna(end):
+        end = pd.Timestamp(dt.date.today())
+    start = end - pd.Timedelta(days=window_days - 1)
+    df = df[(df["date"] >= start) & (df["date"] <= end)]
+
+    out = df.groupby("campaign_id", sort=True).agg(
+        campaign_name=("campaign_name", "last"),
+        objective=("objective", "last"),
+        account_id=("account_id", "last"),
+        **{m: (m, "sum") for m in _METRICS},
+    ).reset_index()
+    out["roas"] = _ratio(out["revenue"].to_numpy(), out["spend"].to_numpy())
+    out["ctr"] = _ratio(out["clicks"].to_numpy(), out["impressions"].to_numpy(), 100.0)
+    out["frequency"] = _ratio(out["impressions"].to_numpy(), out["reach"].to_numpy())
+    return out
+
+
+def evaluate(features: pd.DataFrame, thresholds: RuleThresholds) -> pd.DataFrame:
+    """Add `decision` (scale / pause / keep / ambiguous) and `reason` columns."""
+    t = thresholds
+    spend = features["spend"].to_numpy()
+    roas = features["roas"].to_numpy()
+    ctr = features["ctr"].to_numpy()
+    freq = features["frequency"].to_numpy()
+
+    little_data = spend < t.min_spend
+    pause_roas = (roas < t.pause_roas_below) & (spend >= t.pause_min_spend)
+    pause_ctr = (ctr < t.pause_ctr_below) & (roas < 1.0) & (spend >= t.pause_min_spend)
+    pause_fatigue = (freq > t.max_frequency) & (roas < 1.0)
+    scale = (roas >= t.scale_roas_above) & (ctr >= t.scale_ctr_above) & (freq <= t.max_frequency)
+
+    conditions = [little_data, pause_roas, pause_ctr, pause_fatigue, scale]
+    out = features.copy()
+    out["decision"] = np.select(conditions, ["keep", "pause", "pause", "pause", "scale"], AMBIGUOUS)
+    out["reason"] = np.select(
+        conditions,
+        [
+            f"Spend pod {t.min_spend:g} za {t.window_days} dní – málo dat pro rozhodnutí.",
+            f"ROAS pod {t.pause_roas_below:g} při spendu nad {t.pause_min_spend:g}.",
+            f"CTR pod {t.pause_ctr_below:g} % a ROAS pod 1.",
+            f"Frekvence nad {t.max_frequency:g} a ROAS pod 1 – únava publika.",
+            f"ROAS nad {t.scale_roas_above:g}, CTR nad {t.scale_ctr_above:g} % a frekvence v normě.",
+        ],
+        "",
+    )
+    return out
+
+
+async def recommend_campaigns(
+    insight_rows: Iterable[Mapping[str, Any]],
+    thresholds: Optional[RuleThresholds] = None,
+    as_of: Optional[dt.date] = None,
+) -> Dict[str, Recommendation]:
+    """
+    Rules first, LLM only for the ambiguous rest. Each recommendation's
+    `source` is "rules" or "llm".
+    """
+    thresholds = thresholds or RuleThresholds.from_env()
+    evaluated = evaluate(window_features(insight_rows, thresholds.window_days, as_of), thresholds)
+
+    decided = evaluated[evaluated["decision"] != AMBIGUOUS]
+    results: Dict[str, Recommendation] = {
+        cid: Recommendation(campaign_id=cid, action=action, reason=reason, source="rules")
+        for cid, action, reason in zip(decided["campaign_id"], decided["decision"], decided["reason"])
+    }
+
+    ambiguous = evaluated[evaluated["decision"] == AMBIGUOUS]
+    if len(ambiguous):
+        campaigns = (
+            ambiguous.rename(columns={"campaign_id": "id", "campaign_name": "name"})
+            [["id", "name", "objective", "spend", "revenue", "roas", "ctr", "frequency", "impressions", "clicks"]]
+            .to_dict(orient="records")
+        )
+        results.update(await ai_engine.recommend_actions_batch(campaigns))
+    return results
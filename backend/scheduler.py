@@ -3,31 +3,110 @@ from __future__ import annotations
 
 import asyncio
 import time
+from typing import Awaitable, Optional, TypeVar
 
 import schedule
 
-from backend.ads_api import fetch_campaigns
+from backend import tracing
+from backend.ads_api import fetch_campaigns, fetch_insights
+from backend.database import SessionLocal, engine
+from backend.recommendations import refresh_recommendations
+from backend.retention import maintain_insights
+from backend.rollups import store_insights
+from backend.telemetry import flush_pending
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run(job: Awaitable[T]) -> T:
+    """
+    Run `job` on the scheduler's single, long-lived event loop. The pooled DB
+    engine (asyncpg) and the shared HTTP/AI clients are bound to the loop that
+    opened their connections, so a fresh asyncio.run() per job would hand them
+    connections from a closed loop.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(job)
 
 
 def _run_fetch_campaigns_sync() -> None:
     """
     The `schedule` library expects sync callables.
-    Run the async function in a fresh event loop synchronously.
+    Run the async function on the scheduler loop synchronously.
     """
     try:
-        campaigns = asyncio.run(fetch_campaigns())
+        campaigns = _run(fetch_campaigns())
         print("Fetched campaigns:", campaigns)
     except Exception as exc:
         # Keep behavior visible but explicit
         print("Error fetching campaigns:", repr(exc))
 
 
+async def _ingest_recent_insights() -> int:
+    # The global account (META_ACCESS_TOKEN) only: stored data is not tenant-scoped.
+    # Meta keeps restating the last few days, so re-ingest a short window.
+    rows = await fetch_insights(date_preset="last_3d", level="ad")
+    async with SessionLocal() as session:
+        stored = await store_insights(session, rows)
+        await session.commit()
+    return stored
+
+
+def _run_ingest_insights_sync() -> None:
+    try:
+        stored = _run(_ingest_recent_insights())
+        print("Stored insight rows:", stored)
+    except Exception as exc:
+        print("Error ingesting insights:", repr(exc))
+
+
+async def _refresh_recommendations() -> int:
+    async with SessionLocal() as session:
+        created = await refresh_recommendations(session)
+        await session.commit()
+        await flush_pending(session)
+    return created
+
+
+def _run_refresh_recommendations_sync() -> None:
+    try:
+        created = _run(_refresh_recommendations())
+        print("New recommendations:", created)
+    except Exception as exc:
+        print("Error refreshing recommendations:", repr(exc))
+
+
+async def _maintain_insights() -> dict:
+    async with SessionLocal() as session:
+        stats = await maintain_insights(session)
+        await session.commit()
+    return stats
+
+
+def _run_maintain_insights_sync() -> None:
+    try:
+        print("Insights maintenance:", _run(_maintain_insights()))
+    except Exception as exc:
+        print("Error maintaining insights:", repr(exc))
+
+
 # Every hour, as before
 schedule.every(1).hours.do(_run_fetch_campaigns_sync)
+schedule.every(1).hours.do(_run_ingest_insights_sync)
+# Runs after the ingest job registered above, on fresh rollups.
+schedule.every(1).hours.do(_run_refresh_recommendations_sync)
+# Partitions ahead, retention and weekly compaction; off-peak.
+schedule.every().day.at("03:30").do(_run_maintain_insights_sync)
 
 
 def run_scheduler() -> None:
     """Blocking scheduler loop."""
+    tracing.setup_tracing()
+    tracing.instrument_engine(engine)
     while True:
         schedule.run_pending()
         time.sleep(1)
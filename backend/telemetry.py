@@ -0,0 +1,226 @@
+# backend/telemetry.py
+"""
+Telemetry for LLM calls.
+
+Every AI call (and every batch cache hit) is recorded once via
+`record_ai_call`:
+- in the in-process `registry` (counters + a ring buffer of recent calls),
+  cheap enough to read on every request;
+- queued for the `ai_calls` table. The queue is written in batches by
+  `flush_pending`, called periodically by the API process, by the scheduler
+  after its AI jobs, and before `ai_stats` queries.
+
+`ai_stats` reports p50/p95 latency (cache hits excluded), error classes,
+the cache hit rate and daily token totals with an estimated cost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import os
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TypedDict
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import AICall
+
+# USD per 1k tokens, for the cost estimate in `ai_stats` (gpt-4 list prices).
+PRICE_PROMPT_PER_1K = float(os.getenv("AI_PRICE_PROMPT_PER_1K", "0.03"))
+PRICE_COMPLETION_PER_1K = float(os.getenv("AI_PRICE_COMPLETION_PER_1K", "0.06"))
+RECENT_CALLS = int(os.getenv("AI_TELEMETRY_RECENT_CALLS", "1000"))
+FLUSH_SECONDS = float(os.getenv("AI_TELEMETRY_FLUSH_SECONDS", "10"))
+# Oldest records are dropped when the DB is unreachable for a long time.
+MAX_PENDING = 10_000
+
+
+class AICallRecord(TypedDict):
+    created_at: dt.datetime
+    kind: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_ms: float
+    cache_hit: bool
+    error: Optional[str]
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None}
+    p50, p95 = np.percentile(np.asarray(values, dtype="float64"), [50, 95])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1)}
+
+
+def _cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return round(prompt_tokens / 1000 * PRICE_PROMPT_PER_1K + completion_tokens / 1000 * PRICE_COMPLETION_PER_1K, 4)
+
+
+class MetricsRegistry:
+    """Thread-safe in-process counters and recent-call buffer."""
+
+    def __init__(self, recent: int = RECENT_CALLS) -> None:
+        self._lock = threading.Lock()
+        self._recent: Deque[AICallRecord] = deque(maxlen=recent)
+        self._pending: Deque[AICallRecord] = deque(maxlen=MAX_PENDING)
+        self._counts: Counter = Counter()
+        self._errors: Counter = Counter()
+
+    def record(self, rec: AICallRecord) -> None:
+        with self._lock:
+            self._recent.append(rec)
+            self._pending.append(rec)
+            self._counts["calls"] += 1
+            self._counts["cache_hits"] += int(rec["cache_hit"])
+            self._counts["prompt_tokens"] += rec["prompt_tokens"]
+            self._counts["completion_tokens"] += rec["completion_tokens"]
+            if rec["error"]:
+                self._errors[rec["error"]] += 1
+
+    def drain(self) -> List[AICallRecord]:
+        """Take all records not yet persisted."""
+        with self._lock:
+            items = list(self._pending)
+            self._pending.clear()
+            return items
+
+    def requeue(self, items: List[AICallRecord]) -> None:
+        with self._lock:
+            self._pending.extendleft(reversed(items))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Process-lifetime counters plus latency percentiles of the recent calls."""
+        with self._lock:
+            latencies = [r["latency_ms"] for r in self._recent if not r["cache_hit"]]
+            counts, errors = dict(self._counts), dict(self._errors)
+        return {
+            "calls": counts.get("calls", 0),
+            "cache_hits": counts.get("cache_hits", 0),
+            "prompt_tokens": counts.get("prompt_tokens", 0),
+            "completion_tokens": counts.get("completion_tokens", 0),
+            "errors": errors,
+            "recent_latency_ms": _percentiles(latencies),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._pending.clear()
+            self._counts.clear()
+            self._errors.clear()
+
+
+registry = MetricsRegistry()
+
+
+def record_ai_call(
+    kind: str,
+    model: str,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    latency_ms: float = 0.0,
+    cache_hit: bool = False,
+    error: Optional[BaseException] = None,
+) -> None:
+    registry.record(AICallRecord(
+        created_at=dt.datetime.now(dt.timezone.utc),
+        kind=kind,
+        model=model,
+        prompt_tokens=int(prompt_tokens),
+        completion_tokens=int(completion_tokens),
+        latency_ms=float(latency_ms),
+        cache_hit=cache_hit,
+        error=type(error).__name__ if error is not None else None,
+    ))
+
+
+async def flush_pending(session: AsyncSession) -> int:
+    """Write queued records to `ai_calls` (and commit). Requeued if the write fails."""
+    items = registry.drain()
+    if not items:
+        return 0
+    try:
+        session.add_all(AICall(**item) for item in items)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        registry.requeue(items)
+        raise
+    return len(items)
+
+
+async def flush_periodically(session_factory: Callable[[], AsyncSession], interval: float = FLUSH_SECONDS) -> None:
+    """Background loop for long-running processes; errors are printed and retried next tick."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as session:
+                await flush_pending(session)
+        except Exception as exc:
+            print("Error flushing AI telemetry:", repr(exc))
+
+
+async def ai_stats(session: AsyncSession, days: int = 7) -> Dict[str, Any]:
+    """Stored call statistics for the last `days` days (UTC) plus the in-process snapshot."""
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
+    table = AICall.__table__
+
+    latencies = (
+        await session.execute(
+            select(table.c.latency_ms).where(table.c.created_at >= since, table.c.cache_hit.is_(False))
+        )
+    ).scalars().all()
+
+    totals = (
+        await session.execute(
+            select(
+                func.count().label("calls"),
+                func.coalesce(func.sum(case((table.c.cache_hit, 1), else_=0)), 0).label("cache_hits"),
+                func.count(table.c.error).label("errors"),
+            ).where(table.c.created_at >= since)
+        )
+    ).one()
+
+    error_rows = await session.execute(
+        select(table.c.error, func.count().label("n"))
+        .where(table.c.created_at >= since, table.c.error.is_not(None))
+        .group_by(table.c.error)
+    )
+
+    day = func.date(table.c.created_at)
+    daily_rows = await session.execute(
+        select(
+            day.label("date"),
+            func.count().label("calls"),
+            func.coalesce(func.sum(table.c.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(table.c.completion_tokens), 0).label("completion_tokens"),
+        )
+        .where(table.c.created_at >= since)
+        .group_by(day)
+        .order_by(day)
+    )
+    daily = [
+        {
+            "date": str(r.date),
+            "calls": r.calls,
+            "prompt_tokens": int(r.prompt_tokens),
+            "completion_tokens": int(r.completion_tokens),
+            "cost_usd": _cost(int(r.prompt_tokens), int(r.completion_tokens)),
+        }
+        for r in daily_rows
+    ]
+
+    return {
+        "days": days,
+        "calls": totals.calls,
+        "cache_hit_rate": round(totals.cache_hits / totals.calls, 3) if totals.calls else 0.0,
+        "errors": {r.error: r.n for r in error_rows},
+        "error_rate": round(totals.errors / totals.calls, 3) if totals.calls else 0.0,
+        "latency_ms": _percentiles(list(latencies)),
+        "daily": daily,
+        "process": registry.snapshot(),
+    }
@@ -0,0 +1,381 @@
+# backend/tenancy.py
+"""
+Multi-tenant access to the Graph API.
+
+- Token store: `tenant_tokens` rows keyed by (tenant_id, account_id), where
+  account_id "*" is the tenant's default token. Tokens are encrypted at rest
+  with Fernet (`cryptography` package) under TOKEN_ENCRYPTION_KEY; without
+  either, storing/reading tokens fails instead of falling back to plaintext.
+- Authentication: a request acts as a tenant only with one of the tenant's
+  API keys (`X-Tenant-Key`); only their SHA-256 is stored (`tenant_api_keys`).
+  Keys are random, so a plain hash is enough; revoked keys may still be
+  accepted for up to TENANT_TOKEN_CACHE_SECONDS by other processes.
+- Tenant context: `tenant_scope(...)` sets a ContextVar that ads_api reads for
+  the access token, so one process serves many businesses; it propagates into
+  tasks started inside the scope. Without a tenant context ads_api keeps using
+  the global META_ACCESS_TOKEN (single-tenant deployments). Stored data
+  (rollups, recommendations, audit log) belongs to that global account only,
+  so the endpoints serving it refuse tenant requests.
+- Isolation: every tenant gets its own token-bucket rate limiter and its own
+  pooled httpx client (bounded connections), so one busy or throttled tenant
+  cannot starve the others.
+
+    python -m backend.tenancy set <tenant_id> [account_id]   # token read from stdin
+    python -m backend.tenancy delete <tenant_id> [account_id]
+    python -m backend.tenancy apikey <tenant_id>              # prints a new API key once
+    python -m backend.tenancy revoke <tenant_id>              # deletes all its API keys
+    python -m backend.tenancy genkey
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime as dt
+import hashlib
+import os
+import secrets
+import sys
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from getpass import getpass
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import TenantApiKey, TenantToken
+from backend.repository import dialect_insert
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional dependency; required only for the token store
+    Fernet = None
+    InvalidToken = Exception
+
+DEFAULT_ACCOUNT = "*"
+TENANT_HEADER = "X-Tenant-ID"
+ACCOUNT_HEADER = "X-Ad-Account-ID"
+API_KEY_HEADER = "X-Tenant-Key"
+
+TOKEN_ENCRYPTION_KEY = os.getenv("TOKEN_ENCRYPTION_KEY")
+# Decrypted tokens are cached per process for this long.
+TOKEN_CACHE_SECONDS = float(os.getenv("TENANT_TOKEN_CACHE_SECONDS", "300"))
+# Graph API calls per second per tenant, and the burst allowed on top.
+TENANT_RATE_PER_SECOND = float(os.getenv("TENANT_RATE_PER_SECOND", "10"))
+TENANT_RATE_BURST = int(os.getenv("TENANT_RATE_BURST", "20"))
+# Concurrent connections per tenant client, and tenant clients kept open.
+TENANT_MAX_CONNECTIONS = int(os.getenv("TENANT_MAX_CONNECTIONS", "10"))
+TENANT_CLIENT_POOL_SIZE = int(os.getenv("TENANT_CLIENT_POOL_SIZE", "200"))
+
+
+@dataclass(frozen=True)
+class TenantContext:
+    tenant_id: str
+    access_token: str = field(repr=False)
+    account_id: str = DEFAULT_ACCOUNT
+
+
+current_tenant: ContextVar[Optional[TenantContext]] = ContextVar("current_tenant", default=None)
+
+
+@contextlib.contextmanager
+def tenant_scope(tenant_id: str, access_token: str, account_id: str = DEFAULT_ACCOUNT) -> Iterator[TenantContext]:
+    """Run the enclosed Graph API calls as `tenant_id`."""
+    context = TenantContext(tenant_id, access_token, account_id)
+    reset = current_tenant.set(context)
+    try:
+        yield context
+    finally:
+        current_tenant.reset(reset)
+
+
+# Encryption -------------------------------------------------------------------
+
+def _cipher():
+    if Fernet is None:
+        raise RuntimeError("The token store needs the `cryptography` package.")
+    if not TOKEN_ENCRYPTION_KEY:
+        raise RuntimeError("TOKEN_ENCRYPTION_KEY is not set (python -m backend.tenancy genkey).")
+    return Fernet(TOKEN_ENCRYPTION_KEY.encode())
+
+
+def encrypt_token(token: str) -> str:
+    return _cipher().encrypt(token.encode()).decode()
+
+
+def decrypt_token(ciphertext: str) -> str:
+    try:
+        return _cipher().decrypt(ciphertext.encode()).decode()
+    except InvalidToken as exc:
+        raise RuntimeError("Stored token cannot be decrypted with TOKEN_ENCRYPTION_KEY.") from exc
+
+
+# Token store ------------------------------------------------------------------
+
+_token_cache: Dict[Tuple[str, str], Tuple[float, Optional[str]]] = {}
+
+
+async def store_token(
+    session: AsyncSession,
+    tenant_id: str,
+    access_token: str,
+    account_id: str = DEFAULT_ACCOUNT,
+) -> None:
+    """Insert or replace a tenant's token (the caller commits)."""
+    table = TenantToken.__table__
+    now = dt.datetime.now(dt.timezone.utc)
+    stmt = dialect_insert(session, table).values(
+        tenant_id=tenant_id, account_id=account_id, token_ciphertext=encrypt_token(access_token),
+        created_at=now, updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.tenant_id, table.c.account_id],
+        set_={"token_ciphertext": stmt.excluded.token_ciphertext, "updated_at": now},
+    )
+    await session.execute(stmt)
+    _token_cache.pop((tenant_id, account_id), None)
+
+
+async def delete_token(session: AsyncSession, tenant_id: str, account_id: Optional[str] = None) -> int:
+    """Delete one token, or all of a tenant's tokens without `account_id` (the caller commits)."""
+    table = TenantToken.__table__
+    stmt = delete(table).where(table.c.tenant_id == tenant_id)
+    if account_id is not None:
+        stmt = stmt.where(table.c.account_id == account_id)
+    result = await session.execute(stmt)
+    for key in [k for k in _token_cache if k[0] == tenant_id]:
+        del _token_cache[key]
+    return result.rowcount or 0
+
+
+async def resolve_token(session: AsyncSession, tenant_id: str, account_id: Optional[str] = None) -> Optional[str]:
+    """The account's own token, else the tenant default; None when the tenant has neither."""
+    key = (tenant_id, account_id or DEFAULT_ACCOUNT)
+    cached = _token_cache.get(key)
+    if cached and time.monotonic() - cached[0] < TOKEN_CACHE_SECONDS:
+        return cached[1]
+
+    table = TenantToken.__table__
+    accounts = [DEFAULT_ACCOUNT] if key[1] == DEFAULT_ACCOUNT else [key[1], DEFAULT_ACCOUNT]
+    rows = dict((await session.execute(
+        select(table.c.account_id, table.c.token_ciphertext)
+        .where(table.c.tenant_id == tenant_id, table.c.account_id.in_(accounts))
+    )).all())
+    ciphertext = next((rows[a] for a in accounts if a in rows), None)
+    token = decrypt_token(ciphertext) if ciphertext else None
+    _token_cache[key] = (time.monotonic(), token)
+    return token
+
+
+# API keys ---------------------------------------------------------------------
+
+_key_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+async def create_api_key(session: AsyncSession, tenant_id: str) -> str:
+    """Create a new API key for `tenant_id` and return it; only its hash is kept (the caller commits)."""
+    api_key = secrets.token_urlsafe(32)
+    session.add(TenantApiKey(
+        key_hash=hash_api_key(api_key), tenant_id=tenant_id, created_at=dt.datetime.now(dt.timezone.utc),
+    ))
+    await session.flush()
+    return api_key
+
+
+async def revoke_api_keys(session: AsyncSession, tenant_id: str) -> int:
+    """Delete all of a tenant's API keys (the caller commits)."""
+    table = TenantApiKey.__table__
+    result = await session.execute(delete(table).where(table.c.tenant_id == tenant_id))
+    for key in [k for k, (_, tenant) in _key_cache.items() if tenant == tenant_id]:
+        del _key_cache[key]
+    return result.rowcount or 0
+
+
+async def authenticate(session: AsyncSession, tenant_id: str, api_key: Optional[str]) -> bool:
+    """Whether `api_key` is one of `tenant_id`'s API keys."""
+    if not api_key:
+        return False
+    key_hash = hash_api_key(api_key)
+    cached = _key_cache.get(key_hash)
+    if cached and time.monotonic() - cached[0] < TOKEN_CACHE_SECONDS:
+        owner = cached[1]
+    else:
+        table = TenantApiKey.__table__
+        owner = (await session.execute(
+            select(table.c.tenant_id).where(table.c.key_hash == key_hash)
+        )).scalar()
+        _key_cache[key_hash] = (time.monotonic(), owner)
+    return owner == tenant_id
+
+
+# Per-tenant rate limiting -----------------------------------------------------
+
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float = TENANT_RATE_PER_SECOND, burst: int = TENANT_RATE_BURST) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:  # FIFO: waiting callers keep their order
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def limiter_for(tenant_id: str) -> TokenBucket:
+    global _limiters_loop
+    # Locks belong to one event loop; scripts/scheduler jobs run a new loop each time.
+    loop = asyncio.get_running_loop()
+    if loop is not _limiters_loop:
+        _limiters.clear()
+        _limiters_loop = loop
+    limiter = _limiters.get(tenant_id)
+    if limiter is None:
+        limiter = _limiters[tenant_id] = TokenBucket()
+    return limiter
+
+
+async def throttle() -> None:
+    """Wait for the current tenant's rate limiter; no-op outside a tenant scope."""
+    context = current_tenant.get()
+    if context is not None:
+        await limiter_for(context.tenant_id).acquire()
+
+
+# Per-tenant client pool -------------------------------------------------------
+
+class TenantClientPool:
+    """
+    One httpx.AsyncClient per tenant, each with its own connection limit, kept
+    in LRU order. Idle clients beyond `max_clients` are closed; a client in use
+    is never closed under a running request.
+    """
+
+    def __init__(self, max_clients: int = TENANT_CLIENT_POOL_SIZE, max_connections: int = TENANT_MAX_CONNECTIONS):
+        self.max_clients = max_clients
+        self.max_connections = max_connections
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _new_client(self, timeout: httpx.Timeout) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        return httpx.AsyncClient(timeout=timeout, limits=limits)
+
+    async def _evict(self) -> None:
+        for tenant_id in list(self._clients):
+            if len(self._clients) <= self.max_clients:
+                break
+            if not self._in_use.get(tenant_id):
+                await self._clients.pop(tenant_id).aclose()
+
+    @contextlib.asynccontextmanager
+    async def client(self, tenant_id: str, timeout: httpx.Timeout) -> AsyncIterator[httpx.AsyncClient]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections of a finished event loop are unusable; start over.
+            self._clients.clear()
+            self._in_use.clear()
+            self._loop = loop
+        client = self._clients.get(tenant_id)
+        if client is None or client.is_closed:
+            client = self._clients[tenant_id] = self._new_client(timeout)
+        self._clients.move_to_end(tenant_id)
+        self._in_use[tenant_id] = self._in_use.get(tenant_id, 0) + 1
+        try:
+            yield client
+        finally:
+            self._in_use[tenant_id] -= 1
+            if not self._in_use[tenant_id]:
+                del self._in_use[tenant_id]
+            await self._evict()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        while self._clients:
+            await self._clients.popitem()[1].aclose()
+
+
+client_pool = TenantClientPool()
+
+
+# CLI --------------------------------------------------------------------------
+
+USAGE = (
+    "usage: python -m backend.tenancy set <tenant_id> [account_id] | delete <tenant_id> [account_id] "
+    "| apikey <tenant_id> | revoke <tenant_id> | genkey"
+)
+
+
+def _read_token() -> str:
+    """The token from a prompt or piped stdin; never from argv (shell history, `ps`)."""
+    if sys.stdin.isatty():
+        return getpass("Access token: ").strip()
+    return sys.stdin.readline().strip()
+
+
+async def _main(argv: List[str]) -> None:
+    from backend.database import SessionLocal
+
+    command, args = (argv[0], argv[1:]) if argv else ("", [])
+    if command == "genkey":
+        if Fernet is None:
+            raise SystemExit("genkey needs the `cryptography` package.")
+        print(Fernet.generate_key().decode())
+    elif command == "set" and len(args) in (1, 2):
+        token = _read_token()
+        if not token:
+            raise SystemExit("No access token given.")
+        async with SessionLocal() as session:
+            await store_token(session, args[0], token, *args[1:])
+            await session.commit()
+        print(f"Token stored for tenant {args[0]}.")
+    elif command == "delete" and len(args) in (1, 2):
+        async with SessionLocal() as session:
+            deleted = await delete_token(session, *args)
+            await session.commit()
+        print(f"Deleted {deleted} token(s).")
+    elif command == "apikey" and len(args) == 1:
+        async with SessionLocal() as session:
+            api_key = await create_api_key(session, args[0])
+            await session.commit()
+        print(f"API key for tenant {args[0]} (send as {API_KEY_HEADER}; shown only once):")
+        print(api_key)
+    elif command == "revoke" and len(args) == 1:
+        async with SessionLocal() as session:
+            revoked = await revoke_api_keys(session, args[0])
+            await session.commit()
+        print(f"Revoked {revoked} API key(s).")
+    else:
+        print(USAGE)
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+# backend/tracing.py
+"""
+OpenTelemetry tracing for the request, crawl, DB and AI paths.
+
+Spans are created through the OpenTelemetry API:
+- `http <METHOD> <route>` per FastAPI request (middleware in main; incoming
+  `traceparent` headers are honoured). It ends once the response body is
+  sent, so streamed responses (SSE) cover the whole stream;
+- `crawl.campaigns` / `crawl.insights` around the Graph fan-out, with one
+  `graph <METHOD> <path>` span per `_get`/`_post` call (path, account, page);
+- `db.transaction` per DB transaction with a `db <OPERATION>` child span per
+  statement (engine events);
+- `ai.<kind>` per LLM call, with model and token usage.
+
+Export is configured by `setup_tracing` from the environment:
+- OTEL_TRACES_EXPORTER: "none" (default), "console" or "otlp";
+- OTEL_EXPORTER_OTLP_ENDPOINT (http://localhost:4318): collector for "otlp"
+  (OTLP over HTTP, e.g. a local Jaeger or otel-collector);
+- OTEL_SERVICE_NAME (madgicx-backend).
+A custom SpanExporter can also be passed in. The SDK/exporter packages
+(opentelemetry-sdk, opentelemetry-exporter-otlp-proto-http) are optional;
+without them every span is a no-op and tracing costs next to nothing.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import os
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple, TypeVar, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # optional dependency
+    otel_context = propagate = trace = None
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # optional dependency
+    TracerProvider = None
+
+OTEL_TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "madgicx-backend")
+# Longer statements are truncated in the `db.statement` attribute.
+STATEMENT_MAX_CHARS = 500
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_provider = None
+
+
+class _NoopSpan:
+    """Stand-in when the OpenTelemetry API is not installed."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def set_status(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+def _make_exporter(name: str):
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("OTLP trace export needs opentelemetry-exporter-otlp-proto-http; tracing disabled.")
+            return None
+        return OTLPSpanExporter(endpoint=f"{OTEL_EXPORTER_OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+    return None
+
+
+def setup_tracing(exporter: Any = None, service_name: str = OTEL_SERVICE_NAME) -> bool:
+    """
+    Install an SDK tracer provider exporting to `exporter` (default: from
+    OTEL_TRACES_EXPORTER). Returns False when tracing stays a no-op.
+    """
+    global _provider
+    if _provider is not None:
+        return True
+    if exporter is None and OTEL_TRACES_EXPORTER in ("", "none"):
+        return False
+    if TracerProvider is None or trace is None:
+        print("Tracing requested but opentelemetry-sdk is not installed; tracing disabled.")
+        return False
+    exporter = exporter or _make_exporter(OTEL_TRACES_EXPORTER)
+    if exporter is None:
+        return False
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the exporter (app shutdown)."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def _tracer():
+    return trace.get_tracer("backend") if trace is not None else None
+
+
+def _clean(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Current span around the enclosed block; exceptions are recorded on it."""
+    tracer = _tracer()
+    if tracer is None:
+        yield _NoopSpan()
+        return
+    with tracer.start_as_current_span(name, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def start_span(name: str, parent: Any = None, **attributes: Any) -> Any:
+    """
+    Span that is not made current; the caller ends it. For async generators
+    and event hooks, where attaching a context across yields/callbacks is unsafe.
+    """
+    tracer = _tracer()
+    if tracer is None:
+        return _NoopSpan()
+    context = trace.set_span_in_context(parent) if parent is not None else None
+    return tracer.start_span(name, context=context, attributes=_clean(attributes))
+
+
+def end_span(current: Any, error: Optional[BaseException] = None) -> None:
+    if error is not None:
+        current.record_exception(error)
+        if trace is not None:
+            current.set_status(Status(StatusCode.ERROR, type(error).__name__))
+    current.end()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator running an async function inside `span(name)`."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def start_request_span(method: str, path: str, headers: Any) -> Tuple[Any, Any]:
+    """
+    Server span for one HTTP request, continuing an incoming trace if any, and
+    made current. Returns (span, token): `detach(token)` once the handler has
+    returned, end the span with `end_after` once the body is sent.
+    """
+    tracer = _tracer()
+    if tracer is None:
+        return _NoopSpan(), None
+    current = tracer.start_span(
+        f"http {method} {path}",
+        context=propagate.extract(dict(headers)),
+        kind=trace.SpanKind.SERVER,
+        attributes={"http.request.method": method, "url.path": path},
+    )
+    return current, otel_context.attach(trace.set_span_in_context(current))
+
+
+def detach(token: Any) -> None:
+    if token is not None:
+        otel_context.detach(token)
+
+
+async def end_after(current: Any, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Pass a response body through and end `current` when it is fully sent (or fails)."""
+    error: Optional[BaseException] = None
+    try:
+        async for chunk in body:
+            yield chunk
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        end_span(current, error)
+
+
+# Database ---------------------------------------------------------------------
+
+def instrument_engine(engine: Union[AsyncEngine, Engine]) -> None:
+    """Trace transactions and statements on `engine` (idempotent)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if getattr(sync_engine, "_tracing_instrumented", False):
+        return
+    system = sync_engine.dialect.name
+
+    def _end_transaction(conn, outcome: str) -> None:
+        current = conn.info.pop("_trace_tx", None)
+        if current is not None:
+            current.set_attribute("db.transaction.outcome", outcome)
+            current.end()
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin(conn):
+        conn.info["_trace_tx"] = start_span("db.transaction", **{"db.system": system})
+
+    @event.listens_for(sync_engine, "commit")
+    def _commit(conn):
+        _end_transaction(conn, "commit")
+
+    @event.listens_for(sync_engine, "rollback")
+    def _rollback(conn):
+        _end_transaction(conn, "rollback")
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = (statement.lstrip().split(None, 1) or ["OTHER"])[0].upper()
+        conn.info.setdefault("_trace_stmt", []).append(start_span(
+            f"db {operation}",
+            parent=conn.info.get("_trace_tx"),
+            **{
+                "db.system": system,
+                "db.operation.name": operation,
+                "db.statement": statement[:STATEMENT_MAX_CHARS],
+                "db.executemany": executemany,
+            },
+        ))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_trace_stmt")
+        if stack:
+            stack.pop().end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        stack = conn.info.get("_trace_stmt") if conn is not None else None
+        if stack:
+            end_span(stack.pop(), exception_context.original_exception)
+
+    sync_engine._tracing_instrumented = True
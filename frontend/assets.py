@@ -0,0 +1,61 @@
+# frontend/assets.py
+"""
+Memoized static assets for the Streamlit UI.
+
+Every widget interaction reruns the whole script; without caching each rerun
+re-reads and re-encodes the same avatar files. Data URIs are cached per
+(path, mtime), so a replaced file is picked up on the next rerun while
+unchanged files cost a single `os.stat`.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import mimetypes
+import os
+from typing import Optional, Tuple
+
+import streamlit as st
+from PIL import Image, ImageOps
+
+
+def img_to_base64(path: str) -> str:
+    """Return base64 for an image file or empty string on failure."""
+    try:
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    except Exception:
+        return ""
+
+
+@st.cache_resource(max_entries=512, show_spinner=False)
+def _encode_data_uri(path: str, mtime_ns: int, max_size: Optional[Tuple[int, int]]) -> str:
+    # `mtime_ns` is only part of the cache key.
+    if max_size is None:
+        b64 = img_to_base64(path)
+        mime = mimetypes.guess_type(path)[0] or "image/jpeg"
+        return f"data:{mime};base64,{b64}" if b64 else ""
+
+    try:
+        with Image.open(path) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=85, optimize=True)
+    except OSError:
+        return ""
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def image_data_uri(path: str, max_size: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Cached `data:` URI for an image, or "" when the file is missing/unreadable.
+    With `max_size` the image is downscaled first (small inline avatars do not
+    need to ship the full-resolution original to the browser).
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return ""
+    return _encode_data_uri(path, mtime_ns, max_size)
@@ -0,0 +1,166 @@
+# frontend/data.py
+"""
+Shared data layer for the Streamlit UI.
+
+- One pooled `requests.Session` per server process (keep-alive, GET retries).
+- `get_json`: small GET endpoints cached with `st.cache_data` and a TTL, shared
+  by all sessions.
+- `stream_text`: Server-Sent Events endpoints as a text generator (for
+  `st.write_stream`).
+- `CampaignStore`: the expensive `/campaigns` crawl is kept as one process-wide
+  snapshot and refreshed by a daemon thread (stale-while-revalidate), so UI
+  reruns and "Refresh" clicks read memory instead of waiting up to 60 s.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE = os.getenv("API_BASE", "http://localhost:8000")
+
+CAMPAIGNS_TTL_SECONDS = float(os.getenv("CAMPAIGNS_TTL_SECONDS", "300"))
+JSON_TTL_SECONDS = float(os.getenv("JSON_TTL_SECONDS", "60"))
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    """Process-wide pooled session (reused TCP/TLS connections to the backend)."""
+    session = requests.Session()
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_campaigns_via_api(include_insights: bool = False) -> List[Dict[str, Any]]:
+    """
+    GET /campaigns. Parity with original: we ignore the 'include_insights' flag here.
+    """
+    resp = http_session().get(f"{API_BASE}/campaigns", timeout=60)
+    resp.raise_for_status()
+    return resp.json()
+
+
+@st.cache_data(ttl=JSON_TTL_SECONDS, show_spinner=False)
+def get_json(path: str, params: Optional[Tuple[Tuple[str, Any], ...]] = None) -> Any:
+    """
+    Cached GET `{API_BASE}{path}`. `params` is a tuple of pairs so it is hashable
+    for the cache key. Errors are raised (and therefore not cached).
+    """
+    resp = http_session().get(f"{API_BASE}{path}", params=dict(params or ()), timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Parse SSE lines into (event, data) pairs; event defaults to "message"."""
+    event, data = "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            value = line[5:]
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def stream_text(path: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Yield text chunks from an SSE endpoint until its `done` event.
+    An `error` event is raised as RuntimeError.
+    """
+    with http_session().get(f"{API_BASE}{path}", params=params, stream=True, timeout=(5, 120)) as resp:
+        resp.raise_for_status()
+        for event, data in iter_sse(resp.iter_lines(decode_unicode=True)):
+            if event == "done":
+                return
+            if event == "error":
+                raise RuntimeError(data)
+            yield data
+
+
+class CampaignStore:
+    """
+    Latest campaigns snapshot shared across sessions.
+
+    `snapshot()` never blocks. `refresh()` starts a background fetch unless one
+    is already running. `get()` is the read path: it returns the snapshot and,
+    once it is older than `ttl`, revalidates it in the background
+    (stale-while-revalidate), so nothing is crawled while nobody is looking.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict[str, Any]]], ttl: float = CAMPAIGNS_TTL_SECONDS) -> None:
+        self._fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: Optional[List[Dict[str, Any]]] = None
+        self._updated_at: Optional[float] = None
+        self._error: Optional[BaseException] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float], Optional[BaseException]]:
+        """(data, updated_at epoch seconds, last error)."""
+        with self._lock:
+            return self._data, self._updated_at, self._error
+
+    def get(self) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float], Optional[BaseException]]:
+        """`snapshot()`, starting a background refresh if the data is stale."""
+        current = self.snapshot()
+        if current[0] is not None and not self.is_fresh():
+            self.refresh()
+        return current
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._updated_at is not None and time.time() - self._updated_at < self.ttl
+
+    @property
+    def refreshing(self) -> bool:
+        with self._lock:
+            return self._worker is not None and self._worker.is_alive()
+
+    def _run_fetch(self) -> None:
+        try:
+            data = self._fetch()
+        except Exception as exc:
+            with self._lock:
+                self._error = exc  # keep serving the previous snapshot
+            return
+        with self._lock:
+            self._data = data
+            self._updated_at = time.time()
+            self._error = None
+
+    def refresh(self, wait: bool = False) -> None:
+        """Start a background refresh (no-op if one is running); `wait` joins it."""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_fetch, name="campaigns-refresh", daemon=True)
+                self._worker.start()
+            worker = self._worker
+        if wait:
+            worker.join()
+
+
+@st.cache_resource
+def campaign_store() -> CampaignStore:
+    return CampaignStore(lambda: fetch_campaigns_via_api(include_insights=True))
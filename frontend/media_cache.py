@@ -0,0 +1,97 @@
+# frontend/media_cache.py
+"""
+On-disk thumbnail / poster-frame cache for the Ads Library page.
+
+Thumbnails are keyed by source path + mtime + size, so an edited file gets a
+fresh thumbnail and stale entries are simply never looked up again.
+Video poster frames need `ffmpeg` on PATH; without it videos have no preview
+image and the grid shows a placeholder tile instead.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+THUMB_CACHE_DIR = os.getenv(
+    "MEDIA_THUMB_CACHE_DIR", os.path.join("frontend", ".cache", "thumbnails")
+)
+THUMB_SIZE: Tuple[int, int] = (360, 360)
+VIDEO_EXTS = (".mp4",)
+
+
+def _cache_key(path: str) -> str:
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _thumb_path(path: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{_cache_key(path)}.jpg")
+
+
+def _image_thumbnail(src: str, dst: str, size: Tuple[int, int]) -> None:
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        img.save(dst, "JPEG", quality=80, optimize=True)
+
+
+def _video_poster(src: str, dst: str, size: Tuple[int, int]) -> bool:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return False
+    cmd = [
+        ffmpeg, "-loglevel", "error", "-y",
+        "-ss", "1", "-i", src, "-frames:v", "1",
+        "-vf", f"scale='min({size[0]},iw)':-2",
+        dst,
+    ]
+    try:
+        subprocess.run(cmd, check=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return os.path.exists(dst)
+
+
+def get_thumbnail(
+    path: str,
+    cache_dir: str = THUMB_CACHE_DIR,
+    size: Tuple[int, int] = THUMB_SIZE,
+) -> Optional[str]:
+    """
+    Return the cached thumbnail path for an image/video, creating it on first use.
+    Returns None when no preview can be produced (unreadable file, decompression
+    bomb, no ffmpeg).
+    """
+    try:
+        dst = _thumb_path(path, cache_dir)
+    except OSError:
+        return None
+    if os.path.exists(dst):
+        return dst
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write-then-rename so concurrent reruns never see half a file; each writer
+    # gets its own temp file in the cache dir (same filesystem for os.replace).
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp.jpg", delete=False) as fh:
+        tmp = fh.name
+    try:
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTS:
+            if not _video_poster(path, tmp, size):
+                return None
+        else:
+            _image_thumbnail(path, tmp, size)
+        os.replace(tmp, dst)
+    except (OSError, Image.DecompressionBombError):
+        return None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dst
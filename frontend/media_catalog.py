@@ -0,0 +1,244 @@
+# frontend/media_catalog.py
+"""
+Persistent media catalog for the Ads Library page.
+
+A small SQLite table (path, type, category, size, dimensions, mtime) replaces
+`os.listdir` scans on every Streamlit rerun. `refresh` is incremental: only
+files whose mtime/size changed are re-read, and the directory is rescanned
+only when its own mtime moved or the rescan interval elapsed. Pages are
+served with indexed `LIMIT/OFFSET` queries, so render cost does not grow with
+the folder size.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, TypedDict
+
+from PIL import Image
+
+CATALOG_DB_PATH = os.getenv(
+    "MEDIA_CATALOG_DB", os.path.join("frontend", ".cache", "media_catalog.sqlite3")
+)
+RESCAN_SECONDS = float(os.getenv("MEDIA_CATALOG_RESCAN_SECONDS", "60"))
+
+VIDEO_EXTS = (".mp4",)
+CATEGORIES = ("products", "avatars", "others")
+
+# sort key -> ORDER BY column
+SORT_COLUMNS: Dict[str, str] = {
+    "name": "name",
+    "mtime": "mtime",
+    "size": "size",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path      TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    type      TEXT NOT NULL,
+    category  TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    width     INTEGER,
+    height    INTEGER,
+    mtime     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_media_dir_category_name ON media (directory, category, name);
+CREATE INDEX IF NOT EXISTS ix_media_dir_category_mtime ON media (directory, category, mtime);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class MediaItem(TypedDict):
+    path: str
+    directory: str
+    name: str
+    type: str
+    category: str
+    size: int
+    width: Optional[int]
+    height: Optional[int]
+    mtime: float
+
+
+def classify(name: str) -> str:
+    """Category by filename prefix (same rules as the original split_media_by_prefix)."""
+    lower = os.path.basename(name).lower()
+    if lower.startswith("product"):
+        return "products"
+    if lower.startswith("avatar"):
+        return "avatars"
+    return "others"
+
+
+def _dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+    # Image.open only parses the header; pixel data is never decoded here.
+    try:
+        with Image.open(path) as img:
+            return img.width, img.height
+    except OSError:
+        return None, None
+
+
+class MediaCatalog:
+    def __init__(self, db_path: str = CATALOG_DB_PATH) -> None:
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per call: safe across Streamlit script threads.
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # -- maintenance ----------------------------------------------------------
+
+    def _get_meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute(
+            "INSERT INTO catalog_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def refresh(
+        self,
+        media_dir: str,
+        allowed_exts: Sequence[str],
+        force: bool = False,
+    ) -> bool:
+        """
+        Sync the catalog with `media_dir`. Returns True when a scan actually ran.
+        Skipped (cheap: one stat + one query) while the directory mtime is unchanged
+        and the last scan is younger than RESCAN_SECONDS.
+        """
+        try:
+            dir_mtime = os.stat(media_dir).st_mtime
+        except OSError:
+            dir_mtime = -1.0
+
+        with self._connect() as conn:
+            last_dir_mtime = self._get_meta(conn, f"dir_mtime:{media_dir}")
+            last_scan = float(self._get_meta(conn, f"scanned_at:{media_dir}") or 0)
+            if (
+                not force
+                and last_dir_mtime is not None
+                and float(last_dir_mtime) == dir_mtime
+                and time.time() - last_scan < RESCAN_SECONDS
+            ):
+                return False
+
+            known = {
+                row["path"]: (row["mtime"], row["size"])
+                for row in conn.execute(
+                    "SELECT path, mtime, size FROM media WHERE directory = ?",
+                    (media_dir,),
+                )
+            }
+            exts = {e.lower() for e in allowed_exts}
+            seen = set()
+            changed: List[Tuple] = []
+
+            if dir_mtime >= 0:
+                with os.scandir(media_dir) as entries:
+                    for entry in entries:
+                        ext = os.path.splitext(entry.name)[1].lower()
+                        if ext not in exts or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        seen.add(entry.path)
+                        if known.get(entry.path) == (stat.st_mtime, stat.st_size):
+                            continue
+                        is_video = ext in VIDEO_EXTS
+                        width, height = (None, None) if is_video else _dimensions(entry.path)
+                        changed.append((
+                            entry.path, media_dir, entry.name, "video" if is_video else "image",
+                            classify(entry.name), stat.st_size, width, height, stat.st_mtime,
+                        ))
+
+            if changed:
+                conn.executemany(
+                    "INSERT INTO media (path, directory, name, type, category, size, width, height, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET name = excluded.name, type = excluded.type, "
+                    "category = excluded.category, size = excluded.size, width = excluded.width, "
+                    "height = excluded.height, mtime = excluded.mtime",
+                    changed,
+                )
+            removed = [(p,) for p in known if p not in seen]
+            if removed:
+                conn.executemany("DELETE FROM media WHERE path = ?", removed)
+
+            self._set_meta(conn, f"dir_mtime:{media_dir}", repr(dir_mtime))
+            self._set_meta(conn, f"scanned_at:{media_dir}", repr(time.time()))
+        return True
+
+    # -- queries --------------------------------------------------------------
+
+    @staticmethod
+    def _where(
+        media_dir: Optional[str], category: Optional[str], media_type: Optional[str]
+    ) -> Tuple[str, List]:
+        clauses, args = [], []
+        if media_dir:
+            clauses.append("directory = ?")
+            args.append(media_dir)
+        if category:
+            clauses.append("category = ?")
+            args.append(category)
+        if media_type:
+            clauses.append("type = ?")
+            args.append(media_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def count(
+        self,
+        media_dir: Optional[str] = None,
+        category: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> int:
+        where, args = self._where(media_dir, category, media_type)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM media{where}", args).fetchone()[0]
+
+    def query(
+        self,
+        media_dir: Optional[str] = None,
+        category: Optional[str] = None,
+        media_type: Optional[str] = None,
+        sort: str = "name",
+        descending: bool = False,
+        limit: int = 24,
+        offset: int = 0,
+    ) -> List[MediaItem]:
+        """Filtered, sorted page of catalog rows."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        where, args = self._where(media_dir, category, media_type)
+        order = f"{SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, path"
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM media{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*args, limit, offset],
+            ).fetchall()
+        return [MediaItem(**dict(r)) for r in rows]  # type: ignore[misc]
@@ -11,26 +11,28 @@ Behavior parity:
 
 from __future__ import annotations
 
-import base64
+import math
 import os
 import sys
+import time
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-import requests
 import streamlit as st
 from streamlit.components.v1 import html as st_html
 from streamlit_extras.stylable_container import stylable_container
 
 # Ensure project root is importable (parity with original)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from frontend.assets import image_data_uri  # noqa: E402
+from frontend.data import API_BASE, campaign_store, get_json, http_session, stream_text  # noqa: E402
+from frontend.media_cache import get_thumbnail  # noqa: E402
+from frontend.media_catalog import MediaCatalog  # noqa: E402
 from frontend.utils import display_campaigns  # noqa: E402
 
 # --------------------------------------------------------------------------------------
 # Constants
 # --------------------------------------------------------------------------------------
 
-API_BASE = "http://localhost:8000"
-
 # Keep identical mapping (frontend uses it for validates / UI)
 OBJECTIVE_OPTIMIZATION_MAP: Dict[str, List[str]] = {
     "OUTCOME_SALES": ["CONVERSIONS", "VALUE", "LANDING_PAGE_VIEWS"],
@@ -326,24 +328,6 @@ def inject_css(css: str) -> None:
     st.markdown(css, unsafe_allow_html=True)
 
 
-def fetch_campaigns_via_api(include_insights: bool = False) -> List[Dict[str, Any]]:
-    """
-    GET /campaigns. Parity with original: we ignore the 'include_insights' flag here.
-    """
-    resp = requests.get(f"{API_BASE}/campaigns", timeout=60)
-    resp.raise_for_status()
-    return resp.json()
-
-
-def img_to_base64(path: str) -> str:
-    """Return base64 for an image file or empty string on failure."""
-    try:
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    except Exception:
-        return ""
-
-
 def build_sidebar() -> str:
     """Render the narrow icon-only sidebar and return the selected page label."""
     return st.sidebar.radio(
@@ -386,9 +370,10 @@ def render_save_work_card() -> None:
 
     avatars_html = ""
     for p in people:
-        b64 = img_to_base64(p["avatar"])
-        if b64:
-            avatars_html += f'<img src="data:image/jpeg;base64,{b64}"/>'
+        # Cached per file mtime; shown at 32px, so a 64px (retina) copy is enough.
+        uri = image_data_uri(p["avatar"], max_size=(64, 64))
+        if uri:
+            avatars_html += f'<img src="{uri}"/>'
 
     rows_html = "".join(
         f'<div class="sw-row"><b>{p["name"]}</b> – {p["action"]}'
@@ -416,13 +401,18 @@ def render_save_work_card() -> None:
 
 
 def render_monthly_goals_fixed_box() -> None:
-    """Right top goals card built with raw HTML (parity with original)."""
+    """Right top goals card built with raw HTML; current values come from the monthly rollup."""
     inject_css(MG_CSS)
 
+    try:
+        month = get_json("/rollups/monthly")
+    except Exception:
+        month = {}
+
     goals = [
-        {"name": "Revenue", "current": 34500, "target": 50000, "fmt": "${:,.0f}"},
-        {"name": "Spend", "current": 18000, "target": 20000, "fmt": "${:,.0f}"},
-        {"name": "ROAS", "current": 1.92, "target": 2.50, "fmt": "{:,.2f}x"},
+        {"name": "Revenue", "current": month.get("revenue", 0.0), "target": 50000, "fmt": "${:,.0f}"},
+        {"name": "Spend", "current": month.get("spend", 0.0), "target": 20000, "fmt": "${:,.0f}"},
+        {"name": "ROAS", "current": month.get("roas", 0.0), "target": 2.50, "fmt": "{:,.2f}x"},
     ]
 
     rows: List[str] = []
@@ -448,33 +438,84 @@ def render_monthly_goals_fixed_box() -> None:
     st_html(mg_html, height=260, scrolling=False)
 
 
+# Shown when the backend has no stored recommendations (or is unreachable).
+STATIC_RECOMMENDATIONS: List[Dict[str, Any]] = [
+    {
+        "title": "Increase budget on top 3 ROAS ad sets",
+        "why": "ROAS > 3.0, but spend < 20% of daily budget. Estimated +12% revenue.",
+        "tags": ["Budget", "Meta", "ROAS"],
+        "action_key": "launch_budget",
+    },
+    {
+        "title": "Pause low CTR creatives",
+        "why": "CTR < 0.7% for 5 days. Reallocate spend to higher CTR assets.",
+        "tags": ["Creative", "CTR", "Optimization"],
+        "action_key": "pause_creatives",
+    },
+    {
+        "title": "Test new hook for Summer sale",
+        "why": "Engagement down 18% WoW on primary audience. Add fresh intro line.",
+        "tags": ["Copywriting", "Seasonal", "Idea"],
+        "action_key": "test_hook",
+    },
+]
+
+REC_ACTION_TITLES = {"scale": "Scale campaign", "pause": "Pause campaign"}
+RECS_LIMIT = 5
+
+
+def fetch_recommendations() -> Optional[List[Dict[str, Any]]]:
+    """Stored recommendations mapped to card items, or None when there are none/unavailable."""
+    try:
+        page = get_json("/recommendations", (("limit", RECS_LIMIT),))
+    except Exception:
+        return None
+    items = []
+    for rec in page.get("items", []):
+        name = rec.get("campaign_name") or rec["campaign_id"]
+        items.append({
+            "id": rec["id"],
+            "title": f"{REC_ACTION_TITLES.get(rec['action'], rec['action'])} {name}",
+            "why": rec.get("rationale", ""),
+            "tags": [rec["action"].capitalize(), "Meta", "AI" if rec.get("source") == "llm" else "Rules"],
+            "action_key": f"{rec['action']}_{rec['campaign_id']}",
+        })
+    return items or None
+
+
+def update_recommendation_status(rec_id: int, status: str) -> bool:
+    """PATCH the stored status; drops the cached list so the card re-reads it."""
+    try:
+        resp = http_session().patch(f"{API_BASE}/recommendations/{rec_id}", json={"status": status}, timeout=15)
+        resp.raise_for_status()
+    except Exception as e:
+        st.error(f"Uložení stavu doporučení selhalo: {e}")
+        return False
+    get_json.clear()
+    return True
+
+
+def launch_recommendation(rec_id: int) -> Optional[Dict[str, Any]]:
+    """Apply a stored recommendation on Meta; returns the executor outcome or None on error."""
+    try:
+        resp = http_session().post(f"{API_BASE}/recommendations/{rec_id}/launch", timeout=120)
+        resp.raise_for_status()
+    except Exception as e:
+        st.error(f"Spuštění doporučení selhalo: {e}")
+        return None
+    get_json.clear()
+    return resp.json()
+
+
 def render_recommendations() -> None:
-    """Recommendations list with Launch/Dismiss actions."""
+    """Recommendations list with Launch/Dismiss actions (stored server-side when persisted)."""
     inject_css(RECS_CSS)
 
     if "dismissed_recs" not in st.session_state:
         st.session_state["dismissed_recs"] = set()
 
-    recommendations = [
-        {
-            "title": "Increase budget on top 3 ROAS ad sets",
-            "why": "ROAS > 3.0, but spend < 20% of daily budget. Estimated +12% revenue.",
-            "tags": ["Budget", "Meta", "ROAS"],
-            "action_key": "launch_budget",
-        },
-        {
-            "title": "Pause low CTR creatives",
-            "why": "CTR < 0.7% for 5 days. Reallocate spend to higher CTR assets.",
-            "tags": ["Creative", "CTR", "Optimization"],
-            "action_key": "pause_creatives",
-        },
-        {
-            "title": "Test new hook for Summer sale",
-            "why": "Engagement down 18% WoW on primary audience. Add fresh intro line.",
-            "tags": ["Copywriting", "Seasonal", "Idea"],
-            "action_key": "test_hook",
-        },
-    ]
+    stored = fetch_recommendations()
+    recommendations = stored or STATIC_RECOMMENDATIONS
 
     with stylable_container(
         key="recs_card",
@@ -492,7 +533,8 @@ def render_recommendations() -> None:
     ):
         st.markdown("### ✨ Magical Recommendations")
         for i, rec in enumerate(recommendations):
-            if i in st.session_state["dismissed_recs"]:
+            key = rec.get("id", i)
+            if stored is None and i in st.session_state["dismissed_recs"]:
                 continue
 
             c1, c2 = st.columns([0.82, 0.18], vertical_alignment="center")
@@ -504,19 +546,47 @@ def render_recommendations() -> None:
                 st.markdown(tags_html, unsafe_allow_html=True)
                 st.markdown("</div>", unsafe_allow_html=True)
             with c2:
-                launch = st.button("Launch", key=f"rec_launch_{i}")
-                dismiss = st.button("✖", key=f"rec_dismiss_{i}")
+                launch = st.button("Launch", key=f"rec_launch_{key}")
+                dismiss = st.button("✖", key=f"rec_dismiss_{key}")
 
                 if launch:
-                    st.success(f"Launched: {rec['title']}")
-                    # TODO: connect to backend / AI engine
+                    if stored is None:
+                        st.success(f"Launched: {rec['title']}")
+                    else:
+                        outcome = launch_recommendation(rec["id"])
+                        if outcome and outcome["applied"]:
+                            st.success(f"Launched: {rec['title']}")
+                        elif outcome:
+                            errors = "; ".join(r["error"] or "" for r in outcome["results"] if not r["ok"])
+                            st.error(f"Nepodařilo se provést: {errors}")
                 if dismiss:
-                    st.session_state["dismissed_recs"].add(i)
-                    st.experimental_rerun()
+                    if stored is None:
+                        st.session_state["dismissed_recs"].add(i)
+                        st.rerun()
+                    elif update_recommendation_status(rec["id"], "dismissed"):
+                        st.rerun()
 
         st.markdown("---")
         if st.button("Ask AI marketer to do more", key="ask_ai_marketer"):
-            st.info("TODO: Trigger AI marketer – pošli prompt na backend/AI engine.")
+            try:
+                st.write_stream(stream_text("/recommendations/stream"))
+            except Exception as e:
+                st.error(f"AI marketer není dostupný: {e}")
+
+
+def fetch_month_campaign_totals() -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    Month-to-date spend/revenue per campaign from the rollups, or None when
+    unavailable or nothing has been ingested yet (the crawled values stay).
+    """
+    since = time.strftime("%Y-%m-01")
+    try:
+        rows = get_json("/rollups/campaigns", (("since", since),))
+    except Exception:
+        return None
+    if not rows:
+        return None
+    return {r["campaign_id"]: r for r in rows}
 
 
 def render_campaigns_section() -> None:
@@ -548,16 +618,33 @@ def render_campaigns_section() -> None:
         if "campaigns_data" not in st.session_state:
             st.session_state["campaigns_data"] = None
 
-        if refresh_clicked:
-            with st.spinner("Načítám kampaně…"):
-                try:
-                    st.session_state["campaigns_data"] = fetch_campaigns_via_api(include_insights=True)
-                except Exception as e:
-                    st.error("Nepodařilo se načíst kampaně.")
-                    st.exception(e)
+        # Shared snapshot: fresh data is served from memory, stale data is
+        # re-fetched in the background while the previous snapshot stays visible.
+        store = campaign_store()
+        data, updated_at, error = store.get()
+        if refresh_clicked and not store.is_fresh():
+            if data is None:
+                with st.spinner("Načítám kampaně…"):
+                    store.refresh(wait=True)
+                data, updated_at, error = store.snapshot()
+            else:
+                store.refresh()
+
+        if error is not None and refresh_clicked:
+            st.error("Nepodařilo se načíst kampaně.")
+            st.exception(error)
+
+        if updated_at is not None:
+            status = " · aktualizuji na pozadí…" if store.refreshing else ""
+            st.caption(f"Naposledy aktualizováno: {time.strftime('%H:%M:%S', time.localtime(updated_at))}{status}")
 
+        st.session_state["campaigns_data"] = data
         if st.session_state["campaigns_data"]:
-            display_campaigns(st.session_state["campaigns_data"])
+            totals = fetch_month_campaign_totals()
+            if totals is not None:
+                st.caption(f"Sloupce MTD: od {time.strftime('%Y-%m-01')} do dneška (rollupy); "
+                           "kampaně bez dat v rollupech je mají prázdné.")
+            display_campaigns(st.session_state["campaigns_data"], totals=totals)
 
 
 def render_ads_dashboard() -> None:
@@ -618,7 +705,7 @@ def form_create_campaign() -> None:
         submit_campaign = st.form_submit_button("Vytvořit kampaň")
 
         if submit_campaign:
-            res = requests.post(
+            res = http_session().post(
                 f"{API_BASE}/create_campaign",
                 json={
                     "account_id": account_id,
@@ -656,7 +743,7 @@ def form_create_adset() -> None:
         submit_adset = st.form_submit_button("Vytvořit Ad Set")
 
         if submit_adset:
-            res = requests.post(
+            res = http_session().post(
                 f"{API_BASE}/create_adset",
                 json={
                     "account_id": account_id,
@@ -698,7 +785,7 @@ def form_create_creative_image_url() -> None:
                 },
             }
             # Parity with original: this posts to /create_creative (not provided by backend)
-            res = requests.post(f"{API_BASE}/create_creative", json=payload)
+            res = http_session().post(f"{API_BASE}/create_creative", json=payload)
             if res.status_code == 200:
                 st.success(f"Creative vytvořen: {res.json()}")
             else:
@@ -731,7 +818,7 @@ def form_create_ad() -> None:
                     "creative_id": creative_id,
                     "status": status,
                 }
-                res = requests.post(f"{API_BASE}/create_ad", json=payload)
+                res = http_session().post(f"{API_BASE}/create_ad", json=payload)
                 if res.status_code == 200:
                     st.success(f"Reklama vytvořena: {res.json()}")
                 else:
@@ -745,12 +832,15 @@ def form_upload_image() -> None:
     with st.form("upload_image_form"):
         account_id = st.text_input("Ad Account ID (bez 'act_')", key="upload_account")
         image_file = st.file_uploader("Vyber obrázek (JPG/PNG)", type=["jpg", "jpeg", "png"], key="upload_image")
+        preprocess = st.checkbox(
+            "Optimalizovat před nahráním (zmenšit, odstranit metadata)", value=True, key="upload_preprocess"
+        )
         submit_upload = st.form_submit_button("Nahrát obrázek")
 
         if submit_upload and image_file is not None:
             files = {"file": (image_file.name, image_file.getvalue(), image_file.type)}
-            data = {"account_id": account_id}
-            res = requests.post(f"{API_BASE}/upload_ad_image", files=files, data=data)
+            data = {"account_id": account_id, "preprocess": str(preprocess).lower()}
+            res = http_session().post(f"{API_BASE}/upload_ad_image", files=files, data=data)
             if res.status_code == 200:
                 images = res.json().get("images", {})
                 if images:
@@ -778,7 +868,7 @@ def form_create_adcreative_hash() -> None:
         submit_creative = st.form_submit_button("Vytvořit Ad Creative")
 
         if submit_creative:
-            res = requests.post(
+            res = http_session().post(
                 f"{API_BASE}/create_adcreative",
                 json={
                     "account_id": account_id,
@@ -827,61 +917,114 @@ def render_ads_management() -> None:
 # Page: Ads Library
 # --------------------------------------------------------------------------------------
 
-def list_media_files(media_dir: str, allowed_exts: Sequence[str]) -> List[str]:
-    return [
-        f
-        for f in os.listdir(media_dir)
-        if os.path.splitext(f)[1].lower() in allowed_exts
-    ]
+LIB_PAGE_SIZE = 24
+LIB_MEDIA_DIR = os.path.join("frontend", "media", "ads")
+LIB_ALLOWED_EXTS = [".mp4", ".jpg", ".jpeg", ".png"]
 
+# Sort options shown in the UI -> (catalog sort key, descending)
+LIB_SORTS: Dict[str, Tuple[str, bool]] = {
+    "Název": ("name", False),
+    "Nejnovější": ("mtime", True),
+    "Největší": ("size", True),
+}
+LIB_TYPES: Dict[str, Optional[str]] = {"Vše": None, "Obrázky": "image", "Videa": "video"}
 
-def split_media_by_prefix(files: Sequence[str]) -> Tuple[List[str], List[str], List[str]]:
-    products = [f for f in files if os.path.basename(f).lower().startswith("product")]
-    avatars = [f for f in files if os.path.basename(f).lower().startswith("avatar")]
-    others = [f for f in files if f not in products and f not in avatars]
-    return products, avatars, others
 
+@st.cache_resource
+def get_media_catalog() -> MediaCatalog:
+    return MediaCatalog()
 
-def render_media_grid(media_dir: str, file_list: Sequence[str], cols: int = 4) -> None:
-    if not file_list:
+
+def render_media_viewer(fpath: str) -> None:
+    """Full-size view of one item; only this item's file is loaded, by path."""
+    head_l, head_r = st.columns([0.9, 0.1])
+    with head_l:
+        st.markdown(f"**{os.path.basename(fpath)}**")
+    with head_r:
+        if st.button("✖", key="lib_close"):
+            st.session_state["lib_open"] = None
+            st.rerun()
+    if os.path.splitext(fpath)[1].lower() == ".mp4":
+        st.video(fpath)
+    else:
+        st.image(fpath)
+    st.markdown("---")
+
+
+def render_media_grid(
+    catalog: MediaCatalog,
+    category: str,
+    media_type: Optional[str] = None,
+    sort: Tuple[str, bool] = ("name", False),
+    cols: int = 4,
+    total: Optional[int] = None,
+) -> None:
+    """
+    One page of a catalog category as cached thumbnails; "Otevřít" opens the full item.
+    `total` is the category's item count when the caller already has it.
+    """
+    if total is None:
+        total = catalog.count(LIB_MEDIA_DIR, category, media_type)
+    if not total:
         return
+    page_count = max(1, math.ceil(total / LIB_PAGE_SIZE))
+    page = 1
+    if page_count > 1:
+        page = int(st.number_input("Stránka", 1, page_count, 1, key=f"lib_{category}_page"))
+    items = catalog.query(
+        LIB_MEDIA_DIR,
+        category,
+        media_type,
+        sort=sort[0],
+        descending=sort[1],
+        limit=LIB_PAGE_SIZE,
+        offset=(page - 1) * LIB_PAGE_SIZE,
+    )
+
     columns = st.columns(cols)
-    for idx, fname in enumerate(sorted(file_list)):
+    for idx, item in enumerate(items):
         col = columns[idx % cols]
-        fpath = os.path.join(media_dir, fname)
-        ext = os.path.splitext(fname)[1].lower()
         with col, st.container():
-            if ext == ".mp4":
-                with open(fpath, "rb") as f:
-                    st.video(f.read())
+            thumb = get_thumbnail(item["path"])
+            if thumb:
+                st.image(thumb)
             else:
-                with open(fpath, "rb") as f:
-                    st.image(f.read())
+                icon = "🎬" if item["type"] == "video" else "🖼️"
+                st.markdown(f"{icon} `{item['name']}`")
+            if st.button("Otevřít", key=f"lib_open_{item['path']}"):
+                st.session_state["lib_open"] = item["path"]
+                st.rerun()
 
 
 def render_ads_library() -> None:
     st.markdown("## 🎞️ Ads Library – Galerie")
     inject_css(LIB_CSS)
 
-    media_dir = os.path.join("frontend", "media", "ads")
-    allowed_extensions = [".mp4", ".jpg", ".jpeg", ".png"]
-
-    files = list_media_files(media_dir, allowed_extensions)
-    products, avatars, others = split_media_by_prefix(files)
+    catalog = get_media_catalog()
+    catalog.refresh(LIB_MEDIA_DIR, LIB_ALLOWED_EXTS)
 
-    if products:
-        st.markdown("<div class='section-title'>🛍️ Products</div>", unsafe_allow_html=True)
-        render_media_grid(media_dir, products)
-        st.markdown("---")
+    f_type, f_sort = st.columns(2)
+    with f_type:
+        media_type = LIB_TYPES[st.selectbox("Typ", list(LIB_TYPES), key="lib_type")]
+    with f_sort:
+        sort = LIB_SORTS[st.selectbox("Řazení", list(LIB_SORTS), key="lib_sort")]
 
-    if avatars:
-        st.markdown("<div class='section-title'>👤 Avatars</div>", unsafe_allow_html=True)
-        render_media_grid(media_dir, avatars)
-        st.markdown("---")
+    if st.session_state.get("lib_open"):
+        render_media_viewer(st.session_state["lib_open"])
 
-    if others:
-        st.markdown("<div class='section-title'>📦 Others</div>", unsafe_allow_html=True)
-        render_media_grid(media_dir, others)
+    sections = [
+        ("products", "🛍️ Products"),
+        ("avatars", "👤 Avatars"),
+        ("others", "📦 Others"),
+    ]
+    for i, (category, title) in enumerate(sections):
+        total = catalog.count(LIB_MEDIA_DIR, category, media_type)
+        if not total:
+            continue
+        st.markdown(f"<div class='section-title'>{title}</div>", unsafe_allow_html=True)
+        render_media_grid(catalog, category, media_type, sort, total=total)
+        if i < len(sections) - 1:
+            st.markdown("---")
 
 
 # --------------------------------------------------------------------------------------
@@ -1,24 +1,37 @@
 # frontend/utils.py
 """
 Small utilities used by the Streamlit UI.
-Behavior parity with original display_campaigns implementation.
+
+`display_campaigns` renders campaigns as one paginated, sortable table built
+from a flat columnar frame; adsets/ads are only rendered for the campaign
+selected in the table, so render cost stays flat as the account grows.
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+CAMPAIGNS_PAGE_SIZE = 50
+ADS_PAGE_SIZE = 100
+
+CAMPAIGN_COLUMNS = [
+    "account_id", "id", "name", "objective", "spend", "revenue", "roas", "adsets", "ads",
+]
+
 
 def _safe_roas(revenue: float, spend: float) -> float:
     """Return ROAS or 0 when spend is 0 (preserves original logic)."""
     return (revenue / spend) if spend > 0 else 0.0
 
 
-def display_campaigns(data: List[Dict[str, Any]]) -> None:
+def campaigns_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
     """
-    Render campaigns tree and a simple goals section below it.
+    Flatten the /campaigns payload into one row per campaign.
 
     Expected input shape:
     [
@@ -37,30 +50,166 @@ def display_campaigns(data: List[Dict[str, Any]]) -> None:
       }, ...
     ]
     """
-    total_spend = 0.0
-    total_revenue = 0.0
-    roas_values: List[float] = []
+    rows = [
+        (
+            account["account_id"],
+            c["id"],
+            c.get("name", ""),
+            c.get("objective", ""),
+            float(c.get("spend", 0) or 0.0),
+            float(c.get("revenue", 0) or 0.0),
+            len(c.get("adsets", [])),
+            sum(len(s.get("ads", [])) for s in c.get("adsets", [])),
+        )
+        for account in data
+        for c in account["campaigns"]
+    ]
+    df = pd.DataFrame(
+        rows, columns=["account_id", "id", "name", "objective", "spend", "revenue", "adsets", "ads"]
+    )
+    spend = df["spend"].to_numpy()
+    revenue = df["revenue"].to_numpy()
+    df["roas"] = np.divide(revenue, spend, out=np.zeros_like(spend), where=spend > 0)
+    return df[CAMPAIGN_COLUMNS]
+
+
+def filter_campaigns(df: pd.DataFrame, query: str = "", objectives: Iterable[str] = ()) -> pd.DataFrame:
+    """Case-insensitive name/ID search plus optional objective filter."""
+    mask = np.ones(len(df), dtype=bool)
+    if query:
+        q = query.lower()
+        names = df["name"].fillna("").astype(str).str.lower()
+        mask &= names.str.contains(q, regex=False, na=False).to_numpy() | (df["id"] == query).to_numpy()
+    objectives = list(objectives)
+    if objectives:
+        mask &= df["objective"].isin(objectives).to_numpy()
+    return df[mask]
+
+
+def page_slice(df: pd.DataFrame, page: int, per_page: int) -> Tuple[pd.DataFrame, int]:
+    """Return (rows on 1-based `page`, total pages); out-of-range pages are clamped."""
+    pages = max(1, math.ceil(len(df) / per_page))
+    page = min(max(1, page), pages)
+    return df.iloc[(page - 1) * per_page: page * per_page], pages
+
+
+MTD_COLUMNS = ["mtd_spend", "mtd_revenue", "mtd_roas"]
+
+
+def apply_totals(df: pd.DataFrame, totals: Mapping[str, Mapping[str, float]]) -> pd.DataFrame:
+    """
+    Add month-to-date `mtd_spend`/`mtd_revenue`/`mtd_roas` columns from rollup
+    totals keyed by campaign id. They sit next to the crawled columns instead of
+    overwriting them: the crawl's `revenue` is purchase ROAS over the campaign
+    lifetime, not money. Campaigns without a rollup row get NaN (blank cells).
+    """
+    df = df.copy()
+    spend = df["id"].map({k: float(v.get("spend", 0.0)) for k, v in totals.items()}).to_numpy(dtype=float)
+    revenue = df["id"].map({k: float(v.get("revenue", 0.0)) for k, v in totals.items()}).to_numpy(dtype=float)
+    roas = np.full(len(df), np.nan)
+    np.divide(revenue, spend, out=roas, where=spend > 0)
+    roas[(spend == 0) & ~np.isnan(revenue)] = 0.0
+    position = df.columns.get_loc("roas") + 1
+    for offset, (name, values) in enumerate(zip(MTD_COLUMNS, (spend, revenue, roas))):
+        df.insert(position + offset, name, values)
+    return df
 
+
+def _cached_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
+    # The frontend data layer hands out the same list object until the next
+    # refresh, so identity is a cheap and exact cache key.
+    cached = st.session_state.get("_campaigns_frame")
+    if cached is not None and cached[0] is data:
+        return cached[1]
+    df = campaigns_frame(data)
+    st.session_state["_campaigns_frame"] = (data, df)
+    return df
+
+
+def _find_campaign(data: List[Dict[str, Any]], account_id: str, campaign_id: str) -> Dict[str, Any]:
     for account in data:
-        st.subheader(f"Účet: {account['account_id']}")
-        for campaign in account["campaigns"]:
-            spend = float(campaign.get("spend", 0) or 0.0)
-            revenue = float(campaign.get("revenue", 0) or 0.0)
-            roas = _safe_roas(revenue, spend)
-
-            total_spend += spend
-            total_revenue += revenue
-            roas_values.append(roas)
-
-            with st.expander(f"🎯 Kampaň: {campaign['name']} | ROAS: {roas:.2f}"):
-                st.write(f"ID: {campaign['id']}, Cíl: {campaign.get('objective', '')}")
-                st.write(f"Spend: ${spend:.2f}, Revenue: ${revenue:.2f}, ROAS: {roas:.2f}")
-                for adset in campaign.get("adsets", []):
-                    with st.expander(f"📦 Adset: {adset['name']}"):
-                        st.write(f"ID: {adset['id']}")
-                        for ad in adset.get("ads", []):
-                            st.markdown(f"🪧 Reklama: **{ad['name']}** (ID: `{ad['id']}`)")
+        if account["account_id"] == account_id:
+            for campaign in account["campaigns"]:
+                if campaign["id"] == campaign_id:
+                    return campaign
+    return {}
+
+
+def _render_campaign_detail(campaign: Dict[str, Any]) -> None:
+    spend = float(campaign.get("spend", 0) or 0.0)
+    revenue = float(campaign.get("revenue", 0) or 0.0)
+    roas = _safe_roas(revenue, spend)
+    st.markdown(f"#### 🎯 Kampaň: {campaign.get('name', '')} | ROAS: {roas:.2f}")
+    st.write(f"ID: {campaign['id']}, Cíl: {campaign.get('objective', '')}")
+    st.write(f"Spend: ${spend:.2f}, Revenue: ${revenue:.2f}, ROAS: {roas:.2f}")
+    for adset in campaign.get("adsets", []):
+        ads = adset.get("ads", [])
+        with st.expander(f"📦 Adset: {adset['name']} ({len(ads)})"):
+            st.write(f"ID: {adset['id']}")
+            # Tabular ads list: one element regardless of count, capped per page.
+            st.dataframe(
+                pd.DataFrame(ads[:ADS_PAGE_SIZE], columns=["name", "id"]),
+                hide_index=True,
+                width="stretch",
+            )
+            if len(ads) > ADS_PAGE_SIZE:
+                st.caption(f"Zobrazeno {ADS_PAGE_SIZE} z {len(ads)} reklam.")
+
+
+def display_campaigns(
+    data: List[Dict[str, Any]],
+    totals: Optional[Mapping[str, Mapping[str, float]]] = None,
+) -> None:
+    """
+    Render the campaigns table, the selected campaign's tree and the goals section.
+    `totals` (campaign id -> {"spend", "revenue"}, e.g. from the rollups) adds
+    month-to-date columns; the monthly goals are then computed from them.
+    """
+    df = _cached_frame(data)
+    if totals is not None:
+        df = apply_totals(df, totals)
+
+    f_query, f_obj = st.columns([0.6, 0.4])
+    with f_query:
+        query = st.text_input("Hledat kampaň", key="camp_filter_query")
+    with f_obj:
+        objectives = st.multiselect(
+            "Cíl", sorted(df["objective"].dropna().unique()), key="camp_filter_objective"
+        )
+    view = filter_campaigns(df, query, objectives)
+
+    _, pages = page_slice(view, 1, CAMPAIGNS_PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = int(st.number_input("Stránka", 1, pages, 1, key="camp_page"))
+    page_df, _ = page_slice(view, page, CAMPAIGNS_PAGE_SIZE)
+
+    event = st.dataframe(
+        page_df,
+        hide_index=True,
+        width="stretch",
+        on_select="rerun",
+        selection_mode="single-row",
+        key="camp_table",
+        column_config={
+            "spend": st.column_config.NumberColumn("Spend", format="$%.2f"),
+            "revenue": st.column_config.NumberColumn("Revenue", format="$%.2f"),
+            "roas": st.column_config.NumberColumn("ROAS", format="%.2f"),
+            "mtd_spend": st.column_config.NumberColumn("Spend (MTD)", format="$%.2f"),
+            "mtd_revenue": st.column_config.NumberColumn("Revenue (MTD)", format="$%.2f"),
+            "mtd_roas": st.column_config.NumberColumn("ROAS (MTD)", format="%.2f"),
+        },
+    )
+    st.caption(f"{len(view)} kampaní · vyber řádek pro adsety a reklamy")
+
+    selected = event.selection.rows if event is not None else []
+    if selected:
+        row = page_df.iloc[selected[0]]
+        _render_campaign_detail(_find_campaign(data, row["account_id"], row["id"]))
 
+    monthly = ("mtd_spend", "mtd_revenue") if totals is not None else ("spend", "revenue")
+    total_spend = float(df[monthly[0]].sum())
+    total_revenue = float(df[monthly[1]].sum())
     if total_spend > 0:
         blended_roas = total_revenue / total_spend
         st.markdown("---")
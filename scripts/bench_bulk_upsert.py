@@ -0,0 +1,102 @@
+"""
+Benchmark for backend.repository.sync_entities on a synthetic /campaigns tree.
+
+    python -m scripts.bench_bulk_upsert                 # 100,000 ads, temporary SQLite file
+    python -m scripts.bench_bulk_upsert 20000
+    DATABASE_URL=postgresql+asyncpg://... python -m scripts.bench_bulk_upsert --use-env-db
+
+Runs an initial sync, an unchanged re-sync and a re-sync with 10 % of the ads
+renamed, and an ORM `session.merge` baseline on a 5,000-ad slice.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.repository import sync_entities
+
+ADS_PER_ADSET = 10
+ADSETS_PER_CAMPAIGN = 10
+ORM_BASELINE_ADS = 5_000
+
+
+def synthetic_tree(n_ads: int, renamed_every: int = 0):
+    n_campaigns = max(1, n_ads // (ADS_PER_ADSET * ADSETS_PER_CAMPAIGN))
+    campaigns = []
+    for c in range(n_campaigns):
+        adsets = []
+        for s in range(ADSETS_PER_CAMPAIGN):
+            ads = []
+            for a in range(ADS_PER_ADSET):
+                n = (c * ADSETS_PER_CAMPAIGN + s) * ADS_PER_ADSET + a
+                name = f"Ad {n}" + (" v2" if renamed_every and n % renamed_every == 0 else "")
+                ads.append({"id": f"ad{n}", "name": name})
+            adsets.append({"id": f"as{c}_{s}", "name": f"Adset {s}", "ads": ads})
+        campaigns.append({"id": f"c{c}", "name": f"Campaign {c}", "objective": "OUTCOME_SALES",
+                          "spend": 100.0 + c, "revenue": 2.5, "adsets": adsets})
+    return [{"account_id": "act_1", "campaigns": campaigns}]
+
+
+async def _timed_sync(Session, tree, label: str) -> None:
+    async with Session() as session:
+        t0 = time.perf_counter()
+        result = await sync_entities(session, tree)
+        await session.commit()
+        elapsed = time.perf_counter() - t0
+    rows = sum(r["received"] for r in result.values())
+    written = sum(r["written"] for r in result.values())
+    print(f"{label:<24} rows={rows:>8,} written={written:>8,}  {elapsed:7.2f} s  {rows / elapsed:>10,.0f} rows/s")
+
+
+async def _orm_baseline(Session, tree) -> None:
+    from backend.repository import flatten_tree
+
+    campaigns, adsets, ads = flatten_tree(tree)
+    ads = ads[:ORM_BASELINE_ADS]
+    adset_ids = {a["adset_id"] for a in ads}
+    adsets = [s for s in adsets if s["id"] in adset_ids]
+    campaign_ids = {s["campaign_id"] for s in adsets}
+    campaigns = [c for c in campaigns if c["id"] in campaign_ids]
+    async with Session() as session:
+        t0 = time.perf_counter()
+        for model, rows in ((models.Campaign, campaigns), (models.Adset, adsets), (models.Ad, ads)):
+            for row in rows:
+                await session.merge(model(**row))
+        await session.commit()
+        elapsed = time.perf_counter() - t0
+    rows = len(campaigns) + len(adsets) + len(ads)
+    print(f"{'ORM merge (baseline)':<24} rows={rows:>8,}                   {elapsed:7.2f} s  {rows / elapsed:>10,.0f} rows/s")
+
+
+async def main() -> None:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n_ads = int(args[0]) if args else 100_000
+    if "--use-env-db" in sys.argv:
+        url = os.environ["DATABASE_URL"]
+    else:
+        url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    await _timed_sync(Session, synthetic_tree(n_ads), "initial sync")
+    await _timed_sync(Session, synthetic_tree(n_ads), "unchanged re-sync")
+    await _timed_sync(Session, synthetic_tree(n_ads, renamed_every=10), "10% changed re-sync")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+    await _orm_baseline(Session, synthetic_tree(ORM_BASELINE_ADS))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Benchmark for backend.kpi on synthetic insight rows.
+
+    python -m scripts.bench_kpi            # 1,000,000 rows
+    python -m scripts.bench_kpi 5000000
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.kpi import aggregate_kpis, normalize_frame
+
+GROUPINGS = [
+    (),
+    ("account_id",),
+    ("account_id", "date"),
+    ("campaign_id",),
+    ("account_id", "month"),
+    ("objective", "date"),
+]
+
+
+def synthetic_frame(n_rows: int, n_accounts: int = 50, n_campaigns: int = 5000, n_days: int = 365) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    campaign = rng.integers(0, n_campaigns, n_rows)
+    objectives = np.array(["OUTCOME_SALES", "OUTCOME_TRAFFIC", "OUTCOME_LEADS", "OUTCOME_AWARENESS"])
+    impressions = rng.integers(0, 50_000, n_rows)
+    clicks = (impressions * rng.uniform(0, 0.03, n_rows)).astype(np.int64)
+    spend = rng.gamma(2.0, 40.0, n_rows)
+    return pd.DataFrame({
+        "account_id": np.char.add("act_", (campaign % n_accounts).astype(str)),
+        "campaign_id": np.char.add("c", campaign.astype(str)),
+        "objective": objectives[campaign % len(objectives)],
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, n_days, n_rows), unit="D"),
+        "spend": spend,
+        "revenue": spend * rng.gamma(2.0, 1.0, n_rows),
+        "impressions": impressions,
+        "clicks": clicks,
+        "conversions": rng.poisson(1.5, n_rows),
+    })
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    raw = synthetic_frame(n_rows)
+
+    t0 = time.perf_counter()
+    df = normalize_frame(raw)
+    print(f"rows={n_rows:,}  normalize: {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    for group_by in GROUPINGS:
+        t0 = time.perf_counter()
+        out = aggregate_kpis(df, group_by)
+        elapsed = (time.perf_counter() - t0) * 1000
+        label = ",".join(group_by) or "(totals)"
+        print(f"group_by={label:<22} groups={len(out):>9,}  {elapsed:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,48 @@
-# scripts/ingest_data.py
 import asyncio
-from backend.ads_api import fetch_campaigns
+import sys
+
+from backend.ads_api import fetch_campaigns, fetch_insights
+from backend.database import SessionLocal
+from backend.repository import sync_entities
+from backend.rollups import store_insights
+
 
 def load_campaigns():
     raw = asyncio.run(fetch_campaigns(include_insights=True))
-    return raw
\ No newline at end of file
+    return raw
+
+
+async def _sync_campaigns() -> dict:
+    accounts = await fetch_campaigns(include_insights=True)
+    async with SessionLocal() as session:
+        result = await sync_entities(session, accounts)
+        await session.commit()
+    return result
+
+
+def sync_campaigns() -> dict:
+    """Fetch the campaign/adset/ad tree and bulk-upsert it (unchanged rows are skipped)."""
+    return asyncio.run(_sync_campaigns())
+
+
+async def _ingest_insights(date_preset: str) -> int:
+    rows = await fetch_insights(date_preset=date_preset, level="ad")
+    async with SessionLocal() as session:
+        stored = await store_insights(session, rows)
+        await session.commit()
+    return stored
+
+
+def ingest_insights(date_preset: str = "last_3d") -> int:
+    """Fetch daily ad-level insights, store them and update the rollups."""
+    return asyncio.run(_ingest_insights(date_preset))
+
+
+if __name__ == "__main__":
+    # python -m scripts.ingest_data [date_preset]  |  python -m scripts.ingest_data entities
+    if sys.argv[1:2] == ["entities"]:
+        for name, stats in sync_campaigns().items():
+            print(f"{name}: {stats['written']} written, {stats['unchanged']} unchanged")
+    else:
+        preset = sys.argv[1] if len(sys.argv) > 1 else "last_3d"
+        print(f"Stored {ingest_insights(preset)} insight rows.")
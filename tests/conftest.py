@@ -45,6 +45,39 @@ def app_client(monkeypatch):
     return client
 
 
+# --- SQLite DB se všemi tabulkami + session factory (bez reloadu backend.database) ---
+@pytest.fixture
+def db_sessionmaker(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend import models
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path/'fixture.db'}")
+
+    async def _create():
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+
+    asyncio.run(_create())
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+# --- TestClient, jehož get_session míří do db_sessionmaker ---
+@pytest.fixture
+def db_app_client(app_client, db_sessionmaker):
+    from backend import main as backend_main
+
+    async def _session():
+        async with db_sessionmaker() as session:
+            yield session
+
+    backend_main.app.dependency_overrides[backend_main.get_session] = _session
+    backend_main.app.dependency_overrides[backend_main.get_read_session] = _session
+    yield app_client
+    backend_main.app.dependency_overrides.clear()
+
+
 # --- Pomocná fixtura: event loop pro pytest-asyncio (strict mode) ---
 @pytest.fixture(scope="session")
 def event_loop():
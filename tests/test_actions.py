@@ -0,0 +1,135 @@
+# tests/test_actions.py
+import asyncio
+import datetime as dt
+import json
+from urllib.parse import parse_qs
+
+import pytest
+from httpx import Response
+
+from backend import actions, ads_api, recommendations
+from backend.models import Recommendation
+
+
+class FakeGraph:
+    """Minimální Graph batch endpoint nad slovníkem objektů."""
+
+    def __init__(self, objects, throttle_first=0):
+        self.objects = objects
+        self.calls = []
+        self.throttle_left = throttle_first
+
+    def __call__(self, request):
+        form = parse_qs(request.content.decode())
+        batch = json.loads(form["batch"][0])
+        assert len(batch) <= actions.GRAPH_BATCH_LIMIT
+        self.calls.append(batch)
+        out = []
+        for sub in batch:
+            if self.throttle_left:
+                self.throttle_left -= 1
+                out.append({"code": 400, "body": json.dumps({"error": {"code": 17, "message": "limit"}})})
+                continue
+            oid = sub["relative_url"].split("?")[0]
+            if oid not in self.objects:
+                out.append({"code": 400, "body": json.dumps({"error": {"code": 100, "message": "unknown"}})})
+            elif sub["method"] == "GET":
+                out.append({"code": 200, "body": json.dumps(self.objects[oid])})
+            else:
+                for k, v in parse_qs(sub["body"]).items():
+                    self.objects[oid][k] = v[0]
+                out.append({"code": 200, "body": json.dumps({"success": True})})
+        return Response(200, json=out)
+
+
+@pytest.fixture(autouse=True)
+def _token_and_fast_retry(monkeypatch):
+    monkeypatch.setattr(ads_api, "ACCESS_TOKEN", "test-meta-token")
+    monkeypatch.setattr(actions, "ACTIONS_RETRY_BASE_SECONDS", 0)
+
+
+def test_plan_changes_composes_and_rejects():
+    current = {"a": {"status": "ACTIVE", "daily_budget": "1000"}, "b": {"daily_budget": "500"}, "c": {}}
+    changes, rejected = actions.plan_changes([
+        {"type": "scale_budget", "object_id": "a", "percent": 20},
+        {"type": "reallocate", "from_id": "a", "to_id": "b", "amount": 200},
+        {"type": "pause", "object_id": "b"},
+        {"type": "scale_budget", "object_id": "c", "percent": 10},
+        {"type": "reallocate", "from_id": "b", "to_id": "a", "amount": 5000},
+    ], current)
+    by_key = {(c["object_id"], c["field"]): (c["before"], c["after"]) for c in changes}
+    assert by_key == {
+        ("a", "daily_budget"): ("1000", "1000"),  # +20 % a pak -200
+        ("b", "daily_budget"): ("500", "700"),
+        ("b", "status"): (None, "PAUSED"),
+    }
+    assert [(r["object_id"], r["ok"]) for r in rejected] == [("c", False), ("b", False)]
+
+
+def test_validate_actions():
+    with pytest.raises(ValueError):
+        actions.validate_actions([{"type": "boost", "object_id": "a"}])
+    with pytest.raises(ValueError):
+        actions.validate_actions([{"type": "scale_budget", "object_id": "a"}])
+
+
+def test_execute_200_budget_changes_in_batches(graph_mock, db_sessionmaker):
+    objects = {f"as{i}": {"status": "ACTIVE", "daily_budget": "1000"} for i in range(200)}
+    graph = FakeGraph(objects, throttle_first=3)
+    graph_mock.post("/").mock(side_effect=graph)
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            out = await actions.execute_actions(
+                s, [{"type": "scale_budget", "object_id": oid, "percent": 10} for oid in objects]
+            )
+            await s.commit()
+            audit = await actions.list_audit(s, out["execution_id"], limit=1000)
+        return out, audit
+
+    out, audit = asyncio.run(_run())
+    assert out["applied"] == 200 and out["failed"] == 0
+    assert all(o["daily_budget"] == "1100" for o in objects.values())
+    # 4 čtecí + 4 zápisové dávky a 1 opakování throttlovaných požadavků
+    assert len(graph.calls) == 9
+    assert len(audit) == 200 and {(a["before"], a["after"], a["status"]) for a in audit} == {("1000", "1100", "ok")}
+
+
+def test_execute_reports_graph_errors(graph_mock, db_sessionmaker):
+    graph_mock.post("/").mock(side_effect=FakeGraph({"a": {"status": "ACTIVE"}}))
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            return await actions.execute_actions(s, [
+                {"type": "pause", "object_id": "a"},
+                {"type": "pause", "object_id": "missing"},
+                {"type": "scale_budget", "object_id": "a", "percent": 10},
+            ])
+
+    out = asyncio.run(_run())
+    assert out["applied"] == 1 and out["failed"] == 2
+    errors = {r["object_id"]: r["error"] for r in out["results"] if not r["ok"]}
+    assert errors["missing"] == "unknown" and "daily_budget" in errors["a"]
+
+
+def test_launch_recommendation_endpoint(graph_mock, db_app_client, db_sessionmaker):
+    objects = {"c1": {"status": "ACTIVE", "daily_budget": "2000"}}
+    graph_mock.post("/").mock(side_effect=FakeGraph(objects))
+
+    async def _seed():
+        now = dt.datetime.now(dt.timezone.utc)
+        async with db_sessionmaker() as s:
+            s.add(Recommendation(campaign_id="c1", action="scale", rationale="ROAS", score=1.0, status="new",
+                                 created_at=now, expires_at=now + dt.timedelta(hours=1)))
+            await s.commit()
+
+    asyncio.run(_seed())
+    r = db_app_client.post("/recommendations/1/launch")
+    assert r.status_code == 200
+    assert r.json()["applied"] == 1 and r.json()["recommendation"]["status"] == "launched"
+    expected = str(round(2000 * (1 + recommendations.RECOMMENDATION_SCALE_PERCENT / 100)))
+    assert objects["c1"]["daily_budget"] == expected
+
+    assert db_app_client.post("/recommendations/1/launch").status_code == 409
+    assert db_app_client.get("/actions/audit").json()[0]["recommendation_id"] == 1
+    assert db_app_client.post("/actions/execute", json={"actions": [{"type": "nope"}]}).status_code == 400
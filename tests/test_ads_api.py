@@ -189,4 +189,28 @@ async def test_create_adcreative_form_payload(graph_mock, monkeypatch):
         object_url="https://ex.com",
         image_hash="HASH123",
     )
-    assert out["id"] == "cr_new"
\ No newline at end of file
+    assert out["id"] == "cr_new"
+
+@pytest.mark.asyncio
+async def test_fetch_insights_pages_and_parses(graph_mock, monkeypatch):
+    monkeypatch.setattr(ads_api, "ACCESS_TOKEN", "test-meta-token")
+    graph_mock.get("/me/adaccounts").respond(200, json={"data": [{"id": "act_1"}]})
+    page2 = graph_mock.get("/act_1/insights", params={"after": "CUR"}).respond(
+        200, json={"data": [{"campaign_id": "c2", "date_start": "2026-01-02", "spend": "1"}]}
+    )
+    graph_mock.get("/act_1/insights").respond(200, json={
+        "data": [{
+            "campaign_id": "c1", "date_start": "2026-01-01", "spend": "10.5", "impressions": "100",
+            "clicks": "3", "actions": [{"action_type": "purchase", "value": "2"}],
+            "action_values": [{"action_type": "omni_purchase", "value": "40"},
+                              {"action_type": "purchase", "value": "39"}],
+        }],
+        "paging": {"cursors": {"after": "CUR"}, "next": "https://graph.facebook.com/next"},
+    })
+
+    rows = await ads_api.fetch_insights()
+    assert page2.called
+    assert [r["campaign_id"] for r in rows] == ["c1", "c2"]
+    assert rows[0]["account_id"] == "act_1"
+    assert rows[0]["revenue"] == 40.0  # omni_purchase má přednost
+    assert rows[0]["conversions"] == 2.0
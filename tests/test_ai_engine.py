@@ -1,29 +1,138 @@
 # tests/test_ai_engine.py
+import asyncio
+from types import SimpleNamespace
+
 import pytest
 
 from backend import ai_engine
 
+
 def test_build_prompt_contains_data():
     p = ai_engine._build_prompt({"x": 1})
     assert "Zde jsou data kampaně" in p
     assert "x" in p
 
 
+class _FakeCompletions:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        assert model == "gpt-4"
+        assert "Zde jsou data kampaně" in messages[0]["content"]
+        self.calls.append(stream)
+        if stream:
+            async def _chunks():
+                for text in ("PAUSE", None, ": důvod"):
+                    delta = SimpleNamespace(content=text)
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+            return _chunks()
+        message = SimpleNamespace(content="PAUSE: důvod")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _fake_client(calls):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(calls)))
+
+
 @pytest.mark.asyncio
 async def test_recommend_action_mocks_openai(monkeypatch):
-    class FakeResp:
-        class Choice:
-            def __init__(self):
-                self.message = {"content": "PAUSE: důvod"}
-        choices = [Choice()]
-    class FakeOpenAI:
-        class ChatCompletion:
-            @staticmethod
-            def create(model, messages):
-                assert model == "gpt-4"
-                assert "Zde jsou data kampaně" in messages[0]["content"]
-                return FakeResp()
-
-    monkeypatch.setattr(ai_engine, "openai", FakeOpenAI)
+    calls = []
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: _fake_client(calls))
     out = await ai_engine.recommend_action({"spend": 10})
     assert "PAUSE" in out
+    assert calls == [False]
+
+
+@pytest.mark.asyncio
+async def test_stream_recommendation_yields_deltas(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: _fake_client(calls))
+    chunks = [c async for c in ai_engine.stream_recommendation({"spend": 10})]
+    assert chunks == ["PAUSE", ": důvod"]
+    assert calls == [True]
+
+
+def test_client_is_reused_and_configured(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_engine, "_client", None)
+    client = ai_engine._get_client()
+    assert ai_engine._get_client() is client
+    assert client.max_retries == ai_engine.OPENAI_MAX_RETRIES
+    asyncio.run(ai_engine.close_client())
+    assert ai_engine._client is None
+
+
+def test_client_is_bound_to_its_event_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_engine, "_client", None)
+    monkeypatch.setattr(ai_engine, "_client_loop", None)
+
+    async def _pair():
+        return ai_engine._get_client(), ai_engine._get_client()
+
+    first, again = asyncio.run(_pair())
+    assert first is again
+    # nová smyčka (další asyncio.run) => nový klient, starý pool patří zavřené smyčce
+    second, _ = asyncio.run(_pair())
+    assert second is not first
+    asyncio.run(ai_engine.close_client())
+
+
+def _campaigns(n):
+    return [{"id": f"c{i}", "name": f"C{i}", "spend": 10.0 * i, "revenue": 2.0,
+             "adsets": [{"id": "s", "ads": [{"id": "a"}]}]} for i in range(n)]
+
+
+def _fake_complete(calls):
+    import json as _json
+
+    async def fake(prompt, *args, **kwargs):
+        calls.append(prompt)
+        payload = prompt.split("\n")[1]
+        items = _json.loads(payload)
+        recs = [{"campaign_id": f["id"], "action": "pause", "reason": "nízký ROAS"} for f in items]
+        return "```json\n" + _json.dumps({"recommendations": recs}) + "\n```"
+
+    return fake
+
+
+def test_campaign_features_are_compact():
+    f = ai_engine.campaign_features(_campaigns(2)[1])
+    # ve stromu z /campaigns je "revenue" ROAS
+    assert f == {"id": "c1", "name": "C1", "spend": 10.0, "roas": 2.0, "adsets": 1, "ads": 1}
+    row = {"id": "c1", "spend": 10.0, "revenue": 30.0, "roas": 3.0}
+    assert ai_engine.campaign_features(row) == {"id": "c1", "spend": 10.0, "revenue": 30.0, "roas": 3.0}
+
+
+@pytest.mark.asyncio
+async def test_batch_packs_campaigns_and_caches(monkeypatch):
+    ai_engine._cache.clear()
+    calls = []
+    monkeypatch.setattr(ai_engine, "_complete", _fake_complete(calls))
+
+    out = await ai_engine.recommend_actions_batch(_campaigns(60), batch_size=25, max_concurrency=2)
+    assert len(out) == 60 and len(calls) == 3
+    assert out["c5"]["action"] == "pause"
+
+    # druhé volání se stejnými features jde celé z cache
+    again = await ai_engine.recommend_actions_batch(_campaigns(60))
+    assert again == out and len(calls) == 3
+
+    # změněná kampaň => nový klíč => jen jedno další volání
+    changed = _campaigns(60)
+    changed[0]["spend"] = 999.0
+    await ai_engine.recommend_actions_batch(changed)
+    assert len(calls) == 4
+
+
+def test_parse_batch_response_drops_invalid():
+    text = '{"recommendations": [{"campaign_id": "c1", "action": "SCALE", "reason": "ok"},' \
+           '{"campaign_id": "x", "action": "pause"}, {"campaign_id": "c2", "action": "boost"}]}'
+    out = ai_engine._parse_batch_response(text, ["c1", "c2"])
+    assert list(out) == ["c1"] and out["c1"]["action"] == "scale"
+    assert ai_engine._parse_batch_response("no json here", ["c1"]) == {}
+    # nesmyslné položky z výstupu modelu se přeskočí, zbytek dávky platí
+    text = '{"recommendations": ["c1", null, {"campaign_id": "c2", "action": "keep"}]}'
+    assert list(ai_engine._parse_batch_response(text, ["c1", "c2"])) == ["c2"]
+    assert ai_engine._parse_batch_response('{"recommendations": "none"}', ["c1"]) == {}
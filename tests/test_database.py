@@ -17,5 +17,98 @@ def test_init_db_with_sqlite(monkeypatch, tmp_path):
     monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path/'ok.db'}")
     from backend import database
     importlib.reload(database)
+    from backend import migrations
     asyncio = __import__("asyncio")
+    # Startup jen kontroluje verzi schématu; nemigrovaná DB neprojde
+    with pytest.raises(RuntimeError, match="backend.migrations"):
+        asyncio.run(database.init_db())
+    asyncio.run(migrations.migrate(database.engine))
     asyncio.run(database.init_db())
+
+
+def test_engine_settings_from_env(monkeypatch):
+    from backend import database
+
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_ECHO", "true")
+    monkeypatch.setenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "0")
+    pg = database.engine_settings("postgresql+asyncpg://u:tajne@db/app")
+    assert pg["pool_size"] == 20 and pg["echo"] is True and pg["pool_pre_ping"] is True
+    assert pg["url"].query["prepared_statement_cache_size"] == "0"
+    assert "tajne" not in database.describe_engine_settings(pg)
+
+    monkeypatch.delenv("DB_ECHO")
+    lite = database.engine_settings("sqlite+aiosqlite:///x.db")
+    assert lite["echo"] is False and "pool_size" not in lite
+
+
+def test_read_session_uses_replica_until_it_lags(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path/'primary.db'}")
+    monkeypatch.setenv("DATABASE_READ_URL", f"sqlite+aiosqlite:///{tmp_path/'replica.db'}")
+    monkeypatch.setenv("DB_REPLICA_CHECK_SECONDS", "0")
+    from backend import database
+    importlib.reload(database)
+
+    async def _bound_url():
+        agen = database.get_read_session()
+        session = await agen.__anext__()
+        url = str(session.get_bind().url)
+        await agen.aclose()
+        return url
+
+    try:
+        assert asyncio.run(_bound_url()).endswith("replica.db")
+
+        async def _lagging(replica):
+            return 120.0
+
+        # replika je pozadu -> čtení jde na primární DB
+        monkeypatch.setattr(database, "replica_lag_seconds", _lagging)
+        assert asyncio.run(_bound_url()).endswith("primary.db")
+    finally:
+        monkeypatch.delenv("DATABASE_READ_URL")
+        importlib.reload(database)
+
+
+def test_read_session_without_replica_uses_primary(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path/'only.db'}")
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    from backend import database
+    importlib.reload(database)
+    assert database.read_engine is None and not asyncio.run(database.replica_usable())
+
+
+class _FakePg:
+    """Minimální AsyncEngine pro Postgres: vrací předem dané skaláry a zapisuje parametry."""
+
+    def __init__(self, value, seen):
+        self.dialect = type("D", (), {"name": "postgresql"})()
+        self.value, self.seen = value, seen
+
+    def connect(self):
+        engine = self
+
+        class _Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, statement, params=None):
+                engine.seen.append((str(statement), params))
+                return type("R", (), {"scalar": lambda _self: engine.value})()
+
+        return _Conn()
+
+
+def test_replica_lag_compares_against_primary_lsn():
+    from backend import database
+
+    seen = []
+    primary = _FakePg("0/3000060", seen)
+    # replika je pozadu a ještě nic nepřehrála -> lag neznámý, nepoužitelná
+    assert asyncio.run(database.replica_lag_seconds(_FakePg(None, seen), primary)) == float("inf")
+    assert asyncio.run(database.replica_lag_seconds(_FakePg(0, seen), primary)) == 0.0
+    assert seen[0][0] == database.PRIMARY_LSN_SQL
+    assert seen[1] == (database.REPLICA_LAG_SQL, {"primary_lsn": "0/3000060"})
@@ -0,0 +1,36 @@
+import base64
+import io
+import os
+
+from PIL import Image
+
+from frontend import assets
+
+
+def test_image_data_uri_cached_until_mtime_changes(tmp_path, monkeypatch):
+    path = tmp_path / "niklas.jpg"
+    Image.new("RGB", (500, 500), (9, 9, 9)).save(path)
+
+    reads = []
+    real = assets.img_to_base64
+    monkeypatch.setattr(assets, "img_to_base64", lambda p: reads.append(p) or real(p))
+    assets._encode_data_uri.clear()
+
+    first = assets.image_data_uri(str(path))
+    assert first.startswith("data:image/jpeg;base64,")
+    assert assets.image_data_uri(str(path)) == first
+    assert len(reads) == 1
+
+    os.utime(path, ns=(1, 1))
+    assets.image_data_uri(str(path))
+    assert len(reads) == 2
+
+
+def test_image_data_uri_downscales_and_handles_missing(tmp_path):
+    path = tmp_path / "anna.png"
+    Image.new("RGB", (800, 400)).save(path)
+
+    uri = assets.image_data_uri(str(path), max_size=(64, 64))
+    raw = base64.b64decode(uri.split(",", 1)[1])
+    assert Image.open(io.BytesIO(raw)).size == (64, 32)
+    assert assets.image_data_uri(str(tmp_path / "missing.jpg")) == ""
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from frontend import data
+
+
+def test_campaign_store_stale_while_revalidate():
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return [{"account_id": str(len(calls)), "campaigns": []}]
+
+    store = data.CampaignStore(fetch, ttl=60)
+    assert store.snapshot() == (None, None, None)
+
+    store.refresh(wait=True)
+    rows, updated_at, error = store.snapshot()
+    assert rows[0]["account_id"] == "1" and updated_at and error is None
+    assert store.is_fresh()
+
+    # druhý refresh běží na pozadí, snapshot zatím vrací stará data
+    store.refresh()
+    store.refresh()  # už běží -> nic nového
+    assert store.refreshing
+    assert store.snapshot()[0][0]["account_id"] == "1"
+    release.set()
+    store.refresh(wait=True)
+    assert store.snapshot()[0][0]["account_id"] == "2"
+    assert len(calls) == 2
+
+
+def test_campaign_store_revalidates_only_on_access():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{"account_id": str(len(calls)), "campaigns": []}]
+
+    store = data.CampaignStore(fetch, ttl=0)
+    assert store.get() == (None, None, None)  # bez dat se nic nestahuje samo
+    assert calls == []
+
+    store.refresh(wait=True)
+    time.sleep(0.05)
+    assert len(calls) == 1  # žádná smyčka na pozadí
+
+    # zastaralá data se vrátí hned a obnoví se na pozadí
+    assert store.get()[0][0]["account_id"] == "1"
+    store._worker.join(5)
+    assert store.snapshot()[0][0]["account_id"] == "2"
+    assert len(calls) == 2
+
+
+def test_campaign_store_keeps_data_on_error():
+    state = {"fail": False}
+
+    def fetch():
+        if state["fail"]:
+            raise RuntimeError("backend down")
+        return [{"account_id": "1", "campaigns": []}]
+
+    store = data.CampaignStore(fetch, ttl=60)
+    store.refresh(wait=True)
+    state["fail"] = True
+    store.refresh(wait=True)
+    rows, _, error = store.snapshot()
+    assert rows and isinstance(error, RuntimeError)
+
+
+def test_http_session_is_shared():
+    assert data.http_session() is data.http_session()
+
+
+def test_iter_sse_parses_events():
+    lines = ["data: Ahoj", "", "data:  světe", "data: druhý řádek", "", "event: done", "data: ", ""]
+    assert list(data.iter_sse(lines)) == [
+        ("message", "Ahoj"),
+        ("message", " světe\ndruhý řádek"),
+        ("done", ""),
+    ]
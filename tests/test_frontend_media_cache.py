@@ -0,0 +1,41 @@
+import os
+
+from PIL import Image
+
+from frontend import media_cache
+
+
+def test_thumbnail_cached_by_path_and_mtime(tmp_path):
+    src = tmp_path / "product_1.png"
+    Image.new("RGB", (2000, 1000), (10, 20, 30)).save(src)
+    cache = tmp_path / "cache"
+
+    first = media_cache.get_thumbnail(str(src), cache_dir=str(cache))
+    assert first and os.path.exists(first)
+    with Image.open(first) as img:
+        assert max(img.size) <= media_cache.THUMB_SIZE[0]
+    assert media_cache.get_thumbnail(str(src), cache_dir=str(cache)) == first
+
+    # změna mtime => nový klíč
+    os.utime(src, ns=(1, 1))
+    assert media_cache.get_thumbnail(str(src), cache_dir=str(cache)) != first
+
+
+def test_thumbnail_for_unreadable_file(tmp_path, monkeypatch):
+    bad = tmp_path / "broken.jpg"
+    bad.write_bytes(b"not an image")
+    assert media_cache.get_thumbnail(str(bad), cache_dir=str(tmp_path / "c")) is None
+
+    monkeypatch.setattr(media_cache.shutil, "which", lambda _: None)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00")
+    assert media_cache.get_thumbnail(str(video), cache_dir=str(tmp_path / "c")) is None
+
+
+def test_thumbnail_for_decompression_bomb(tmp_path, monkeypatch):
+    src = tmp_path / "huge.png"
+    Image.new("RGB", (100, 100)).save(src)
+    # práh pod velikostí obrázku => Pillow hlásí DecompressionBombError
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10)
+    assert media_cache.get_thumbnail(str(src), cache_dir=str(tmp_path / "c")) is None
+    assert os.listdir(tmp_path / "c") == []
@@ -0,0 +1,62 @@
+import os
+
+from PIL import Image
+
+from frontend import media_catalog
+from frontend.media_catalog import MediaCatalog
+
+EXTS = [".mp4", ".jpg", ".jpeg", ".png"]
+
+
+def _populate(d):
+    Image.new("RGB", (40, 20)).save(d / "product_a.png")
+    Image.new("RGB", (10, 10)).save(d / "Avatar_b.jpg")
+    (d / "clip.mp4").write_bytes(b"\x00" * 100_000)
+    (d / "notes.txt").write_text("ignored")
+
+
+def test_classify_matches_prefix_rules():
+    assert media_catalog.classify("Product_x.png") == "products"
+    assert media_catalog.classify("avatar1.jpg") == "avatars"
+    assert media_catalog.classify("banner.mp4") == "others"
+
+
+def test_refresh_and_query(tmp_path):
+    media = tmp_path / "ads"
+    media.mkdir()
+    _populate(media)
+    cat = MediaCatalog(str(tmp_path / "cat.sqlite3"))
+
+    assert cat.refresh(str(media), EXTS) is True
+    assert cat.count(str(media)) == 3
+    (prod,) = cat.query(str(media), category="products")
+    assert (prod["width"], prod["height"]) == (40, 20)
+    (video,) = cat.query(str(media), media_type="video")
+    assert video["category"] == "others" and video["size"] == 100_000
+
+    names = [i["name"] for i in cat.query(str(media), sort="size", descending=True, limit=1)]
+    assert names == ["clip.mp4"]
+    assert len(cat.query(str(media), limit=2, offset=2)) == 1
+
+
+def test_refresh_is_incremental(tmp_path, monkeypatch):
+    media = tmp_path / "ads"
+    media.mkdir()
+    _populate(media)
+    cat = MediaCatalog(str(tmp_path / "cat.sqlite3"))
+    cat.refresh(str(media), EXTS)
+
+    # beze změny adresáře se nescanuje
+    assert cat.refresh(str(media), EXTS) is False
+
+    # nový / smazaný soubor změní mtime adresáře -> rescan, rozměry jen pro změněné
+    calls = []
+    real = media_catalog._dimensions
+    monkeypatch.setattr(media_catalog, "_dimensions", lambda p: calls.append(p) or real(p))
+    os.remove(media / "clip.mp4")
+    Image.new("RGB", (5, 5)).save(media / "product_c.png")
+    os.utime(media, (1, 1))
+    assert cat.refresh(str(media), EXTS) is True
+    assert [os.path.basename(p) for p in calls] == ["product_c.png"]
+    assert cat.count(str(media), category="products") == 2
+    assert cat.count(str(media), media_type="video") == 0
@@ -1,7 +1,64 @@
 # tests/test_frontend_utils.py
-from frontend.utils import _safe_roas
+from frontend.utils import _safe_roas, campaigns_frame, filter_campaigns, page_slice
+
 
 def test_safe_roas_basic():
     assert _safe_roas(200.0, 100.0) == 2.0
     assert _safe_roas(0.0, 0.0) == 0.0
     assert _safe_roas(100.0, 0.0) == 0.0
+
+
+DATA = [
+    {"account_id": "1", "campaigns": [
+        {"id": "c1", "name": "Summer", "objective": "OUTCOME_SALES", "spend": 100.0, "revenue": 250.0,
+         "adsets": [{"id": "s1", "name": "S1", "ads": [{"id": "a1", "name": "A1"}, {"id": "a2", "name": "A2"}]}]},
+        {"id": "c2", "name": "Winter", "objective": "OUTCOME_TRAFFIC", "adsets": []},
+    ]},
+    {"account_id": "2", "campaigns": [
+        {"id": "c3", "name": "summer retarget", "objective": "OUTCOME_SALES", "spend": 0, "revenue": 5.0},
+    ]},
+]
+
+
+def test_campaigns_frame_flattens_tree():
+    df = campaigns_frame(DATA)
+    assert list(df["id"]) == ["c1", "c2", "c3"]
+    assert list(df["roas"]) == [2.5, 0.0, 0.0]
+    assert list(df["ads"]) == [2, 0, 0]
+    assert df["spend"].sum() == 100.0
+
+
+def test_filter_and_page():
+    df = campaigns_frame(DATA)
+    assert list(filter_campaigns(df, "SUMMER")["id"]) == ["c1", "c3"]
+    assert list(filter_campaigns(df, objectives=["OUTCOME_TRAFFIC"])["id"]) == ["c2"]
+    page, pages = page_slice(df, 5, 2)
+    assert pages == 2 and list(page["id"]) == ["c3"]
+
+
+def test_filter_tolerates_missing_names():
+    df = campaigns_frame([{"account_id": "1", "campaigns": [
+        {"id": "c1", "name": None}, {"id": "c2", "name": None},
+    ]}])
+    assert filter_campaigns(df, "summer").empty
+    assert list(filter_campaigns(df, "c1")["id"]) == ["c1"]
+
+
+def test_apply_totals_adds_month_to_date_columns():
+    import math
+
+    from frontend.utils import apply_totals
+
+    totals = {"c2": {"spend": 10.0, "revenue": 30.0}, "c3": {"spend": 0.0, "revenue": 0.0}}
+    df = apply_totals(campaigns_frame(DATA), totals)
+    # crawlované sloupce zůstanou, MTD jsou zvlášť a bez rollupu prázdné
+    assert list(df["spend"]) == [100.0, 0.0, 0.0]
+    assert list(df["roas"]) == [2.5, 0.0, 0.0]
+    assert list(df.columns[7:10]) == ["mtd_spend", "mtd_revenue", "mtd_roas"]
+    assert math.isnan(df["mtd_spend"][0]) and math.isnan(df["mtd_roas"][0])
+    assert list(df["mtd_spend"][1:]) == [10.0, 0.0]
+    assert list(df["mtd_roas"][1:]) == [3.0, 0.0]
+
+    untouched = apply_totals(campaigns_frame(DATA), {})
+    assert list(untouched["spend"]) == [100.0, 0.0, 0.0]
+    assert untouched["mtd_spend"].isna().all()
@@ -0,0 +1,101 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from backend import image_pipeline
+
+
+def _make_jpeg(path, size=(4000, 3000)):
+    img = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = "TestCamera"  # Make
+    img.save(path, "JPEG", quality=95, exif=exif.tobytes())
+
+
+def test_preprocess_resizes_and_strips_metadata(tmp_path):
+    src = tmp_path / "big.jpg"
+    _make_jpeg(src)
+
+    out = image_pipeline.preprocess_image(str(src), str(tmp_path / "out"))
+    assert out["placement"] == "square"  # 4:3 je nejblíž 1:1
+    assert max(out["width"], out["height"]) <= 1080
+    assert out["bytes"] < out["original_bytes"]
+
+    with Image.open(out["path"]) as img:
+        assert not img.getexif()
+    with Image.open(out["thumbnail_path"]) as thumb:
+        assert max(thumb.size) <= image_pipeline.THUMBNAIL_SIZE[0]
+
+
+def test_preprocess_webp_flattens_alpha(tmp_path):
+    src = tmp_path / "logo.png"
+    Image.new("RGBA", (600, 1200), (0, 0, 0, 0)).save(src)
+
+    out = image_pipeline.preprocess_image(str(src), str(tmp_path), fmt="webp")
+    assert out["path"].endswith(".webp")
+    assert out["mime_type"] == "image/webp"
+    assert out["placement"] == "story"
+
+
+def test_thumbnails_do_not_collide_on_same_name(tmp_path):
+    thumbs = tmp_path / "thumbs"
+    paths = []
+    for i, color in enumerate(((255, 0, 0), (0, 0, 255))):
+        src_dir = tmp_path / f"u{i}"
+        src_dir.mkdir()
+        Image.new("RGB", (400, 400), color).save(src_dir / "image.jpg")
+        out = image_pipeline.preprocess_image(str(src_dir / "image.jpg"), str(src_dir / "o"), thumb_dir=str(thumbs))
+        paths.append(out["thumbnail_path"])
+    assert paths[0] != paths[1]
+    with Image.open(paths[0]) as first:
+        assert first.getpixel((0, 0))[0] > 200  # první náhled nebyl přepsán
+
+
+def test_decompression_bomb_is_value_error(tmp_path, monkeypatch):
+    src = tmp_path / "bomb.png"
+    Image.new("RGB", (200, 200)).save(src)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)  # > 2× limit -> DecompressionBombError
+    with pytest.raises(ValueError):
+        image_pipeline.preprocess_image(str(src), str(tmp_path / "o"))
+
+
+def test_preprocess_async_uses_process_pool(tmp_path):
+    src = tmp_path / "a.jpg"
+    _make_jpeg(src, size=(1600, 900))
+
+    try:
+        out = asyncio.run(image_pipeline.preprocess_image_async(str(src), str(tmp_path / "o")))
+    finally:
+        image_pipeline.shutdown_executor()
+    assert out["placement"] == "landscape"
+    assert out["width"] <= 1200
+
+
+def test_upload_endpoint_preprocesses(app_client, monkeypatch, tmp_path):
+    from backend import main as backend_main
+
+    seen = {}
+
+    async def fake_upload(account_id: str, image_path: str):
+        seen["path"] = image_path
+        return {"images": {"x": {"hash": "H"}}}
+
+    monkeypatch.setattr(backend_main, "upload_ad_image", fake_upload)
+    monkeypatch.setattr(backend_main, "IMAGE_THUMBNAIL_DIR", str(tmp_path / "thumbs"))
+    monkeypatch.chdir(tmp_path)
+
+    buf = BytesIO()
+    Image.new("RGB", (2400, 2400), (1, 2, 3)).save(buf, "PNG")
+    r = app_client.post(
+        "/upload_ad_image",
+        data={"account_id": "1", "preprocess": "true"},
+        files={"file": ("big.png", buf.getvalue(), "image/png")},
+    )
+    image_pipeline.shutdown_executor()
+    assert r.status_code == 200
+    body = r.json()
+    assert seen["path"].endswith(".jpg")
+    assert body["preprocessing"]["width"] == 1080
+    assert body["images"]["x"]["hash"] == "H"
@@ -0,0 +1,52 @@
+import pytest
+
+from backend import kpi
+
+ROWS = [
+    {"account_id": "act_1", "campaign_id": "c1", "objective": "OUTCOME_SALES", "date": "2026-01-30",
+     "spend": 100.0, "revenue": 300.0, "impressions": 1000, "clicks": 20, "conversions": 4},
+    {"account_id": "act_1", "campaign_id": "c1", "objective": "OUTCOME_SALES", "date": "2026-02-01",
+     "spend": 50.0, "revenue": 50.0, "impressions": 1000, "clicks": 10, "conversions": 1},
+    {"account_id": "act_2", "campaign_id": "c2", "objective": "OUTCOME_TRAFFIC", "date": "2026-02-01",
+     "spend": 0.0, "revenue": 0.0, "impressions": 0, "clicks": 0, "conversions": 0},
+]
+
+
+def test_totals_and_ratios():
+    (totals,) = kpi.to_records(kpi.aggregate_kpis(kpi.insights_frame(ROWS)))
+    assert totals["spend"] == 150.0
+    assert totals["roas"] == pytest.approx(350 / 150)
+    assert totals["cpa"] == pytest.approx(30.0)
+    assert totals["ctr"] == pytest.approx(1.5)
+
+
+def test_group_by_account_and_month():
+    df = kpi.insights_frame(ROWS)
+    out = kpi.to_records(kpi.aggregate_kpis(df, ["account_id", "month"]))
+    assert [(r["account_id"], r["month"]) for r in out] == [
+        ("act_1", "2026-01"), ("act_1", "2026-02"), ("act_2", "2026-02"),
+    ]
+    # nulový spend => ROAS/CPA/CTR 0, žádné dělení nulou
+    assert out[2]["roas"] == 0.0 and out[2]["cpa"] == 0.0 and out[2]["ctr"] == 0.0
+
+
+def test_unknown_dimension():
+    with pytest.raises(ValueError):
+        kpi.aggregate_kpis(kpi.insights_frame(ROWS), ["adset_id"])
+
+
+def test_metrics_endpoint(app_client, monkeypatch):
+    from backend import main as backend_main
+
+    async def fake_fetch_insights(date_preset=None, since=None, until=None):
+        assert since == "2026-01-01"
+        return ROWS
+
+    monkeypatch.setattr(backend_main, "fetch_insights", fake_fetch_insights)
+    r = app_client.get("/metrics?group_by=objective&since=2026-01-01&until=2026-02-28")
+    assert r.status_code == 200
+    body = r.json()
+    assert [row["objective"] for row in body["rows"]] == ["OUTCOME_SALES", "OUTCOME_TRAFFIC"]
+    assert body["totals"]["spend"] == 150.0
+
+    assert app_client.get("/metrics?group_by=nope").status_code == 400
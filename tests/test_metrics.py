@@ -0,0 +1,69 @@
+# tests/test_metrics.py
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from backend import ads_api, metrics
+
+
+def _sample(name, **labels):
+    return metrics.registry.get_sample_value(name, {k: str(v) for k, v in labels.items()}) or 0.0
+
+
+def test_normalize_graph_path():
+    assert metrics.normalize_graph_path("act_123/campaigns") == "{id}/campaigns"
+    assert metrics.normalize_graph_path("/me/adaccounts") == "me/adaccounts"
+    assert metrics.normalize_graph_path("c1/insights") == "{id}/insights"
+    assert metrics.normalize_graph_path("") == "/"
+
+
+def test_graph_calls_record_errors_and_throttling(graph_mock, monkeypatch):
+    monkeypatch.setattr(ads_api, "ACCESS_TOKEN", "test-meta-token")
+    graph_mock.get("/act_7/campaigns").respond(400, json={"error": {"code": 17, "message": "limit"}})
+    before = _sample("graph_throttle_events_total", path="{id}/campaigns", code=17)
+    count_before = _sample("graph_request_duration_seconds_count", method="GET", path="{id}/campaigns")
+
+    async def _run():
+        async with ads_api._client() as client:
+            return await ads_api._get(client, "act_7/campaigns")
+
+    out = asyncio.run(_run())
+    assert out["error"]["code"] == 17  # chování beze změny
+    assert _sample("graph_requests_total", method="GET", path="{id}/campaigns", status=400) >= 1
+    assert _sample("graph_throttle_events_total", path="{id}/campaigns", code=17) == before + 1
+    assert _sample("graph_request_duration_seconds_count", method="GET", path="{id}/campaigns") == count_before + 1
+
+
+def test_db_statements_are_timed(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            metrics.instrument_engine(s.get_bind())
+            metrics.instrument_engine(s.get_bind())  # podruhé se nic nepřidá
+            before = _sample("db_query_duration_seconds_count", operation="SELECT")
+            await s.execute(text("SELECT 1"))
+            with pytest.raises(Exception):
+                await s.execute(text("SELECT * FROM neexistujici"))
+            await s.rollback()
+            # chybný dotaz po sobě nenechá visící čas startu
+            assert not s.sync_session.connection().info.get("_query_started")
+            return _sample("db_query_duration_seconds_count", operation="SELECT") - before
+
+    assert asyncio.run(_run()) == 1
+
+
+def test_metrics_endpoint_reports_route_latency(app_client, monkeypatch):
+    from backend import main as backend_main
+
+    async def fake_fetch(include_insights: bool = False):
+        return []
+
+    monkeypatch.setattr(backend_main, "fetch_campaigns", fake_fetch)
+    assert app_client.get("/campaigns").status_code == 200
+
+    r = app_client.get("/internal/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/campaigns",status="200"}' in body
+    assert "# TYPE graph_requests_total counter" in body
+    assert "ai_cache_hit_ratio " in body
@@ -0,0 +1,68 @@
+# tests/test_migrations.py
+import asyncio
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend import migrations, models
+
+
+def _schema(conn):
+    insp = inspect(conn)
+    return {
+        t: ({c["name"] for c in insp.get_columns(t)}, {i["name"] for i in insp.get_indexes(t)})
+        for t in insp.get_table_names()
+    }
+
+
+def test_migrate_fresh_database_matches_models(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path/'fresh.db'}")
+
+    async def _run():
+        assert await migrations.migrate(engine) == [1, 2, 3, 4, 5, 6]
+        assert await migrations.migrate(engine) == []  # idempotentní
+        assert await migrations.check_schema(engine) == migrations.SCHEMA_VERSION
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(_schema)
+        for name, table in models.Base.metadata.tables.items():
+            assert schema[name][0] == {c.name for c in table.columns}
+            assert {i.name for i in table.indexes} <= schema[name][1]
+        assert "ix_ads_adset_id" in schema["ads"][1]
+        await engine.dispose()
+
+    asyncio.run(_run())
+
+
+def test_migrate_upgrades_legacy_create_all_database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path/'legacy.db'}")
+
+    async def _run():
+        # DB vytvořená starým create_all: bez content_hash, account_id a indexů
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE campaigns (id VARCHAR PRIMARY KEY, name VARCHAR, "
+                                    "objective VARCHAR, spend FLOAT, roas FLOAT)"))
+            await conn.execute(text("CREATE TABLE adsets (id VARCHAR PRIMARY KEY, name VARCHAR, "
+                                    "campaign_id VARCHAR NOT NULL REFERENCES campaigns(id))"))
+            await conn.execute(text("CREATE TABLE ads (id VARCHAR PRIMARY KEY, name VARCHAR, "
+                                    "adset_id VARCHAR NOT NULL REFERENCES adsets(id))"))
+            await conn.execute(text("INSERT INTO campaigns (id, name) VALUES ('c1', 'Stará')"))
+
+        assert await migrations.current_version(engine) == 0
+        assert await migrations.migrate(engine) == [1, 2, 3, 4, 5, 6]
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(_schema)
+            name = (await conn.execute(text("SELECT name FROM campaigns WHERE id = 'c1'"))).scalar()
+        assert {"content_hash", "account_id"} <= schema["campaigns"][0]
+        assert "ix_campaigns_account_id" in schema["campaigns"][1]
+        assert "ix_adsets_campaign_id" in schema["adsets"][1]
+        assert "recommendations" in schema and name == "Stará"
+        await engine.dispose()
+
+    asyncio.run(_run())
+
+
+def test_baseline_migration_is_frozen():
+    # migrace 1 nesmí sledovat aktuální modely; novější změny mají vlastní migrace
+    baseline = migrations._baseline_metadata.tables
+    assert "content_hash" not in baseline["campaigns"].c and "account_id" not in baseline["campaigns"].c
+    assert "tenant_tokens" not in baseline and "insights_weekly" not in baseline
@@ -9,9 +9,10 @@ def test_models_roundtrip(monkeypatch, tmp_path):
 
     from backend import database
     importlib.reload(database)
-    from backend import models
+    from backend import migrations, models
 
     async def _run():
+        await migrations.migrate(database.engine)
         await database.init_db()
         async with database.SessionLocal() as s:
             c = models.Campaign(id="c1", name="Camp", objective="OUTCOME_SALES", spend=10.0, roas=2.0)
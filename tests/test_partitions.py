@@ -0,0 +1,36 @@
+# tests/test_partitions.py
+import asyncio
+import datetime as dt
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from backend import models, partitions
+
+
+def test_partition_naming_and_bounds():
+    assert partitions.add_months(dt.date(2025, 11, 1), 3) == dt.date(2026, 2, 1)
+    assert partitions.add_months(dt.date(2026, 1, 1), -13) == dt.date(2024, 12, 1)
+    assert partitions.partition_name(dt.date(2026, 2, 17)) == "insights_p202602"
+    assert partitions.partition_month("insights_p202602") == dt.date(2026, 2, 1)
+    assert partitions.partition_month("insights_unpartitioned") is None
+    assert partitions.partition_ddl(dt.date(2025, 12, 9)) == (
+        "CREATE TABLE IF NOT EXISTS insights_p202512 PARTITION OF insights "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
+    assert partitions.months_ahead(dt.date(2026, 11, 30), ahead=2) == [
+        dt.date(2026, 11, 1), dt.date(2026, 12, 1), dt.date(2027, 1, 1)]
+
+
+def test_insights_table_is_range_partitioned_on_postgres():
+    ddl = str(CreateTable(models.Insight.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (date)" in ddl
+
+
+def test_partition_helpers_are_noop_on_sqlite(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            assert await partitions.ensure_partitions(s, [dt.date(2026, 1, 5)]) == []
+            assert await partitions.drop_partitions_before(s, dt.date(2030, 1, 1)) == []
+
+    asyncio.run(_run())
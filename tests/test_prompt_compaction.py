@@ -0,0 +1,75 @@
+# tests/test_prompt_compaction.py
+import datetime as dt
+
+from backend import ai_engine, prompt_compaction as pc
+
+
+def _big_campaign(n_adsets=200, ads_per_adset=5):
+    start = dt.date(2026, 1, 1)
+    return {
+        "id": "c1", "name": "Velká kampaň", "objective": "OUTCOME_SALES", "spend": 5000.0, "revenue": 12500.0,
+        "roas": 2.5,
+        "adsets": [
+            {"id": f"s{i}", "name": f"Adset {i}", "spend": 10.0 + i, "revenue": (10.0 + i) * (i % 7) / 2,
+             "ads": [{"id": f"a{i}_{j}", "name": f"Ad {j}"} for j in range(ads_per_adset)]}
+            for i in range(n_adsets)
+        ],
+        "daily": [
+            {"date": (start + dt.timedelta(days=d)).isoformat(), "spend": 100.0, "revenue": 200.0 + 10 * d,
+             "clicks": 50, "impressions": 5000}
+            for d in range(14)
+        ],
+    }
+
+
+def test_small_payload_is_unchanged():
+    text, stats = pc.compact_payload({"x": 1}, budget=100)
+    assert text == "{'x': 1}"
+    assert stats["compacted"] is False and stats["tokens"] == stats["raw_tokens"]
+
+
+def test_large_campaign_is_summarized_under_budget():
+    campaign = _big_campaign()
+    text, stats = pc.compact_payload(campaign, budget=600)
+    assert stats["compacted"] and stats["raw_tokens"] > 5000
+    assert stats["tokens"] <= 600 and pc.count_tokens(text) == stats["tokens"]
+    assert '"adsets":200' in text and '"ads":1000' in text
+    assert "top_adsets_by_roas" in text and '"trend"' in text
+
+
+def test_summary_ranks_adsets_and_computes_trend():
+    summary = pc.summarize_campaign(_big_campaign(n_adsets=20), top_n=2)
+    top, bottom = summary["top_adsets_by_roas"], summary["bottom_adsets_by_roas"]
+    assert top[0]["roas"] >= top[1]["roas"] >= bottom[1]["roas"] >= bottom[0]["roas"]
+    assert summary["roas"] == 2.5
+    # posledních 7 dní má vyšší tržby než předchozích 7
+    assert summary["trend"]["days"] == 7 and summary["trend"]["delta_pct"]["roas"] > 0
+    assert summary["trend"]["delta_pct"]["spend"] == 0.0
+
+
+def test_campaign_list_keeps_largest_and_aggregates_rest():
+    campaigns = [{"campaign_id": f"c{i}", "spend": float(i), "revenue": 2.0 * i} for i in range(500)]
+    text, stats = pc.compact_payload(campaigns, budget=400)
+    assert stats["compacted"] and stats["tokens"] <= 400
+    summary = pc.summarize_campaigns(campaigns, top_n=3)
+    assert [c["campaign_id"] for c in summary["largest"]] == ["c499", "c498", "c497"]
+    assert summary["others"]["campaigns"] == 497 and summary["totals"]["roas"] == 2.0
+
+
+def test_campaigns_tree_revenue_is_roas():
+    # /campaigns: "revenue" je purchase ROAS, ne peníze
+    tree = [
+        {"id": "c1", "spend": 100.0, "revenue": 3.0, "adsets": []},
+        {"id": "c2", "spend": 300.0, "revenue": 1.0, "adsets": []},
+    ]
+    assert pc.summarize_campaign(tree[0])["roas"] == 3.0
+    assert pc.summarize_campaign(tree[0])["revenue"] == 300.0
+    totals = pc.summarize_campaigns(tree, top_n=0)["totals"]
+    assert totals["revenue"] == 600.0 and totals["roas"] == 1.5
+
+
+def test_prepare_prompt_reports_stats(monkeypatch):
+    monkeypatch.setattr(ai_engine, "compact_payload", lambda data: pc.compact_payload(data, budget=300))
+    prompt, stats = ai_engine.prepare_prompt(_big_campaign())
+    assert prompt.startswith("Zde jsou data kampaně:")
+    assert stats["compacted"] and stats["tokens"] <= 300
@@ -0,0 +1,145 @@
+# tests/test_recommendations.py
+import asyncio
+import datetime as dt
+
+import pytest
+
+from backend import recommendations, rollups
+from backend.rules_engine import RuleThresholds
+
+AS_OF = dt.date(2026, 5, 10)
+
+
+def _rows(campaign, spend, revenue, days=7):
+    return [{"ad_id": f"{campaign}_ad", "adset_id": "s1", "campaign_id": campaign, "account_id": "act_1",
+             "objective": "OUTCOME_SALES", "date": (AS_OF - dt.timedelta(days=i)).isoformat(),
+             "spend": spend, "revenue": revenue, "impressions": 10_000, "clicks": 200, "reach": 5_000,
+             "conversions": 1} for i in range(days)]
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    from backend import ai_engine
+
+    async def fake_batch(campaigns):
+        return {c["id"]: {"campaign_id": c["id"], "action": "keep", "reason": "?", "source": "llm"}
+                for c in campaigns}
+
+    monkeypatch.setattr(ai_engine, "recommend_actions_batch", fake_batch)
+
+
+async def _seed(s, *row_lists):
+    await rollups.store_insights(s, [r for rows in row_lists for r in rows])
+    await s.commit()
+
+
+async def _refresh(s):
+    n = await recommendations.refresh_recommendations(s, RuleThresholds(), as_of=AS_OF)
+    await s.commit()
+    return n
+
+
+def test_refresh_persists_actionable_only(db_sessionmaker, no_llm):
+    async def _run():
+        async with db_sessionmaker() as s:
+            await _seed(s, _rows("win", 100, 400), _rows("lose", 100, 10), _rows("mid", 100, 150))
+            assert await _refresh(s) == 2
+
+            page = await recommendations.list_recommendations(s)
+            assert page["total"] == 2
+            # seřazeno podle skóre (spend), pak id
+            assert {(i["campaign_id"], i["action"]) for i in page["items"]} == {("win", "scale"), ("lose", "pause")}
+            assert all(i["source"] == "rules" and i["score"] == 700 for i in page["items"])
+
+            # opakovaný refresh neduplikuje
+            assert await _refresh(s) == 0
+            assert (await recommendations.list_recommendations(s))["total"] == 2
+
+    asyncio.run(_run())
+
+
+def test_dismissed_is_not_recreated_and_changed_action_expires(db_sessionmaker, no_llm):
+    async def _run():
+        async with db_sessionmaker() as s:
+            await _seed(s, _rows("win", 100, 400), _rows("lose", 100, 10))
+            await _refresh(s)
+            items = {i["campaign_id"]: i for i in (await recommendations.list_recommendations(s))["items"]}
+
+            out = await recommendations.set_status(s, items["lose"]["id"], "dismissed")
+            await s.commit()
+            assert out["status"] == "dismissed"
+            assert await _refresh(s) == 0
+            assert [i["campaign_id"] for i in (await recommendations.list_recommendations(s))["items"]] == ["win"]
+
+            # "win" přestane být jasný případ -> otevřené doporučení vyprší
+            await _seed(s, _rows("win", 100, 150))
+            await _refresh(s)
+            assert (await recommendations.list_recommendations(s))["total"] == 0
+            assert (await recommendations.list_recommendations(s, "expired"))["items"][0]["campaign_id"] == "win"
+
+            with pytest.raises(ValueError):
+                await recommendations.set_status(s, items["win"]["id"], "new")
+            assert await recommendations.set_status(s, 999, "launched") is None
+
+    asyncio.run(_run())
+
+
+def test_recommendation_endpoints(db_app_client, db_sessionmaker, no_llm):
+    async def _prepare():
+        async with db_sessionmaker() as s:
+            await _seed(s, _rows("win", 100, 400), _rows("lose", 100, 10))
+            await _refresh(s)
+
+    asyncio.run(_prepare())
+    r = db_app_client.get("/recommendations?limit=1")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 2 and len(body["items"]) == 1
+
+    rec_id = body["items"][0]["id"]
+    r = db_app_client.patch(f"/recommendations/{rec_id}", json={"status": "launched"})
+    assert r.status_code == 200 and r.json()["status"] == "launched"
+    assert db_app_client.get("/recommendations?status=launched").json()["total"] == 1
+
+    assert db_app_client.patch(f"/recommendations/{rec_id}", json={"status": "bogus"}).status_code == 400
+    assert db_app_client.patch("/recommendations/999", json={"status": "dismissed"}).status_code == 404
+    assert db_app_client.get("/recommendations?status=bogus").status_code == 400
+
+
+def test_recommendation_stream_endpoint(db_app_client, db_sessionmaker, monkeypatch):
+    from backend import main as backend_main
+
+    today = dt.date.today().isoformat()
+
+    async def _seed_today():
+        async with db_sessionmaker() as s:
+            row = {**_rows("c1", 50, 100, days=1)[0], "ad_id": "a1", "date": today}
+            await _seed(s, [row])
+
+    seen = []
+
+    async def fake_stream(data):
+        seen.append(data)
+        for part in ("Škáluj", "\nROAS 2"):
+            yield part
+
+    asyncio.run(_seed_today())
+    monkeypatch.setattr(backend_main, "stream_recommendation", fake_stream)
+    r = db_app_client.get("/recommendations/stream?campaign_id=c1")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text == "data: Škáluj\n\ndata: \ndata: ROAS 2\n\nevent: done\ndata: \n\n"
+    assert seen[0]["campaign_id"] == "c1" and seen[0]["spend"] == 50
+
+    assert db_app_client.get("/recommendations/stream?campaign_id=nope").status_code == 404
+
+    # bez campaign_id jde celý seznam do portfoliového promptu
+    portfolio = []
+
+    async def fake_portfolio(data):
+        portfolio.append(data)
+        yield "Přesuň rozpočet"
+
+    monkeypatch.setattr(backend_main, "stream_portfolio_recommendation", fake_portfolio)
+    assert "Přesuň rozpočet" in db_app_client.get("/recommendations/stream").text
+    assert [c["campaign_id"] for c in portfolio[0]] == ["c1"] and len(seen) == 1
@@ -0,0 +1,125 @@
+# tests/test_repository.py
+import asyncio
+
+from sqlalchemy import func, select
+
+from backend import models, repository
+
+
+def _tree(n_campaigns=3, n_adsets=2, n_ads=2, name_suffix=""):
+    return [{"account_id": "act_1", "campaigns": [
+        {"id": f"c{c}", "name": f"C{c}{name_suffix}", "objective": "OUTCOME_SALES", "spend": 10.0, "revenue": 2.0,
+         "adsets": [{"id": f"c{c}s{s}", "name": f"S{s}", "ads": [{"id": f"c{c}s{s}a{a}", "name": f"A{a}"}
+                                                             for a in range(n_ads)]}
+                    for s in range(n_adsets)]}
+        for c in range(n_campaigns)
+    ]}]
+
+
+def test_sync_entities_inserts_then_skips_unchanged(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            first = await repository.sync_entities(s, _tree(), chunk_size=4)
+            await s.commit()
+            assert first["campaigns"] == {"received": 3, "written": 3, "unchanged": 0}
+            assert first["ads"]["written"] == 12
+
+            again = await repository.sync_entities(s, _tree(), chunk_size=4)
+            await s.commit()
+            assert again["ads"] == {"received": 12, "written": 0, "unchanged": 12}
+
+            changed = await repository.sync_entities(s, _tree(name_suffix=" (nový)"), chunk_size=4)
+            await s.commit()
+            assert changed["campaigns"]["written"] == 3 and changed["adsets"]["written"] == 0
+
+            camp = await s.get(models.Campaign, "c1")
+            assert camp.name == "C1 (nový)" and camp.roas == 2.0 and len(camp.content_hash) == 64
+            assert await s.scalar(select(func.count()).select_from(models.Ad)) == 12
+
+    asyncio.run(_run())
+
+
+def test_bulk_upsert_deduplicates_by_primary_key(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            out = await repository.bulk_upsert(s, models.Campaign, [{"id": "x", "name": "a"}, {"id": "x", "name": "b"}])
+            await s.commit()
+            assert out["received"] == 1
+            assert (await s.get(models.Campaign, "x")).name == "b"
+
+    asyncio.run(_run())
+
+
+def test_merge_sql_keeps_last_staged_row_and_skips_unchanged():
+    sql = repository.merge_sql(
+        models.Campaign.__table__, "_staging_campaigns", ["id", "name", "content_hash"], ["id"],
+        ["name", "content_hash"], changed_only=True,
+    )
+    assert 'SELECT DISTINCT ON ("id") "id", "name", "content_hash" FROM _staging_campaigns' in sql
+    assert 'ORDER BY "id", _seq DESC' in sql
+    assert 'ON CONFLICT ("id") DO UPDATE SET "name" = EXCLUDED."name"' in sql
+    assert '"campaigns".content_hash IS DISTINCT FROM EXCLUDED.content_hash' in sql
+    assert sql.endswith('RETURNING "id"')
+
+
+def test_upsert_rows_uses_batched_path_on_sqlite(db_sessionmaker, monkeypatch):
+    async def no_copy(*args, **kwargs):
+        raise AssertionError("COPY je jen pro PostgreSQL")
+
+    monkeypatch.setattr(repository, "_copy_upsert", no_copy)
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            assert not repository._uses_copy(s)
+            rows = [{"id": "x", "name": "a"}, {"id": "y", "name": "b"}]
+            assert await repository.upsert_rows(s, models.Campaign.__table__, rows, ["name"]) == 2
+            await s.commit()
+            assert (await s.get(models.Campaign, "y")).name == "b"
+
+    asyncio.run(_run())
+
+
+def test_load_account_tree_matches_campaigns_shape_in_three_queries(db_sessionmaker):
+    from sqlalchemy import event
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            await repository.sync_entities(s, _tree(n_campaigns=4, n_adsets=3, n_ads=2))
+            await s.commit()
+
+        statements = []
+        async with db_sessionmaker() as s:
+            sync_engine = s.get_bind()
+            listener = lambda *args: statements.append(args[2])
+            event.listen(sync_engine, "before_cursor_execute", listener)
+            try:
+                tree = await repository.load_account_tree(s)
+            finally:
+                event.remove(sync_engine, "before_cursor_execute", listener)
+
+        # kampaně + adsety + reklamy, nezávisle na velikosti stromu (žádné N+1)
+        assert len(statements) == 3
+        assert [a["account_id"] for a in tree] == ["act_1"]
+        first = tree[0]["campaigns"][0]
+        assert first == {
+            "id": "c0", "name": "C0", "objective": "OUTCOME_SALES", "spend": 10.0, "revenue": 2.0,
+            "adsets": [{"id": f"c0s{i}", "name": f"S{i}", "ads": [{"id": f"c0s{i}a0", "name": "A0"},
+                                                               {"id": f"c0s{i}a1", "name": "A1"}]}
+                       for i in range(3)],
+        }
+        assert len(tree[0]["campaigns"]) == 4
+
+    asyncio.run(_run())
+
+
+def test_stored_campaigns_endpoint_filters_by_account(db_app_client, db_sessionmaker):
+    async def _seed():
+        async with db_sessionmaker() as s:
+            await repository.sync_entities(s, _tree(n_campaigns=1))
+            await s.commit()
+
+    asyncio.run(_seed())
+    r = db_app_client.get("/campaigns/stored", params={"account_id": "act_1"})
+    assert r.status_code == 200
+    assert r.json()[0]["campaigns"][0]["adsets"][0]["ads"][0]["id"] == "c0s0a0"
+    assert db_app_client.get("/campaigns/stored", params={"account_id": "act_2"}).json() == []
@@ -0,0 +1,68 @@
+import asyncio
+import datetime as dt
+
+import pytest
+
+from backend import rollups
+
+
+def _row(ad, day, spend, revenue, campaign="c1", account="act_1"):
+    return {"ad_id": ad, "adset_id": "s1", "campaign_id": campaign, "account_id": account,
+            "objective": "OUTCOME_SALES", "date": day, "spend": spend, "revenue": revenue,
+            "impressions": 100, "clicks": 5, "reach": 80, "conversions": 1}
+
+
+def test_store_insights_maintains_rollups(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            n = await rollups.store_insights(s, [
+                _row("a1", "2026-01-31", 10, 30),
+                _row("a2", "2026-01-31", 5, 0),
+                _row("a3", "2026-02-01", 20, 40, campaign="c2"),
+                {"campaign_id": "c9", "date": "2026-02-01"},  # bez ad_id -> přeskočeno
+            ])
+            await s.commit()
+            assert n == 3
+
+            jan = await rollups.monthly_totals(s, "2026-01")
+            assert jan["spend"] == 15 and jan["revenue"] == 30 and jan["roas"] == 2.0
+            feb = await rollups.monthly_totals(s, "2026-02")
+            assert feb["accounts"][0]["account_id"] == "act_1" and feb["spend"] == 20
+
+            # re-ingest téhož dne nahradí hodnoty, nepřičte je
+            await rollups.store_insights(s, [_row("a1", "2026-01-31", 1, 2)])
+            await s.commit()
+            jan = await rollups.monthly_totals(s, "2026-01")
+            assert jan["spend"] == 6 and jan["revenue"] == 2
+
+            camps = await rollups.campaign_totals(s, since=dt.date(2026, 1, 1), until=dt.date(2026, 1, 31))
+            assert [(c["campaign_id"], c["spend"]) for c in camps] == [("c1", 6)]
+
+    asyncio.run(_run())
+
+
+def test_rebuild_matches_incremental(db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            await rollups.store_insights(s, [_row("a1", "2026-03-01", 3, 9), _row("a2", "2026-03-02", 1, 1)])
+            await s.commit()
+            before = await rollups.monthly_totals(s, "2026-03")
+            await rollups.rebuild_rollups(s)
+            await s.commit()
+            assert await rollups.monthly_totals(s, "2026-03") == before
+            assert before["spend"] == 4
+
+    asyncio.run(_run())
+
+
+def test_rollup_endpoints(db_app_client, db_sessionmaker):
+    async def _seed():
+        async with db_sessionmaker() as s:
+            await rollups.store_insights(s, [_row("a1", "2026-04-10", 50, 100)])
+            await s.commit()
+
+    asyncio.run(_seed())
+    r = db_app_client.get("/rollups/monthly?month=2026-04")
+    assert r.status_code == 200 and r.json()["roas"] == 2.0
+    r = db_app_client.get("/rollups/campaigns?since=2026-04-01")
+    assert r.json()[0]["campaign_id"] == "c1"
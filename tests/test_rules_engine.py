@@ -0,0 +1,88 @@
+# tests/test_rules_engine.py
+import datetime as dt
+
+import pytest
+
+from backend import ai_engine, rules_engine
+from backend.rules_engine import AMBIGUOUS, RuleThresholds
+
+
+def _rows(cid, days, spend, revenue, impressions=10_000, clicks=200, reach=5_000):
+    end = dt.date(2025, 3, 31)
+    return [
+        {"account_id": "act_1", "campaign_id": cid, "campaign_name": cid.upper(), "objective": "OUTCOME_SALES",
+         "date": (end - dt.timedelta(days=i)).isoformat(), "spend": spend, "revenue": revenue,
+         "impressions": impressions, "clicks": clicks, "reach": reach}
+        for i in range(days)
+    ]
+
+
+def _decisions(rows, **kw):
+    t = RuleThresholds(**kw)
+    out = rules_engine.evaluate(rules_engine.window_features(rows, t.window_days), t)
+    return dict(zip(out["campaign_id"], out["decision"]))
+
+
+def test_window_features_sums_window_only():
+    rows = _rows("c1", days=10, spend=100.0, revenue=300.0)
+    df = rules_engine.window_features(rows, window_days=7)
+    row = df.iloc[0]
+    assert row["spend"] == pytest.approx(700.0)
+    assert row["roas"] == pytest.approx(3.0)
+    assert row["ctr"] == pytest.approx(2.0)
+    assert row["frequency"] == pytest.approx(2.0)
+
+
+def test_evaluate_classifies_clear_cases():
+    rows = (
+        _rows("scale", 7, spend=100.0, revenue=400.0)
+        + _rows("pause", 7, spend=100.0, revenue=20.0)
+        + _rows("tired", 7, spend=5.0, revenue=4.0, reach=1_000)   # frekvence 10
+        + _rows("small", 7, spend=1.0, revenue=0.0)
+        + _rows("mid", 7, spend=100.0, revenue=150.0)
+    )
+    decisions = _decisions(rows, min_spend=30.0)
+    assert decisions == {
+        "scale": "scale", "pause": "pause", "tired": "pause", "small": "keep", "mid": AMBIGUOUS,
+    }
+
+
+def test_high_roas_but_fatigued_is_not_scaled():
+    rows = _rows("c1", 7, spend=100.0, revenue=400.0, reach=1_000)
+    assert _decisions(rows) == {"c1": AMBIGUOUS}
+
+
+def test_thresholds_from_env(monkeypatch):
+    monkeypatch.setenv("RULES_WINDOW_DAYS", "14")
+    monkeypatch.setenv("RULES_SCALE_ROAS_ABOVE", "2.5")
+    t = RuleThresholds.from_env()
+    assert t.window_days == 14 and t.scale_roas_above == 2.5
+    assert t.min_spend == RuleThresholds().min_spend
+
+
+@pytest.mark.asyncio
+async def test_recommend_campaigns_sends_only_ambiguous_to_llm(monkeypatch):
+    sent = []
+
+    async def fake_batch(campaigns):
+        sent.extend(campaigns)
+        return {c["id"]: {"campaign_id": c["id"], "action": "keep", "reason": "?", "source": "llm"}
+                for c in campaigns}
+
+    monkeypatch.setattr(ai_engine, "recommend_actions_batch", fake_batch)
+    rows = _rows("scale", 7, 100.0, 400.0) + _rows("mid", 7, 100.0, 150.0)
+    out = await rules_engine.recommend_campaigns(rows, RuleThresholds())
+
+    assert [c["id"] for c in sent] == ["mid"]
+    assert sent[0]["roas"] == pytest.approx(1.5)
+    assert out["scale"]["source"] == "rules" and out["scale"]["action"] == "scale"
+    assert out["mid"]["source"] == "llm"
+
+
+@pytest.mark.asyncio
+async def test_recommend_campaigns_empty(monkeypatch):
+    async def fail(campaigns):
+        raise AssertionError("LLM nemá být volán")
+
+    monkeypatch.setattr(ai_engine, "recommend_actions_batch", fail)
+    assert await rules_engine.recommend_campaigns([], RuleThresholds()) == {}
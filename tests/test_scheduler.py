@@ -10,3 +10,17 @@ def test_run_fetch_campaigns_sync_logs(monkeypatch, capsys):
     scheduler._run_fetch_campaigns_sync()
     out = capsys.readouterr().out
     assert "Fetched campaigns:" in out
+
+
+def test_jobs_share_one_event_loop(monkeypatch):
+    loops = []
+
+    async def fake_fetch_campaigns():
+        loops.append(asyncio.get_running_loop())
+        return []
+
+    monkeypatch.setattr(scheduler, "fetch_campaigns", fake_fetch_campaigns)
+    scheduler._run_fetch_campaigns_sync()
+    scheduler._run_fetch_campaigns_sync()
+    # pool spojení (asyncpg) je vázaný na smyčku, proto musí být pořád stejná
+    assert len(loops) == 2 and loops[0] is loops[1]
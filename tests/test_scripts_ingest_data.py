@@ -12,3 +12,40 @@ def test_ingest_calls_fetch(monkeypatch):
     out = ingest_data.load_campaigns()
     assert called["include_insights"] is True
     assert out[0]["account_id"] == "1"
+
+
+def test_ingest_insights_stores_rows(monkeypatch):
+    from scripts import ingest_data
+
+    async def fake_fetch_insights(date_preset=None, level="campaign"):
+        assert level == "ad"
+        return [{"ad_id": "a1"}]
+
+    stored = {}
+
+    async def fake_store(session, rows):
+        stored["rows"] = rows
+        return len(rows)
+
+    monkeypatch.setattr(ingest_data, "fetch_insights", fake_fetch_insights)
+    monkeypatch.setattr(ingest_data, "store_insights", fake_store)
+    assert ingest_data.ingest_insights("yesterday") == 1
+    assert stored["rows"] == [{"ad_id": "a1"}]
+
+
+def test_sync_campaigns_upserts_tree(monkeypatch):
+    from scripts import ingest_data
+
+    async def fake_fetch(include_insights=False):
+        return [{"account_id": "1", "campaigns": [{"id": "c1", "adsets": [{"id": "s1", "ads": [{"id": "a1"}]}]}]}]
+
+    seen = {}
+
+    async def fake_sync(session, accounts):
+        seen["accounts"] = accounts
+        return {"campaigns": {"received": 1, "written": 1, "unchanged": 0}}
+
+    monkeypatch.setattr(ingest_data, "fetch_campaigns", fake_fetch)
+    monkeypatch.setattr(ingest_data, "sync_entities", fake_sync)
+    assert ingest_data.sync_campaigns()["campaigns"]["written"] == 1
+    assert seen["accounts"][0]["campaigns"][0]["id"] == "c1"
@@ -0,0 +1,102 @@
+# tests/test_telemetry.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend import ai_engine, telemetry
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    telemetry.registry.reset()
+    ai_engine._cache.clear()
+    yield
+    telemetry.registry.reset()
+
+
+class _Completions:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def create(self, model, messages, **kwargs):
+        if self.fail:
+            raise TimeoutError("pomalé API")
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="KEEP"))], usage=usage)
+
+
+def _client(fail=False):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_Completions(fail)))
+
+
+def test_calls_are_recorded(monkeypatch):
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: _client())
+    asyncio.run(ai_engine.recommend_action({"spend": 1}))
+
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: _client(fail=True))
+    with pytest.raises(TimeoutError):
+        asyncio.run(ai_engine.recommend_action({"spend": 1}))
+
+    snap = telemetry.registry.snapshot()
+    # neúspěšné volání se počítá s nulou tokenů
+    assert snap["calls"] == 2 and snap["prompt_tokens"] == 120
+    assert snap["completion_tokens"] == 30
+    assert snap["errors"] == {"TimeoutError": 1}
+    assert snap["recent_latency_ms"]["p50"] is not None
+
+
+def test_abandoned_stream_is_recorded(monkeypatch):
+    async def create(model, messages, stream=False, **kwargs):
+        async def _chunks():
+            for part in ("Škáluj", " teď", " hned"):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        return _chunks()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: client)
+
+    async def _read_one():
+        stream = ai_engine.stream_recommendation({"spend": 1})
+        assert await stream.__anext__() == "Škáluj"
+        await stream.aclose()  # klient se odpojil
+
+    asyncio.run(_read_one())
+    snap = telemetry.registry.snapshot()
+    assert snap["calls"] == 1 and snap["errors"] == {"GeneratorExit": 1}
+    assert snap["prompt_tokens"] > 0 and snap["completion_tokens"] > 0
+
+
+def test_batch_cache_hits_are_recorded(monkeypatch):
+    async def fake(prompt, *args, **kwargs):
+        return '{"recommendations": [{"campaign_id": "c1", "action": "keep", "reason": "ok"}]}'
+
+    monkeypatch.setattr(ai_engine, "_complete", fake)
+    asyncio.run(ai_engine.recommend_actions_batch([{"id": "c1", "spend": 1.0}]))
+    asyncio.run(ai_engine.recommend_actions_batch([{"id": "c1", "spend": 1.0}]))
+    assert telemetry.registry.snapshot()["cache_hits"] == 1
+
+
+def test_flush_and_stats(db_sessionmaker, db_app_client):
+    for latency in (100, 200, 300, 400):
+        telemetry.record_ai_call("single", "gpt-4", 1000, 500, latency)
+    telemetry.record_ai_call("batch", "gpt-4", cache_hit=True)
+    telemetry.record_ai_call("single", "gpt-4", 10, 0, 50, error=ValueError())
+
+    async def _flush():
+        async with db_sessionmaker() as s:
+            return await telemetry.flush_pending(s)
+
+    assert asyncio.run(_flush()) == 6
+    assert asyncio.run(_flush()) == 0
+
+    r = db_app_client.get("/ai/stats?days=1")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["calls"] == 6 and body["errors"] == {"ValueError": 1}
+    assert body["cache_hit_rate"] == round(1 / 6, 3)
+    # cache hit se do latence nepočítá
+    assert body["latency_ms"]["p50"] == 200.0
+    assert body["daily"][0]["prompt_tokens"] == 4010
+    assert body["daily"][0]["cost_usd"] == pytest.approx(4010 / 1000 * 0.03 + 2000 / 1000 * 0.06, abs=1e-4)
+    assert db_app_client.get("/ai/stats?days=0").status_code == 400
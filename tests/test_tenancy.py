@@ -0,0 +1,181 @@
+# tests/test_tenancy.py
+import asyncio
+import io
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from backend import ads_api, tenancy
+
+
+def test_tenant_scope_overrides_global_token(monkeypatch):
+    monkeypatch.setattr(ads_api, "ACCESS_TOKEN", "global-token")
+
+    async def _token_in_task():
+        return ads_api._access_token()
+
+    async def _run():
+        with tenancy.tenant_scope("t1", "tenant-token"):
+            # kontext se propíše i do tasků spuštěných uvnitř scope
+            assert await asyncio.create_task(_token_in_task()) == "tenant-token"
+        return ads_api._access_token()
+
+    assert asyncio.run(_run()) == "global-token"
+
+
+def test_token_bucket_limits_each_tenant_separately(monkeypatch):
+    # virtuální hodiny: výsledek nezávisí na zatížení stroje
+    now = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(tenancy, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    async def _run():
+        slow = tenancy.TokenBucket(rate=20, burst=2)
+        for _ in range(3):
+            await slow.acquire()
+        other = tenancy.TokenBucket(rate=20, burst=2)
+        await other.acquire()
+        return slow, other
+
+    slow, other = asyncio.run(_run())
+    assert sleeps == [pytest.approx(0.05)]  # jen třetí volání čeká na doplnění (1/20 s)
+    assert slow.tokens == pytest.approx(0.0)
+    assert other.tokens == pytest.approx(1.0)  # druhý tenant nečeká
+
+
+def test_client_pool_keeps_one_client_per_tenant_and_evicts_idle():
+    async def _run():
+        pool = tenancy.TenantClientPool(max_clients=1, max_connections=2)
+        timeout = httpx.Timeout(5.0)
+        async with pool.client("a", timeout) as a1:
+            async with pool.client("a", timeout) as a2:
+                assert a1 is a2
+        async with pool.client("b", timeout) as b:
+            assert b is not a1
+        # nad limit: zavře se nejdéle nepoužitý nečinný klient
+        assert len(pool) == 1 and a1.is_closed and not b.is_closed
+
+        async with pool.client("c", timeout) as c:
+            async with pool.client("b", timeout) as b2:
+                assert b2 is b
+            assert not c.is_closed  # "c" se právě používá, zavřít nejde
+        await pool.aclose()
+        assert b.is_closed and c.is_closed
+
+    asyncio.run(_run())
+
+
+def test_tenant_header_routes_graph_calls_with_tenant_token(app_client, graph_mock, monkeypatch):
+    from backend import main as backend_main
+
+    async def fake_resolve(session, tenant_id, account_id=None):
+        return {"acme": "acme-token"}.get(tenant_id)
+
+    async def fake_authenticate(session, tenant_id, api_key):
+        return (tenant_id, api_key) in {("acme", "acme-key"), ("neznamy", "neznamy-key")}
+
+    monkeypatch.setattr(backend_main, "resolve_token", fake_resolve)
+    monkeypatch.setattr(backend_main, "authenticate", fake_authenticate)
+    route = graph_mock.get("/me/adaccounts").respond(200, json={"data": []})
+
+    r = app_client.get("/campaigns", headers={"X-Tenant-ID": "acme", "X-Tenant-Key": "acme-key"})
+    assert r.status_code == 200 and r.json() == []
+    assert route.calls.last.request.url.params["access_token"] == "acme-token"
+
+    # samotné X-Tenant-ID ani klíč jiného tenanta k tokenu nepustí
+    assert app_client.get("/campaigns", headers={"X-Tenant-ID": "acme"}).status_code == 401
+    r = app_client.get("/campaigns", headers={"X-Tenant-ID": "acme", "X-Tenant-Key": "neznamy-key"})
+    assert r.status_code == 401 and route.call_count == 1
+
+    r = app_client.get("/campaigns", headers={"X-Tenant-ID": "neznamy", "X-Tenant-Key": "neznamy-key"})
+    assert r.status_code == 404
+
+
+def test_token_store_refuses_plaintext_without_key(monkeypatch):
+    monkeypatch.setattr(tenancy, "TOKEN_ENCRYPTION_KEY", None)
+    with pytest.raises(RuntimeError):
+        tenancy.encrypt_token("secret")
+
+
+def test_token_store_roundtrip_encrypted(db_sessionmaker, monkeypatch):
+    fernet = pytest.importorskip("cryptography.fernet")
+    monkeypatch.setattr(tenancy, "TOKEN_ENCRYPTION_KEY", fernet.Fernet.generate_key().decode())
+    monkeypatch.setattr(tenancy, "_token_cache", {})
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            await tenancy.store_token(s, "acme", "default-token")
+            await tenancy.store_token(s, "acme", "account-token", account_id="act_9")
+            await s.commit()
+            stored = (await s.get(tenancy.TenantToken, ("acme", "*"))).token_ciphertext
+            assert "default-token" not in stored
+
+            assert await tenancy.resolve_token(s, "acme") == "default-token"
+            assert await tenancy.resolve_token(s, "acme", "act_9") == "account-token"
+            assert await tenancy.resolve_token(s, "acme", "act_1") == "default-token"
+            assert await tenancy.resolve_token(s, "jiny") is None
+
+            assert await tenancy.delete_token(s, "acme") == 2
+            await s.commit()
+            assert await tenancy.resolve_token(s, "acme") is None
+
+    asyncio.run(_run())
+
+
+def test_api_keys_are_hashed_and_bound_to_tenant(db_sessionmaker, monkeypatch):
+    monkeypatch.setattr(tenancy, "_key_cache", {})
+
+    async def _run():
+        async with db_sessionmaker() as s:
+            key = await tenancy.create_api_key(s, "acme")
+            await s.commit()
+            stored = (await s.get(tenancy.TenantApiKey, tenancy.hash_api_key(key))).tenant_id
+            assert stored == "acme"
+
+            assert await tenancy.authenticate(s, "acme", key)
+            assert not await tenancy.authenticate(s, "jiny", key)
+            assert not await tenancy.authenticate(s, "acme", "spatny-klic")
+            assert not await tenancy.authenticate(s, "acme", None)
+
+            assert await tenancy.revoke_api_keys(s, "acme") == 1
+            await s.commit()
+            assert not await tenancy.authenticate(s, "acme", key)
+
+    asyncio.run(_run())
+
+
+def test_tenant_context_repr_hides_token():
+    assert "secret" not in repr(tenancy.TenantContext("acme", "secret"))
+
+
+def test_cli_reads_token_from_stdin(monkeypatch):
+    monkeypatch.setattr(tenancy.sys, "stdin", io.StringIO("piped-token\n"))
+    assert tenancy._read_token() == "piped-token"
+
+
+def test_stored_data_endpoints_refuse_tenant_requests(db_app_client, monkeypatch):
+    from backend import main as backend_main
+
+    async def fake_resolve(session, tenant_id, account_id=None):
+        return "acme-token"
+
+    async def fake_authenticate(session, tenant_id, api_key):
+        return True
+
+    monkeypatch.setattr(backend_main, "resolve_token", fake_resolve)
+    monkeypatch.setattr(backend_main, "authenticate", fake_authenticate)
+    tenant = {"X-Tenant-ID": "acme", "X-Tenant-Key": "acme-key"}
+
+    # v DB jsou jen data globálního účtu -> tenant je nesmí vidět
+    for path in ("/campaigns/stored", "/rollups/monthly", "/rollups/campaigns", "/recommendations",
+                 "/ai/stats", "/recommendations/stream", "/actions/audit"):
+        assert db_app_client.get(path, headers=tenant).status_code == 403, path
+    assert db_app_client.post("/recommendations/1/launch", headers=tenant).status_code == 403
+    assert db_app_client.get("/rollups/monthly").status_code == 200
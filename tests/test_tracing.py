@@ -0,0 +1,152 @@
+# tests/test_tracing.py
+import asyncio
+import datetime as dt
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from backend import ads_api, ai_engine, rollups, tracing
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Skutečný SDK tracer s exportem do paměti (bez SDK se testy přeskočí)."""
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", lambda: provider.get_tracer("backend"))
+    return exporter
+
+
+def _named(exporter, prefix):
+    return [s for s in exporter.get_finished_spans() if s.name.startswith(prefix)]
+
+
+def _is_child(span, parent):
+    return span.parent is not None and span.parent.span_id == parent.context.span_id
+
+
+def test_spans_are_noop_without_sdk_provider():
+    # bez nakonfigurovaného exportéru je vše no-op a nic nepadá
+    assert tracing.setup_tracing() is False
+
+    @tracing.traced("crawl.test")
+    async def crawl():
+        with tracing.span("inner", a=1, b=None) as current:
+            current.set_attribute("x", "y")
+        detached = tracing.start_span("detached")
+        tracing.end_span(detached, ValueError("boom"))
+        return 42
+
+    assert asyncio.run(crawl()) == 42
+
+
+def test_paged_graph_crawl_nests_one_span_per_page(spans, graph_mock, monkeypatch):
+    monkeypatch.setattr(ads_api, "ACCESS_TOKEN", "test-meta-token")
+    graph_mock.get("/act_1/insights").mock(side_effect=[
+        httpx.Response(200, json={
+            "data": [{"campaign_id": "c1"}],
+            "paging": {"cursors": {"after": "p2"}, "next": "https://graph/next"},
+        }),
+        httpx.Response(200, json={"data": [{"campaign_id": "c2"}]}),
+    ])
+
+    @tracing.traced("crawl.test")
+    async def _run():
+        async with ads_api._client() as client:
+            return await ads_api._get_paged(client, "act_1/insights")
+
+    assert len(asyncio.run(_run())) == 2
+    (root,) = _named(spans, "crawl.test")
+    pages = _named(spans, "graph GET")
+    assert [s.name for s in pages] == ["graph GET {id}/insights"] * 2
+    assert [s.attributes["graph.page"] for s in pages] == [0, 1]
+    for s in pages:
+        assert _is_child(s, root)
+        assert s.attributes["graph.account_id"] == "act_1"
+        assert s.attributes["http.response.status_code"] == 200
+
+
+def test_db_transaction_span_with_statement_children(spans, db_sessionmaker):
+    async def _run():
+        async with db_sessionmaker() as s:
+            tracing.instrument_engine(s.get_bind())
+            tracing.instrument_engine(s.get_bind())  # podruhé se nic nepřidá
+            await s.execute(text("SELECT 1"))
+            await s.commit()
+
+    asyncio.run(_run())
+    (tx,) = _named(spans, "db.transaction")
+    (stmt,) = _named(spans, "db SELECT")
+    assert _is_child(stmt, tx)
+    assert stmt.attributes["db.system"] == "sqlite"
+    assert tx.attributes["db.transaction.outcome"] == "commit"
+
+
+def test_request_span_named_after_route(spans, app_client, monkeypatch):
+    from backend import main as backend_main
+
+    async def fake_fetch(include_insights: bool = False):
+        with tracing.span("crawl.campaigns"):
+            return []
+
+    monkeypatch.setattr(backend_main, "fetch_campaigns", fake_fetch)
+    parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    assert app_client.get("/campaigns", headers={"traceparent": parent}).status_code == 200
+
+    (request,) = _named(spans, "http GET")
+    assert request.name == "http GET /campaigns"
+    assert request.attributes["http.response.status_code"] == 200
+    assert format(request.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c"
+    assert _is_child(_named(spans, "crawl.campaigns")[0], request)
+
+
+def test_streamed_response_span_covers_the_stream(spans, db_app_client, db_sessionmaker, monkeypatch):
+    async def _seed():
+        async with db_sessionmaker() as s:
+            await rollups.store_insights(s, [{
+                "ad_id": "a1", "adset_id": "s1", "campaign_id": "c1", "account_id": "act_1",
+                "objective": "OUTCOME_SALES", "date": dt.date.today().isoformat(), "spend": 50,
+                "revenue": 100, "impressions": 100, "clicks": 5, "reach": 80, "conversions": 1,
+            }])
+            await s.commit()
+
+    async def create(model, messages, stream=False, **kwargs):
+        async def _chunks():
+            for part in ("Škáluj", " teď"):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        return _chunks()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: client)
+    asyncio.run(_seed())
+
+    r = db_app_client.get("/recommendations/stream?campaign_id=c1")
+    assert r.status_code == 200 and "Škáluj" in r.text
+    (request,) = _named(spans, "http GET /recommendations/stream")
+    (ai,) = _named(spans, "ai.stream")
+    # AI span visí pod požadavkem a požadavek skončí až po odeslání celého streamu
+    assert _is_child(ai, request)
+    assert request.end_time >= ai.end_time
+
+
+def test_ai_call_span_carries_model_and_tokens(spans, monkeypatch):
+    async def create(model, messages, **kwargs):
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3)
+        message = SimpleNamespace(content="PAUSE: důvod")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_engine, "_get_client", lambda: client)
+
+    assert asyncio.run(ai_engine._complete("prompt")) == "PAUSE: důvod"
+    (span,) = _named(spans, "ai.single")
+    assert span.attributes["gen_ai.request.model"] == ai_engine.MODEL
+    assert span.attributes["gen_ai.usage.input_tokens"] == 12
+    assert span.attributes["gen_ai.usage.output_tokens"] == 3